@@ -0,0 +1,345 @@
+"""
+Cache storage backends
+Interface for the persistent (L2) cache tables plus an embedded SQLite
+implementation for single-node deployments without Supabase
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from candles import CandleSeries
+from market_calendar import IST
+
+logger = logging.getLogger(__name__)
+
+# Key columns of every cache table (the unique constraint upserts conflict on)
+CACHE_TABLE_KEYS: Dict[str, Tuple[str, ...]] = {
+    'ohlc_cache': ('symbol', 'timeframe'),
+    'fundamentals_cache': ('symbol',),
+    'institutional_cache': ('symbol',),
+    'analysis_cache': ('symbol',),
+    'stock_lists': ('list_type',),
+}
+
+# Normalized OHLC table: one row per bar, so range reads and incremental
+# writes touch only the bars involved
+BAR_TABLE = 'ohlc_bars'
+BAR_TABLE_KEYS = ('symbol', 'timeframe', 'bar_ts')
+
+# Bars are exchange-local; series read back carry the IST offset
+BAR_TZ_OFFSET = int(IST.utcoffset(None).total_seconds())
+
+class CacheBackend(ABC):
+    """
+    Persistent cache store
+
+    Rows are identified by their table's key columns and carry a JSON `data`
+    payload and the `timestamp` they were cached at. `max_age_minutes`
+    filters out rows cached longer ago than that (None disables the check).
+    Implementations log and return None/[]/False on errors instead of raising.
+    """
+
+    name = "base"
+
+    def init(self) -> bool:
+        """Connect/prepare storage; returns whether the backend is usable"""
+        return False
+
+    def available(self) -> bool:
+        return False
+
+    def has_table(self, table_name: str) -> bool:
+        """Whether the table exists; backends that create their tables in init() always have them"""
+        return self.available()
+
+    def get(self, table_name: str, filters: Dict[str, str], max_age_minutes: Optional[int] = None) -> Optional[Any]:
+        """Data of the row matching `filters`, or None if missing/expired"""
+        entry = self.get_entry(table_name, filters, max_age_minutes)
+        return entry[0] if entry else None
+
+    @abstractmethod
+    def get_entry(self, table_name: str, filters: Dict[str, str],
+                  max_age_minutes: Optional[int] = None) -> Optional[Tuple[Any, datetime]]:
+        """(data, cached_at) of the row matching `filters`, or None if missing/expired.
+
+        One read serves callers that grade the row's age themselves (fresh,
+        stale-but-usable) instead of probing once per max age.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_many(self, table_name: str, filters_in: Dict[str, List[str]],
+                 max_age_minutes: Optional[int] = None) -> List[Dict]:
+        """Rows (key columns, data, ISO timestamp) whose columns are in the given value lists"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_many(self, table_name: str, entries: List[Tuple[Dict[str, str], Any]], batch_size: int = 50) -> bool:
+        """Upsert (filters, data) rows, stamped with the current time"""
+        raise NotImplementedError
+
+    def save(self, table_name: str, filters: Dict[str, str], data: Any) -> bool:
+        return self.save_many(table_name, [(filters, data)])
+
+    @abstractmethod
+    def delete(self, table_name: str, filters: Optional[Dict[str, Any]] = None) -> bool:
+        """Delete matching rows (list values match any item) or every row when filters is None"""
+        raise NotImplementedError
+
+    def clear(self, table_names: List[str]) -> bool:
+        """Empty whole tables"""
+        return all([self.delete(table_name) for table_name in table_names])
+
+    @abstractmethod
+    def get_bars(self, symbol: str, timeframe: str, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None, last_n: Optional[int] = None) -> Optional[CandleSeries]:
+        """Bars of one series in time order within [start, end], or only the last `last_n` of them.
+
+        Returns None when no bars match.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def upsert_bars(self, symbol: str, timeframe: str, bars: CandleSeries) -> bool:
+        """Insert new bars and overwrite existing ones with the same bar time; other bars are untouched"""
+        raise NotImplementedError
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Embedded on-disk cache in a single SQLite file
+
+    Mirrors the Supabase cache tables (same key columns, JSON data, cache
+    timestamp) so cached data survives restarts without a remote database.
+    One connection in WAL mode is shared by all threads behind a lock.
+    """
+
+    name = "sqlite"
+
+    # Stay well under SQLite's bound-parameter limit in IN (...) lists
+    IN_CHUNK = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def init(self) -> bool:
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for table_name, keys in CACHE_TABLE_KEYS.items():
+                key_columns = ", ".join(f"{key} TEXT NOT NULL" for key in keys)
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table_name} ("
+                    f"{key_columns}, data TEXT NOT NULL, timestamp TEXT NOT NULL, cached_at REAL NOT NULL, "
+                    f"PRIMARY KEY ({', '.join(keys)}))"
+                )
+            # Clustered on the key, so range scans read bars in order from one b-tree
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {BAR_TABLE} ("
+                "symbol TEXT NOT NULL, timeframe TEXT NOT NULL, bar_ts INTEGER NOT NULL, "
+                "open REAL NOT NULL, high REAL NOT NULL, low REAL NOT NULL, close REAL NOT NULL, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (symbol, timeframe, bar_ts)) WITHOUT ROWID"
+            )
+            conn.commit()
+            self._conn = conn
+            logger.info(f"SQLite cache ready at {self.path}")
+            return True
+        except Exception as e:
+            logger.warning(f"SQLite cache not available: {e}")
+            self._conn = None
+            return False
+
+    def available(self) -> bool:
+        return self._conn is not None
+
+    def _keys(self, table_name: str) -> Tuple[str, ...]:
+        keys = BAR_TABLE_KEYS if table_name == BAR_TABLE else CACHE_TABLE_KEYS.get(table_name)
+        if keys is None:
+            raise ValueError(f"Unknown cache table: {table_name}")
+        return keys
+
+    @staticmethod
+    def _cutoff(max_age_minutes: Optional[int]) -> Optional[float]:
+        if max_age_minutes is None:
+            return None
+        return datetime.now(timezone.utc).timestamp() - max_age_minutes * 60
+
+    def get_entry(self, table_name: str, filters: Dict[str, str],
+                  max_age_minutes: Optional[int] = None) -> Optional[Tuple[Any, datetime]]:
+        if not self.available():
+            return None
+
+        try:
+            self._keys(table_name)
+            where = " AND ".join(f"{column} = ?" for column in filters)
+            params = list(filters.values())
+            cutoff = self._cutoff(max_age_minutes)
+            if cutoff is not None:
+                where += " AND cached_at >= ?"
+                params.append(cutoff)
+
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT data, cached_at FROM {table_name} WHERE {where} LIMIT 1", params
+                ).fetchone()
+            if not row:
+                return None
+            return json.loads(row[0]), datetime.fromtimestamp(row[1], IST)
+        except Exception as e:
+            logger.warning(f"SQLite read error from {table_name}: {e}")
+            return None
+
+    def get_many(self, table_name: str, filters_in: Dict[str, List[str]],
+                 max_age_minutes: Optional[int] = None) -> List[Dict]:
+        if not self.available() or not filters_in:
+            return []
+
+        try:
+            self._keys(table_name)
+            columns = list(filters_in.keys())
+            chunk_column = columns[0]
+            values = list(dict.fromkeys(filters_in[chunk_column]))
+            cutoff = self._cutoff(max_age_minutes)
+
+            rows = []
+            for i in range(0, len(values), self.IN_CHUNK):
+                clauses, params = [], []
+                for column in columns:
+                    column_values = values[i:i + self.IN_CHUNK] if column == chunk_column else list(filters_in[column])
+                    clauses.append(f"{column} IN ({', '.join('?' * len(column_values))})")
+                    params.extend(column_values)
+                if cutoff is not None:
+                    clauses.append("cached_at >= ?")
+                    params.append(cutoff)
+
+                query = f"SELECT {', '.join(columns)}, data, timestamp FROM {table_name} WHERE {' AND '.join(clauses)}"
+                with self._lock:
+                    fetched = self._conn.execute(query, params).fetchall()
+                for row in fetched:
+                    record = dict(zip(columns, row[:len(columns)]))
+                    record['data'] = json.loads(row[-2])
+                    record['timestamp'] = row[-1]
+                    rows.append(record)
+            return rows
+        except Exception as e:
+            logger.warning(f"SQLite bulk read error from {table_name}: {e}")
+            return []
+
+    def save_many(self, table_name: str, entries: List[Tuple[Dict[str, str], Any]], batch_size: int = 50) -> bool:
+        if not self.available() or not entries:
+            return False
+
+        try:
+            keys = self._keys(table_name)
+            now = datetime.now(timezone.utc)
+            columns = list(keys) + ['data', 'timestamp', 'cached_at']
+            rows = [
+                tuple(filters[key] for key in keys) + (json.dumps(data), now.isoformat(), now.timestamp())
+                for filters, data in entries
+            ]
+            with self._lock:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {table_name} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    rows
+                )
+                self._conn.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"SQLite write error to {table_name}: {e}")
+            return False
+
+    def delete(self, table_name: str, filters: Optional[Dict[str, Any]] = None) -> bool:
+        if not self.available():
+            return False
+
+        try:
+            self._keys(table_name)
+            clauses, params = [], []
+            for column, value in (filters or {}).items():
+                if isinstance(value, (list, tuple, set)):
+                    value = list(value)
+                    clauses.append(f"{column} IN ({', '.join('?' * len(value))})")
+                    params.extend(value)
+                else:
+                    clauses.append(f"{column} = ?")
+                    params.append(value)
+
+            query = f"DELETE FROM {table_name}"
+            if clauses:
+                query += f" WHERE {' AND '.join(clauses)}"
+            with self._lock:
+                self._conn.execute(query, params)
+                self._conn.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"SQLite delete error from {table_name}: {e}")
+            return False
+
+    def get_bars(self, symbol: str, timeframe: str, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None, last_n: Optional[int] = None) -> Optional[CandleSeries]:
+        if not self.available():
+            return None
+
+        try:
+            clauses, params = ["symbol = ?", "timeframe = ?"], [symbol, timeframe]
+            if start is not None:
+                clauses.append("bar_ts >= ?")
+                params.append(int(start.timestamp()))
+            if end is not None:
+                clauses.append("bar_ts <= ?")
+                params.append(int(end.timestamp()))
+
+            query = (
+                f"SELECT bar_ts, open, high, low, close FROM {BAR_TABLE} WHERE {' AND '.join(clauses)} "
+                f"ORDER BY bar_ts {'DESC' if last_n else 'ASC'}"
+            )
+            if last_n:
+                query += " LIMIT ?"
+                params.append(int(last_n))
+
+            with self._lock:
+                rows = self._conn.execute(query, params).fetchall()
+            if not rows:
+                return None
+            if last_n:
+                rows.reverse()
+            ts, open_, high, low, close = zip(*rows)
+            return CandleSeries(ts, open_, high, low, close, BAR_TZ_OFFSET)
+        except Exception as e:
+            logger.warning(f"SQLite bar read error for {symbol} {timeframe}: {e}")
+            return None
+
+    def upsert_bars(self, symbol: str, timeframe: str, bars: CandleSeries) -> bool:
+        if not self.available() or not len(bars):
+            return False
+
+        try:
+            now = datetime.now(timezone.utc).timestamp()
+            rows = [
+                (symbol, timeframe, t, o, h, l, c, now)
+                for t, o, h, l, c in zip(
+                    bars.ts.tolist(), bars.open.tolist(), bars.high.tolist(), bars.low.tolist(), bars.close.tolist()
+                )
+            ]
+            with self._lock:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {BAR_TABLE} "
+                    "(symbol, timeframe, bar_ts, open, high, low, close, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"SQLite bar write error for {symbol} {timeframe}: {e}")
+            return False
@@ -0,0 +1,177 @@
+"""
+Columnar candle storage module
+Compact OHLC series (int64 epoch seconds + float64 price arrays) used for the
+in-memory and Supabase OHLC caches, with lossless conversion to and from the
+candle dict lists the analysis code and API responses use
+"""
+
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Serialized payload marker stored in ohlc_cache.data; anything else is the legacy dict list
+PAYLOAD_FORMAT = "ohlc-columnar-v1"
+
+class CandleSeries:
+    """
+    Time-ordered OHLC bars held as parallel NumPy arrays
+
+    Timestamps are epoch seconds; `tz_offset` (seconds east of UTC) is the
+    offset the ISO timestamps were written with, so to_dicts() reproduces
+    them exactly. The price arrays can be handed to indicator code directly.
+    """
+
+    __slots__ = ("ts", "open", "high", "low", "close", "tz_offset")
+
+    def __init__(self, ts: np.ndarray, open: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray, tz_offset: int = 0):
+        self.ts = np.asarray(ts, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.tz_offset = int(tz_offset)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __getitem__(self, bars: slice) -> "CandleSeries":
+        """A run of bars, e.g. series[:-1]; shares the arrays (basic slicing makes views)"""
+        if not isinstance(bars, slice):
+            raise TypeError("CandleSeries is indexed by slices; use candle(i) for one bar")
+        return self.take(bars)
+
+    @classmethod
+    def empty(cls) -> "CandleSeries":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), np.empty(0), np.empty(0))
+
+    @property
+    def nbytes(self) -> int:
+        return self.ts.nbytes + self.open.nbytes + self.high.nbytes + self.low.nbytes + self.close.nbytes
+
+    @classmethod
+    def from_dicts(cls, candles: List[Dict]) -> "CandleSeries":
+        """Build from candle dicts ({timestamp, open, close, high, low}).
+
+        The first bar's UTC offset is kept for the whole series (bars are all
+        exchange-local in practice); naive timestamps are taken as UTC.
+        """
+        n = len(candles)
+        ts = np.empty(n, dtype=np.int64)
+        tz_offset = 0
+        for i, candle in enumerate(candles):
+            dt = datetime.fromisoformat(candle["timestamp"].replace('Z', '+00:00'))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            if i == 0:
+                tz_offset = int(dt.utcoffset().total_seconds())
+            ts[i] = int(dt.timestamp())
+
+        return cls(
+            ts,
+            np.fromiter((c["open"] for c in candles), dtype=np.float64, count=n),
+            np.fromiter((c["high"] for c in candles), dtype=np.float64, count=n),
+            np.fromiter((c["low"] for c in candles), dtype=np.float64, count=n),
+            np.fromiter((c["close"] for c in candles), dtype=np.float64, count=n),
+            tz_offset,
+        )
+
+    def to_dicts(self) -> List[Dict]:
+        """Candle dict list identical to the one the series was built from"""
+        tz = timezone(timedelta(seconds=self.tz_offset))
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(t, tz).isoformat(),
+                "open": o,
+                "close": c,
+                "high": h,
+                "low": l,
+            }
+            for t, o, c, h, l in zip(
+                self.ts.tolist(), self.open.tolist(), self.close.tolist(),
+                self.high.tolist(), self.low.tolist()
+            )
+        ]
+
+    def candle(self, i: int) -> Dict:
+        """One bar as a candle dict, as to_dicts() would return it"""
+        tz = timezone(timedelta(seconds=self.tz_offset))
+        return {
+            "timestamp": datetime.fromtimestamp(int(self.ts[i]), tz).isoformat(),
+            "open": float(self.open[i]),
+            "close": float(self.close[i]),
+            "high": float(self.high[i]),
+            "low": float(self.low[i]),
+        }
+
+    def take(self, selector: np.ndarray) -> "CandleSeries":
+        """Bars picked by a boolean mask, index array or slice"""
+        return CandleSeries(
+            self.ts[selector], self.open[selector], self.high[selector], self.low[selector],
+            self.close[selector], self.tz_offset
+        )
+
+    def changed_since(self, previous: Optional["CandleSeries"]) -> "CandleSeries":
+        """Bars that are new or differ from the same bar in `previous` (all bars if there is none)"""
+        if previous is None or not len(previous) or not len(self):
+            return self
+        idx = np.minimum(np.searchsorted(previous.ts, self.ts), len(previous) - 1)
+        unchanged = (
+            (previous.ts[idx] == self.ts)
+            & (previous.open[idx] == self.open)
+            & (previous.high[idx] == self.high)
+            & (previous.low[idx] == self.low)
+            & (previous.close[idx] == self.close)
+        )
+        return self.take(~unchanged)
+
+    def to_payload(self) -> Dict[str, Any]:
+        """JSON-serializable columnar form stored in the cache tables"""
+        return {
+            "format": PAYLOAD_FORMAT,
+            "tz_offset": self.tz_offset,
+            "t": self.ts.tolist(),
+            "o": self.open.tolist(),
+            "h": self.high.tolist(),
+            "l": self.low.tolist(),
+            "c": self.close.tolist(),
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "CandleSeries":
+        return cls(payload["t"], payload["o"], payload["h"], payload["l"], payload["c"], payload.get("tz_offset", 0))
+
+def merge_series(older: CandleSeries, newer: CandleSeries) -> CandleSeries:
+    """Union of two series in time order; where both hold a bar, the newer one wins"""
+    keep = older.take(~np.isin(older.ts, newer.ts))
+    merged = CandleSeries(
+        np.concatenate([keep.ts, newer.ts]),
+        np.concatenate([keep.open, newer.open]),
+        np.concatenate([keep.high, newer.high]),
+        np.concatenate([keep.low, newer.low]),
+        np.concatenate([keep.close, newer.close]),
+        newer.tz_offset,
+    )
+    return merged.take(np.argsort(merged.ts, kind="stable"))
+
+def is_columnar_payload(data: Any) -> bool:
+    return isinstance(data, dict) and data.get("format") == PAYLOAD_FORMAT
+
+def to_series(data: Any) -> Optional[CandleSeries]:
+    """Coerce a cached OHLC value (series, columnar payload or legacy dict list) to a CandleSeries"""
+    if data is None or isinstance(data, CandleSeries):
+        return data
+    if is_columnar_payload(data):
+        return CandleSeries.from_payload(data)
+    return CandleSeries.from_dicts(data)
+
+def to_candles(data: Any) -> Optional[List[Dict]]:
+    """Coerce a cached OHLC value (series, columnar payload or legacy dict list) to candle dicts"""
+    if data is None or isinstance(data, list):
+        return data
+    return to_series(data).to_dicts()
+
+def candle_columns(candles: List[Dict], *fields: str) -> Tuple[np.ndarray, ...]:
+    """Price columns of candle dicts as float64 arrays (missing values become NaN), one per field"""
+    return tuple(np.array([candle[field] for candle in candles], dtype=np.float64) for field in fields)
@@ -1,13 +1,20 @@
 """
 Database module for Supabase operations
-Replaces MongoDB with Supabase PostgreSQL
+Replaces MongoDB with Supabase PostgreSQL; CACHE_BACKEND=sqlite keeps the
+cache tables in an embedded SQLite file instead
 """
 
 from datetime import datetime, timezone, timedelta
 from supabase import create_client, Client
 import os
 import logging
-from typing import Optional, Dict, Any, List
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from candles import CandleSeries, to_series, merge_series
+from cache_backends import CacheBackend, SQLiteCacheBackend, BAR_TABLE, BAR_TZ_OFFSET
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +24,28 @@ IST = timezone(timedelta(hours=5, minutes=30))
 SUPABASE_URL = os.environ.get('VITE_SUPABASE_URL')
 SUPABASE_SERVICE_KEY = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
 
+# Bulk reads: values per `in` filter (keeps the request URL short) and PostgREST's default row cap
+SUPABASE_IN_CHUNK = 100
+SUPABASE_MAX_ROWS = 1000
+# Bulk writes: rows per upsert request (OHLC payloads are large JSON arrays)
+SUPABASE_WRITE_BATCH = 50
+# Rows per upsert request into the per-bar OHLC table (small fixed-size rows)
+SUPABASE_BAR_BATCH = 500
+
+# Write-behind: cache saves are queued and flushed in the background
+CACHE_WRITE_BEHIND = os.environ.get('CACHE_WRITE_BEHIND', 'true').lower() == 'true'
+CACHE_WRITE_QUEUE_MAX = int(os.environ.get('CACHE_WRITE_QUEUE_MAX', '5000'))
+CACHE_WRITE_FLUSH_SECONDS = float(os.environ.get('CACHE_WRITE_FLUSH_SECONDS', '2'))
+
+# Mirror OHLC histories into the normalized ohlc_bars table (one row per bar)
+OHLC_BARS_ENABLED = os.environ.get('OHLC_BARS_ENABLED', 'false').lower() == 'true'
+
+# Persistent cache store: "supabase" (default) or "sqlite"
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'supabase').lower()
+CACHE_SQLITE_PATH = os.environ.get(
+    'CACHE_SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache.db')
+)
+
 supabase: Optional[Client] = None
 SUPABASE_AVAILABLE = False
 
@@ -73,12 +102,28 @@ def get_from_supabase(table_name: str, filters: Dict[str, str], max_age_minutes:
     Returns:
         The cached data or None if not found/expired
     """
+    entry = get_entry_from_supabase(table_name, filters, max_age_minutes)
+    return entry[0] if entry else None
+
+def get_entry_from_supabase(table_name: str, filters: Dict[str, str],
+                            max_age_minutes: Optional[int] = None) -> Optional[Tuple[Any, datetime]]:
+    """
+    Get cached data from Supabase together with the time it was cached
+
+    Args:
+        table_name: Name of the table
+        filters: Dictionary of column:value pairs to filter by
+        max_age_minutes: Maximum age of cache in minutes (None for no expiry check)
+
+    Returns:
+        (data, cached_at in IST) or None if not found/expired
+    """
     if not SUPABASE_AVAILABLE or not supabase:
         return None
 
     try:
-        # Build query
-        query = supabase.table(table_name).select('*')
+        # Only the payload and its timestamp; the age check runs here
+        query = supabase.table(table_name).select('data,timestamp')
 
         # Apply filters
         for column, value in filters.items():
@@ -91,68 +136,120 @@ def get_from_supabase(table_name: str, filters: Dict[str, str], max_age_minutes:
             row = response.data[0]
 
             # Check if cache is still valid
-            if max_age_minutes is not None:
-                if is_cache_valid(row.get('timestamp'), max_age_minutes):
-                    return row.get('data')
-                else:
-                    return None
+            if max_age_minutes is not None and not is_cache_valid(row.get('timestamp'), max_age_minutes):
+                return None
 
-            return row.get('data')
+            cached_at = datetime.fromisoformat(row['timestamp'].replace('Z', '+00:00')).astimezone(IST)
+            return row.get('data'), cached_at
 
         return None
     except Exception as e:
         logger.warning(f"Supabase read error from {table_name}: {e}")
         return None
 
+def get_many_from_supabase(table_name: str, filters_in: Dict[str, List[str]], max_age_minutes: Optional[int] = None,
+                           chunk_column: Optional[str] = None, max_rows: int = SUPABASE_MAX_ROWS) -> List[Dict]:
+    """
+    Get many cached rows from Supabase with `in` filters instead of one query per key
+
+    Args:
+        table_name: Name of the table
+        filters_in: Dictionary of column:[values] pairs; a row matches if each column is in its list
+        max_age_minutes: Only return rows cached within this many minutes (None for no expiry check)
+        chunk_column: Column whose value list is split across queries (defaults to the first one)
+        max_rows: Row limit per query; chunks are sized so each query's result stays within it
+
+    Returns:
+        List of matching rows (filter columns plus data and timestamp), empty on error
+    """
+    if not SUPABASE_AVAILABLE or not supabase or not filters_in:
+        return []
+
+    chunk_column = chunk_column or next(iter(filters_in))
+    values = list(dict.fromkeys(filters_in[chunk_column]))
+    rows_per_value = 1
+    for column, column_values in filters_in.items():
+        if column != chunk_column:
+            rows_per_value *= max(1, len(column_values))
+    chunk_size = max(1, min(SUPABASE_IN_CHUNK, max_rows // rows_per_value))
+
+    columns = ','.join(list(filters_in.keys()) + ['data', 'timestamp'])
+    cutoff = None
+    if max_age_minutes is not None:
+        cutoff = (datetime.now(timezone.utc) - timedelta(minutes=max_age_minutes)).isoformat()
+
+    rows = []
+    for i in range(0, len(values), chunk_size):
+        try:
+            query = supabase.table(table_name).select(columns)
+            for column, column_values in filters_in.items():
+                query = query.in_(column, values[i:i + chunk_size] if column == chunk_column else list(column_values))
+            if cutoff:
+                query = query.gte('timestamp', cutoff)
+            response = query.limit(max_rows).execute()
+            rows.extend(response.data or [])
+        except Exception as e:
+            logger.warning(f"Supabase bulk read error from {table_name}: {e}")
+
+    return rows
+
 def save_to_supabase(table_name: str, filters: Dict[str, str], data: Any) -> bool:
     """
     Save data to Supabase cache (upsert operation)
 
     Args:
         table_name: Name of the table
-        filters: Dictionary of column:value pairs to identify the row
+        filters: Dictionary of column:value pairs to identify the row (the table's unique key)
         data: The data to cache
 
     Returns:
         True if successful, False otherwise
     """
-    if not SUPABASE_AVAILABLE or not supabase:
-        return False
-
-    try:
-        # Prepare the record
-        record = {
-            **filters,
-            'data': data,
-            'timestamp': datetime.now(timezone.utc).isoformat(),
-            'updated_at': datetime.now(timezone.utc).isoformat()
-        }
+    return save_many_to_supabase(table_name, [(filters, data)])
 
-        # Try to upsert (insert or update)
-        # First, check if record exists
-        existing = supabase.table(table_name).select('id').match(filters).execute()
+def save_many_to_supabase(table_name: str, entries: List[Tuple[Dict[str, str], Any]],
+                          batch_size: int = SUPABASE_WRITE_BATCH) -> bool:
+    """
+    Save many cache rows with native upserts, `batch_size` rows per request
 
-        if existing.data and len(existing.data) > 0:
-            # Update existing record
-            row_id = existing.data[0]['id']
-            supabase.table(table_name).update(record).eq('id', row_id).execute()
-        else:
-            # Insert new record
-            record['created_at'] = datetime.now(timezone.utc).isoformat()
-            supabase.table(table_name).insert(record).execute()
+    Args:
+        table_name: Name of the table
+        entries: List of (filters, data) pairs; every filters dict must use the same
+                 columns, which must match a unique constraint on the table
+        batch_size: Maximum rows sent in one request
 
-        return True
-    except Exception as e:
-        logger.warning(f"Supabase write error to {table_name}: {e}")
+    Returns:
+        True if every batch was written, False otherwise
+    """
+    if not SUPABASE_AVAILABLE or not supabase or not entries:
         return False
 
-def delete_from_supabase(table_name: str, filters: Optional[Dict[str, str]] = None) -> bool:
+    # created_at is left to its column default so updates keep the original value
+    now = datetime.now(timezone.utc).isoformat()
+    records = [
+        {**filters, 'data': data, 'timestamp': now, 'updated_at': now}
+        for filters, data in entries
+    ]
+    on_conflict = ','.join(entries[0][0].keys())
+
+    ok = True
+    for i in range(0, len(records), batch_size):
+        try:
+            supabase.table(table_name).upsert(records[i:i + batch_size], on_conflict=on_conflict).execute()
+        except Exception as e:
+            logger.warning(f"Supabase write error to {table_name}: {e}")
+            ok = False
+
+    return ok
+
+def delete_from_supabase(table_name: str, filters: Optional[Dict[str, Any]] = None) -> bool:
     """
-    Delete records from Supabase
+    Delete records from Supabase in a single statement
 
     Args:
         table_name: Name of the table
-        filters: Dictionary of column:value pairs to filter by (None to delete all)
+        filters: Dictionary of column:value pairs to filter by; a list value matches
+                 any of its items (None to delete all)
 
     Returns:
         True if successful, False otherwise
@@ -166,71 +263,545 @@ def delete_from_supabase(table_name: str, filters: Optional[Dict[str, str]] = No
         if filters:
             # Apply filters
             for column, value in filters.items():
-                query = query.eq(column, value)
+                if isinstance(value, (list, tuple, set)):
+                    query = query.in_(column, list(value))
+                else:
+                    query = query.eq(column, value)
         else:
-            # Delete all - use a condition that's always true
-            # In Supabase, we need to use a filter, so we'll get all IDs first
-            all_records = supabase.table(table_name).select('id').execute()
-            if all_records.data:
-                for record in all_records.data:
-                    supabase.table(table_name).delete().eq('id', record['id']).execute()
+            # Delete all - PostgREST refuses unfiltered deletes, so use a
+            # condition that matches every row (ohlc_bars has no id column)
+            query = query.not_.is_('symbol' if table_name == BAR_TABLE else 'id', 'null')
 
+        query.execute()
         return True
     except Exception as e:
         logger.warning(f"Supabase delete error from {table_name}: {e}")
         return False
 
+def table_exists_in_supabase(table_name: str) -> bool:
+    """
+    Check whether a table exists (e.g. ohlc_bars before its migration is applied)
+
+    Returns:
+        True if a one-row read succeeds, False otherwise
+    """
+    if not SUPABASE_AVAILABLE or not supabase:
+        return False
+
+    try:
+        supabase.table(table_name).select('*').limit(1).execute()
+        return True
+    except Exception as e:
+        logger.info(f"Supabase table {table_name} not available: {e}")
+        return False
+
+def truncate_cache_tables(tables: List[str]) -> bool:
+    """
+    Empty cache tables via the clear_cache_tables RPC (TRUNCATE, constant time)
+
+    Returns:
+        True if successful, False if the RPC is unavailable or failed
+    """
+    if not SUPABASE_AVAILABLE or not supabase:
+        return False
+
+    try:
+        supabase.rpc('clear_cache_tables', {'table_names': tables}).execute()
+        return True
+    except Exception as e:
+        logger.warning(f"Supabase truncate RPC failed, falling back to bulk delete: {e}")
+        return False
+
+def get_bars_from_supabase(symbol: str, timeframe: str, start: Optional[datetime] = None,
+                           end: Optional[datetime] = None, last_n: Optional[int] = None) -> Optional[CandleSeries]:
+    """
+    Read bars of one series from the ohlc_bars table
+
+    Args:
+        symbol: Stock symbol
+        timeframe: Timeframe (or download source) of the series
+        start, end: Inclusive bar time bounds (None for unbounded)
+        last_n: Only the most recent `last_n` bars
+
+    Returns:
+        CandleSeries in time order, or None if no bars matched or on error
+    """
+    if not SUPABASE_AVAILABLE or not supabase:
+        return None
+
+    try:
+        rows = []
+        # PostgREST caps each response at SUPABASE_MAX_ROWS, so page through long ranges
+        while True:
+            limit = SUPABASE_MAX_ROWS if last_n is None else min(SUPABASE_MAX_ROWS, last_n - len(rows))
+            query = (
+                supabase.table(BAR_TABLE)
+                .select('bar_ts,open,high,low,close')
+                .eq('symbol', symbol)
+                .eq('timeframe', timeframe)
+            )
+            if start is not None:
+                query = query.gte('bar_ts', start.isoformat())
+            if end is not None:
+                query = query.lte('bar_ts', end.isoformat())
+            page = (
+                query.order('bar_ts', desc=last_n is not None)
+                .range(len(rows), len(rows) + limit - 1)
+                .execute()
+                .data or []
+            )
+            rows.extend(page)
+            if len(page) < limit or (last_n is not None and len(rows) >= last_n):
+                break
+
+        if not rows:
+            return None
+        if last_n is not None:
+            rows.reverse()
+
+        return CandleSeries(
+            [int(datetime.fromisoformat(row['bar_ts'].replace('Z', '+00:00')).timestamp()) for row in rows],
+            [row['open'] for row in rows],
+            [row['high'] for row in rows],
+            [row['low'] for row in rows],
+            [row['close'] for row in rows],
+            BAR_TZ_OFFSET,
+        )
+    except Exception as e:
+        logger.warning(f"Supabase bar read error for {symbol} {timeframe}: {e}")
+        return None
+
+def upsert_bars_to_supabase(symbol: str, timeframe: str, bars: CandleSeries,
+                            batch_size: int = SUPABASE_BAR_BATCH) -> bool:
+    """
+    Insert or update bars of one series in the ohlc_bars table
+
+    Only the given bars are sent, so an incremental refresh writes the new and
+    changed bars instead of the whole history.
+
+    Returns:
+        True if every batch was written, False otherwise
+    """
+    if not SUPABASE_AVAILABLE or not supabase or not len(bars):
+        return False
+
+    now = datetime.now(timezone.utc).isoformat()
+    records = [
+        {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'bar_ts': datetime.fromtimestamp(t, timezone.utc).isoformat(),
+            'open': o,
+            'high': h,
+            'low': l,
+            'close': c,
+            'updated_at': now,
+        }
+        for t, o, h, l, c in zip(
+            bars.ts.tolist(), bars.open.tolist(), bars.high.tolist(), bars.low.tolist(), bars.close.tolist()
+        )
+    ]
+
+    ok = True
+    for i in range(0, len(records), batch_size):
+        try:
+            supabase.table(BAR_TABLE).upsert(
+                records[i:i + batch_size], on_conflict='symbol,timeframe,bar_ts'
+            ).execute()
+        except Exception as e:
+            logger.warning(f"Supabase bar write error for {symbol} {timeframe}: {e}")
+            ok = False
+
+    return ok
+
+class SupabaseCacheBackend(CacheBackend):
+    """Cache tables in Supabase PostgreSQL, via the PostgREST helpers above"""
+
+    name = "supabase"
+
+    def init(self) -> bool:
+        return init_supabase()
+
+    def available(self) -> bool:
+        return SUPABASE_AVAILABLE and supabase is not None
+
+    def has_table(self, table_name: str) -> bool:
+        return table_exists_in_supabase(table_name)
+
+    def get_entry(self, table_name: str, filters: Dict[str, str],
+                  max_age_minutes: Optional[int] = None) -> Optional[Tuple[Any, datetime]]:
+        return get_entry_from_supabase(table_name, filters, max_age_minutes)
+
+    def get_many(self, table_name: str, filters_in: Dict[str, List[str]],
+                 max_age_minutes: Optional[int] = None) -> List[Dict]:
+        return get_many_from_supabase(table_name, filters_in, max_age_minutes)
+
+    def save_many(self, table_name: str, entries: List[Tuple[Dict[str, str], Any]],
+                  batch_size: int = SUPABASE_WRITE_BATCH) -> bool:
+        return save_many_to_supabase(table_name, entries, batch_size)
+
+    def delete(self, table_name: str, filters: Optional[Dict[str, Any]] = None) -> bool:
+        return delete_from_supabase(table_name, filters)
+
+    def clear(self, table_names: List[str]) -> bool:
+        # Prefer TRUNCATE through the RPC; older databases without the migration
+        # fall back to one bulk delete per table
+        return truncate_cache_tables(table_names) or super().clear(table_names)
+
+    def get_bars(self, symbol: str, timeframe: str, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None, last_n: Optional[int] = None) -> Optional[CandleSeries]:
+        return get_bars_from_supabase(symbol, timeframe, start, end, last_n)
+
+    def upsert_bars(self, symbol: str, timeframe: str, bars: CandleSeries) -> bool:
+        return upsert_bars_to_supabase(symbol, timeframe, bars)
+
+def create_cache_backend() -> CacheBackend:
+    """Build the backend selected by CACHE_BACKEND ("supabase" or "sqlite")"""
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCacheBackend(CACHE_SQLITE_PATH)
+    if CACHE_BACKEND != "supabase":
+        logger.warning(f"Unknown CACHE_BACKEND '{CACHE_BACKEND}', using supabase")
+    return SupabaseCacheBackend()
+
+cache_backend = create_cache_backend()
+
+def init_cache_backend() -> bool:
+    """Connect the configured cache backend"""
+    return cache_backend.init()
+
+def cache_backend_available() -> bool:
+    return cache_backend.available()
+
+# Converts a queued value to the stored payload at flush time, off the caller's thread
+PAYLOAD_ENCODERS: Dict[str, Callable[[Any], Any]] = {
+    'ohlc_cache': lambda data: to_series(data).to_payload(),
+}
+
+def encode_payload(table_name: str, data: Any) -> Any:
+    encoder = PAYLOAD_ENCODERS.get(table_name)
+    return encoder(data) if encoder else data
+
+# Combines two queued writes of the same key; tables without a merger keep only the latest
+PAYLOAD_MERGERS: Dict[str, Callable[[Any, Any], Any]] = {
+    # Queued bar deltas must all reach the table, not just the last one
+    BAR_TABLE: merge_series,
+}
+
+def save_bar_entries(entries: List[Tuple[Dict[str, str], CandleSeries]]) -> bool:
+    """Upsert queued ({symbol, timeframe}, bars) deltas into the per-bar table"""
+    return all([cache_backend.upsert_bars(filters['symbol'], filters['timeframe'], bars) for filters, bars in entries])
+
+# Tables not written with cache_backend.save_many
+TABLE_WRITERS: Dict[str, Callable[[List[Tuple[Dict[str, str], Any]]], bool]] = {
+    BAR_TABLE: save_bar_entries,
+}
+
+def save_entries(table_name: str, entries: List[Tuple[Dict[str, str], Any]],
+                 batch_size: int = SUPABASE_WRITE_BATCH) -> bool:
+    """Write (filters, data) entries through the table's writer or the backend's upsert"""
+    writer = TABLE_WRITERS.get(table_name)
+    if writer:
+        return writer(entries)
+    return cache_backend.save_many(table_name, entries, batch_size)
+
+class WriteBehindQueue:
+    """
+    Background writer for cache rows
+
+    put() returns immediately; a daemon thread upserts queued rows through
+    the cache backend every `flush_interval` seconds or as soon as a full
+    batch is waiting. Writes to the same key are coalesced, so only the latest
+    value is sent. At `max_pending` keys, put() blocks until the flusher
+    catches up (bounded memory, backpressure instead of dropped writes).
+    """
+
+    def __init__(self, max_pending: int = CACHE_WRITE_QUEUE_MAX, flush_interval: float = CACHE_WRITE_FLUSH_SECONDS,
+                 batch_size: int = SUPABASE_WRITE_BATCH):
+        self.max_pending = max(1, max_pending)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: "OrderedDict[Tuple, Tuple[str, Dict[str, str], Any]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._flushing = 0
+
+        # Metrics
+        self._queued = 0
+        self._coalesced = 0
+        self._written = 0
+        self._failed = 0
+
+    def put(self, table_name: str, filters: Dict[str, str], data: Any):
+        key = (table_name, tuple(sorted(filters.items())))
+        with self._cond:
+            self._ensure_thread()
+            while key not in self._pending and len(self._pending) >= self.max_pending and not self._stopping:
+                self._cond.wait()
+
+            if key in self._pending:
+                self._coalesced += 1
+                merge = PAYLOAD_MERGERS.get(table_name)
+                if merge:
+                    data = merge(self._pending[key][2], data)
+                del self._pending[key]
+            self._pending[key] = (table_name, filters, data)
+            self._queued += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="cache-write-behind", daemon=True)
+            self._thread.start()
+
+    def _take_all(self) -> List[Tuple[str, Dict[str, str], Any]]:
+        items = list(self._pending.values())
+        self._pending.clear()
+        self._flushing += 1
+        self._cond.notify_all()
+        return items
+
+    def _write(self, items: List[Tuple[str, Dict[str, str], Any]]):
+        by_table: Dict[str, List[Tuple[Dict[str, str], Any]]] = {}
+        for table_name, filters, data in items:
+            try:
+                by_table.setdefault(table_name, []).append((filters, encode_payload(table_name, data)))
+            except Exception as e:
+                logger.warning(f"Dropping unencodable cache write to {table_name}: {e}")
+                self._failed += 1
+
+        for table_name, entries in by_table.items():
+            if save_entries(table_name, entries, self.batch_size):
+                self._written += len(entries)
+            else:
+                self._failed += len(entries)
+
+    def _finish_write(self):
+        with self._cond:
+            self._flushing -= 1
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._pending) < self.batch_size and not self._stopping:
+                    # Let small bursts accumulate; put() wakes us once a full batch is waiting
+                    self._cond.wait(self.flush_interval)
+                if not self._pending:
+                    if self._stopping:
+                        return
+                    continue
+                items = self._take_all()
+
+            try:
+                self._write(items)
+            except Exception as e:
+                logger.warning(f"Cache write-behind flush failed: {e}")
+            finally:
+                self._finish_write()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued so far from the calling thread; waits for an in-progress flush"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            items = self._take_all()
+        try:
+            if items:
+                self._write(items)
+        finally:
+            self._finish_write()
+
+        with self._cond:
+            while self._flushing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def discard(self, table_names: List[str], timeout: Optional[float] = None) -> bool:
+        """Drop queued writes for tables that are being cleared; waits for an in-progress flush to land"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            for key in [k for k in self._pending if k[0] in table_names]:
+                del self._pending[key]
+            self._cond.notify_all()
+
+            while self._flushing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 30.0):
+        """Flush remaining writes and stop the background thread"""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "max_pending": self.max_pending,
+                "queued": self._queued,
+                "coalesced": self._coalesced,
+                "written": self._written,
+                "failed": self._failed
+            }
+
+write_queue = WriteBehindQueue()
+
+def queue_cache_write(table_name: str, filters: Dict[str, str], data: Any) -> bool:
+    """Save a cache row in the background (or synchronously with CACHE_WRITE_BEHIND=false)"""
+    if not cache_backend.available():
+        return False
+    if not CACHE_WRITE_BEHIND:
+        return save_entries(table_name, [(filters, encode_payload(table_name, data))])
+    write_queue.put(table_name, filters, data)
+    return True
+
+def flush_cache_writes(timeout: Optional[float] = None) -> bool:
+    """Block until every queued cache write has been sent"""
+    return write_queue.flush(timeout)
+
+def stop_cache_writer(timeout: float = 30.0):
+    """Flush queued cache writes and stop the background writer (call on shutdown)"""
+    write_queue.stop(timeout)
+
 # Table-specific helper functions for backward compatibility
 
-def get_ohlc_cache(symbol: str, timeframe: str, max_age_minutes: int = 15) -> Optional[List]:
-    """Get OHLC data from cache"""
-    return get_from_supabase('ohlc_cache', {'symbol': symbol, 'timeframe': timeframe}, max_age_minutes)
+# OHLC rows are stored as the columnar CandleSeries payload; rows written before
+# that (plain candle dict lists) are still read transparently
 
-def save_ohlc_cache(symbol: str, timeframe: str, data: List) -> bool:
-    """Save OHLC data to cache"""
-    return save_to_supabase('ohlc_cache', {'symbol': symbol, 'timeframe': timeframe}, data)
+def get_ohlc_cache(symbol: str, timeframe: str, max_age_minutes: float = 15) -> Optional[CandleSeries]:
+    """Get OHLC data from cache"""
+    return to_series(cache_backend.get('ohlc_cache', {'symbol': symbol, 'timeframe': timeframe}, max_age_minutes))
+
+def get_ohlc_cache_entry(symbol: str, timeframe: str,
+                         max_age_minutes: Optional[float] = None) -> Optional[Tuple[CandleSeries, datetime]]:
+    """Get OHLC data from cache with the time it was cached, so one read can be graded fresh or stale"""
+    entry = cache_backend.get_entry('ohlc_cache', {'symbol': symbol, 'timeframe': timeframe}, max_age_minutes)
+    return (to_series(entry[0]), entry[1]) if entry else None
+
+def save_ohlc_cache(symbol: str, timeframe: str, data: Any) -> bool:
+    """Save OHLC data (CandleSeries or candle dicts) to cache"""
+    return queue_cache_write('ohlc_cache', {'symbol': symbol, 'timeframe': timeframe}, data)
+
+def get_ohlc_cache_bulk(symbols: List[str], timeframes: List[str], max_age_minutes: Optional[int] = 1440) -> List[Dict]:
+    """Get OHLC cache rows for every symbol/timeframe pair in a few queries (data as CandleSeries)"""
+    rows = cache_backend.get_many('ohlc_cache', {'symbol': symbols, 'timeframe': timeframes}, max_age_minutes)
+    for row in rows:
+        try:
+            row['data'] = to_series(row.get('data'))
+        except Exception as e:
+            logger.warning(f"Unreadable OHLC cache row {row.get('symbol')} {row.get('timeframe')}: {e}")
+            row['data'] = None
+    return rows
+
+def save_ohlc_cache_many(entries: List[Tuple[str, str, Any]]) -> bool:
+    """Save many (symbol, timeframe, candles) OHLC entries in batched upserts"""
+    if not CACHE_WRITE_BEHIND:
+        return cache_backend.save_many(
+            'ohlc_cache',
+            [({'symbol': symbol, 'timeframe': timeframe}, encode_payload('ohlc_cache', data))
+             for symbol, timeframe, data in entries]
+        )
+    return all([save_ohlc_cache(symbol, timeframe, data) for symbol, timeframe, data in entries])
+
+def get_ohlc_bars(symbol: str, timeframe: str, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> Optional[CandleSeries]:
+    """Get the bars of one OHLC series within [start, end] from the per-bar table"""
+    return cache_backend.get_bars(symbol, timeframe, start, end)
+
+def get_last_ohlc_bars(symbol: str, timeframe: str, n: int) -> Optional[CandleSeries]:
+    """Get the most recent `n` bars of one OHLC series from the per-bar table"""
+    return cache_backend.get_bars(symbol, timeframe, last_n=n)
+
+def append_ohlc_bars(symbol: str, timeframe: str, bars: CandleSeries) -> bool:
+    """Upsert new or changed bars of one OHLC series; bars not given are left as they are"""
+    if not OHLC_BARS_ENABLED or not len(bars):
+        return False
+    return queue_cache_write(BAR_TABLE, {'symbol': symbol, 'timeframe': timeframe}, bars)
 
 def get_fundamentals_cache(symbol: str, max_age_minutes: int = 1440) -> Optional[Dict]:
     """Get fundamentals data from cache"""
-    return get_from_supabase('fundamentals_cache', {'symbol': symbol}, max_age_minutes)
+    return cache_backend.get('fundamentals_cache', {'symbol': symbol}, max_age_minutes)
+
+def get_fundamentals_cache_entry(symbol: str, max_age_minutes: Optional[int] = None) -> Optional[Tuple[Dict, datetime]]:
+    """Get fundamentals data from cache with the time it was cached"""
+    return cache_backend.get_entry('fundamentals_cache', {'symbol': symbol}, max_age_minutes)
 
 def save_fundamentals_cache(symbol: str, data: Dict) -> bool:
     """Save fundamentals data to cache"""
-    return save_to_supabase('fundamentals_cache', {'symbol': symbol}, data)
+    return queue_cache_write('fundamentals_cache', {'symbol': symbol}, data)
+
+def get_fundamentals_cache_bulk(symbols: List[str], max_age_minutes: Optional[int] = 10080) -> List[Dict]:
+    """Get fundamentals cache rows for many symbols in a few queries"""
+    return cache_backend.get_many('fundamentals_cache', {'symbol': symbols}, max_age_minutes)
 
 def get_institutional_cache(symbol: str, max_age_minutes: int = 129600) -> Optional[Dict]:
     """Get institutional holdings data from cache"""
-    return get_from_supabase('institutional_cache', {'symbol': symbol}, max_age_minutes)
+    return cache_backend.get('institutional_cache', {'symbol': symbol}, max_age_minutes)
+
+def get_institutional_cache_entry(symbol: str, max_age_minutes: Optional[int] = 129600) -> Optional[Tuple[Any, datetime]]:
+    """Get institutional holdings data from cache with the time it was cached"""
+    return cache_backend.get_entry('institutional_cache', {'symbol': symbol}, max_age_minutes)
 
 def save_institutional_cache(symbol: str, data: Dict) -> bool:
     """Save institutional holdings data to cache"""
-    return save_to_supabase('institutional_cache', {'symbol': symbol}, data)
+    return queue_cache_write('institutional_cache', {'symbol': symbol}, data)
+
+def get_institutional_cache_bulk(symbols: List[str], max_age_minutes: Optional[int] = 129600) -> List[Dict]:
+    """Get institutional holdings cache rows for many symbols in a few queries"""
+    return cache_backend.get_many('institutional_cache', {'symbol': symbols}, max_age_minutes)
+
+def get_analysis_cache(symbol: str, max_age_minutes: int = 10080) -> Optional[Dict]:
+    """Get a cached analysis result ({fingerprint, result}) from cache"""
+    return cache_backend.get('analysis_cache', {'symbol': symbol}, max_age_minutes)
+
+def save_analysis_cache(symbol: str, data: Dict) -> bool:
+    """Save an analysis result with the fingerprint of its inputs to cache"""
+    return queue_cache_write('analysis_cache', {'symbol': symbol}, data)
+
+def get_analysis_cache_bulk(symbols: List[str], max_age_minutes: Optional[int] = 10080) -> List[Dict]:
+    """Get cached analysis results for many symbols in a few queries"""
+    return cache_backend.get_many('analysis_cache', {'symbol': symbols}, max_age_minutes)
 
 def get_stock_list(list_type: str, max_age_minutes: Optional[int] = 1440) -> Optional[Any]:
     """Get stock list from cache"""
-    return get_from_supabase('stock_lists', {'list_type': list_type}, max_age_minutes)
+    return cache_backend.get('stock_lists', {'list_type': list_type}, max_age_minutes)
+
+def get_stock_list_entry(list_type: str, max_age_minutes: Optional[int] = 1440) -> Optional[Tuple[Any, datetime]]:
+    """Get stock list from cache with the time it was cached"""
+    return cache_backend.get_entry('stock_lists', {'list_type': list_type}, max_age_minutes)
 
 def save_stock_list(list_type: str, data: Any) -> bool:
     """Save stock list to cache"""
-    return save_to_supabase('stock_lists', {'list_type': list_type}, data)
+    return cache_backend.save('stock_lists', {'list_type': list_type}, data)
 
 def clear_all_caches() -> bool:
     """Clear all cache tables"""
-    if not SUPABASE_AVAILABLE or not supabase:
+    if not cache_backend.available():
         return False
 
-    try:
-        # Clear each cache table
-        tables = ['ohlc_cache', 'fundamentals_cache', 'institutional_cache']
+    tables = ['ohlc_cache', 'fundamentals_cache', 'institutional_cache', 'analysis_cache']
+    # Bars written while OHLC_BARS_ENABLED was on must not outlive a clear after it is turned off
+    if cache_backend.has_table(BAR_TABLE):
+        tables.append(BAR_TABLE)
 
-        for table in tables:
-            all_records = supabase.table(table).select('id').execute()
-            if all_records.data:
-                for record in all_records.data:
-                    supabase.table(table).delete().eq('id', record['id']).execute()
+    # Queued writes would repopulate the tables right after clearing
+    write_queue.discard(tables)
 
-        logger.info("All Supabase caches cleared")
+    if cache_backend.clear(tables):
+        logger.info(f"All {cache_backend.name} caches cleared")
         return True
-    except Exception as e:
-        logger.warning(f"Error clearing Supabase caches: {e}")
-        return False
+
+    logger.warning(f"Error clearing {cache_backend.name} caches")
+    return False
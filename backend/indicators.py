@@ -0,0 +1,271 @@
+"""
+Technical indicator kernels
+Array implementations of the indicators the analysis reports (RSI, ADX,
+ATR/Supertrend, Bollinger %B), computed on float64 OHLC arrays and matching
+the ta library's results, plus a fused entry point computing them together
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+UP = 1
+DOWN = -1
+
+# Full series, or just its last value with last_only
+Values = Union[np.ndarray, float]
+
+def _shift(values: np.ndarray) -> np.ndarray:
+    """values moved one bar later, NaN at the first bar"""
+    shifted = np.empty_like(values)
+    shifted[0] = np.nan
+    shifted[1:] = values[:-1]
+    return shifted
+
+def _ewm_mean(values: List[float], alpha: float, min_periods: int, out: Optional[np.ndarray] = None) -> float:
+    """
+    pandas' ewm(alpha=..., adjust=False).mean() recurrence, step for step
+
+    pandas turns alpha into a center of mass and back, and renormalizes
+    every step, so both are reproduced to get identical floats. Fills `out`
+    when given; returns the last value.
+    """
+    com = (1.0 - alpha) / alpha
+    alpha = 1.0 / (1.0 + com)
+    old_wt_factor = 1.0 - alpha
+    nan = float("nan")
+
+    weighted = values[0]
+    nobs = int(weighted == weighted)
+    old_wt = 1.0
+    last = weighted if nobs >= min_periods else nan
+    if out is not None:
+        out[0] = last
+    for i in range(1, len(values)):
+        cur = values[i]
+        is_observation = cur == cur
+        nobs += is_observation
+        if weighted == weighted:
+            old_wt *= old_wt_factor
+            if is_observation:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_observation:
+            weighted = cur
+        last = weighted if nobs >= min_periods else nan
+        if out is not None:
+            out[i] = last
+    return last
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """max(high - low, |high - previous close|, |low - previous close|), NaN-skipping like pandas"""
+    prev_close = _shift(close)
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+def average_true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14) -> np.ndarray:
+    """
+    Wilder ATR as ta.volatility.AverageTrueRange computes it
+
+    Seeded with the mean true range of the first `window` bars; like ta, the
+    bars before that are 0 rather than NaN.
+    """
+    tr = true_range(high, low, close)
+    atr = np.zeros(len(tr))
+    if len(tr) < window:
+        return atr
+
+    seed = tr[:window]
+    seed = seed[~np.isnan(seed)]
+    value = float(seed.mean()) if len(seed) else float("nan")
+    atr[window - 1] = value
+    for i, current in enumerate(tr[window:].tolist(), start=window):
+        value = (value * (window - 1) + current) / float(window)
+        atr[i] = value
+    return atr
+
+def supertrend(high: np.ndarray, low: np.ndarray, close: np.ndarray, atr_period: int = 10,
+               multiplier: float = 3.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Supertrend level and direction for every bar
+
+    Basic bands are the bar midpoint -/+ multiplier x ATR. Each bar carries the
+    previous level forward as its final band while the trend holds, and flips
+    to the opposite band when the close crosses it. Returns (level, direction)
+    with direction UP/DOWN, or 0 and a NaN level before the first bar with an
+    ATR.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    bars = len(close)
+    level = np.full(bars, np.nan)
+    direction = np.zeros(bars, dtype=np.int8)
+    if bars == 0:
+        return level, direction
+
+    atr = average_true_range(high, low, close, atr_period)
+    valid = np.flatnonzero(~np.isnan(atr))
+    if not len(valid):
+        return level, direction
+
+    midpoint = (high + low) / 2
+    upper = (midpoint + multiplier * atr).tolist()
+    lower = (midpoint - multiplier * atr).tolist()
+    closes = close.tolist()
+
+    first = int(valid[0])
+    prev_level, prev_direction = lower[first], UP
+    level[first], direction[first] = prev_level, prev_direction
+    for i in range(first + 1, bars):
+        curr_lower, curr_upper = lower[i], upper[i]
+        if prev_level != prev_level:  # NaN
+            prev_level, prev_direction = curr_lower, UP
+        else:
+            if curr_lower > prev_level:
+                final_lower = curr_lower
+            else:
+                final_lower = prev_level if prev_direction == UP else curr_lower
+
+            if curr_upper < prev_level:
+                final_upper = curr_upper
+            else:
+                final_upper = prev_level if prev_direction == DOWN else curr_upper
+
+            if prev_direction == UP:
+                if closes[i] <= final_lower:
+                    prev_level, prev_direction = final_upper, DOWN
+                else:
+                    prev_level = final_lower
+            elif closes[i] >= final_upper:
+                prev_level, prev_direction = final_lower, UP
+            else:
+                prev_level = final_upper
+        level[i], direction[i] = prev_level, prev_direction
+    return level, direction
+
+def rsi(close: np.ndarray, window: int = 14, last_only: bool = False) -> Values:
+    """RSI as ta.momentum.RSIIndicator: Wilder-smoothed gains over losses, NaN for the first bars"""
+    close = np.asarray(close, dtype=np.float64)
+    diff = close - _shift(close)
+    up = np.where(diff > 0, diff, 0.0).tolist()
+    down = (-np.where(diff < 0, diff, 0.0)).tolist()
+
+    if last_only:
+        ema_up = _ewm_mean(up, 1 / window, window)
+        ema_down = _ewm_mean(down, 1 / window, window)
+        return 100.0 if ema_down == 0 else 100 - (100 / (1 + ema_up / ema_down))
+
+    ema_up = np.empty(len(close))
+    ema_down = np.empty(len(close))
+    _ewm_mean(up, 1 / window, window, ema_up)
+    _ewm_mean(down, 1 / window, window, ema_down)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ema_down == 0, 100.0, 100 - (100 / (1 + ema_up / ema_down)))
+
+def _wilder_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """ta's running Wilder sums for ADX: seeded with the first `window` valid values, last slot left 0"""
+    sums = np.zeros(len(values) - (window - 1))
+    sums[0] = values[~np.isnan(values)][:window].sum()
+    running = float(sums[0])
+    tail = values.tolist()
+    for i in range(1, len(sums) - 1):
+        running = running - (running / float(window)) + tail[window + i]
+        sums[i] = running
+    return sums
+
+def adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14, last_only: bool = False) -> Values:
+    """
+    ADX as ta.trend.ADXIndicator(...).adx()
+
+    Follows ta's own indexing (its first `window` values are 0). ta needs at
+    least 2 x window bars; with fewer, the result is NaN.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) < 2 * window:
+        return float("nan") if last_only else np.full(len(close), np.nan)
+
+    prev_close = _shift(close)
+    tr = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+    diff_up = high - _shift(high)
+    diff_down = _shift(low) - low
+    pos = np.abs(((diff_up > diff_down) & (diff_up > 0)) * diff_up)
+    neg = np.abs(((diff_down > diff_up) & (diff_down > 0)) * diff_down)
+
+    trs = _wilder_sums(tr, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dip = np.where(trs != 0, 100 * (_wilder_sums(pos, window) / trs), 0.0)
+        din = np.where(trs != 0, 100 * (_wilder_sums(neg, window) / trs), 0.0)
+        total = dip + din
+        directional_index = np.where(total != 0, 100 * np.abs((dip - din) / total), 0.0)
+
+    value = float(directional_index[0:window].mean())
+    dx = directional_index.tolist()
+    if last_only:
+        for i in range(window + 1, len(trs)):
+            value = ((value * (window - 1)) + dx[i - 1]) / float(window)
+        return value
+
+    series = np.zeros(len(close))
+    offset = window - 1
+    series[offset + window] = value
+    for i in range(window + 1, len(trs)):
+        value = ((value * (window - 1)) + dx[i - 1]) / float(window)
+        series[offset + i] = value
+    return series
+
+def bollinger_pct_b(close: np.ndarray, window: int = 20, window_dev: float = 2.0, last_only: bool = False) -> Values:
+    """
+    Bollinger %B in percent: (close - lower) / (upper - lower) x 100
+
+    Bands are the `window`-bar mean -/+ window_dev population (ddof=0)
+    standard deviations, as ta.volatility.BollingerBands. NaN before the
+    first full window and where the bands have zero width.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) < window:
+        return float("nan") if last_only else np.full(len(close), np.nan)
+
+    windows = close[-window:][None, :] if last_only else np.lib.stride_tricks.sliding_window_view(close, window)
+    mean = windows.mean(axis=1)
+    std = windows.std(axis=1)
+    upper = mean + window_dev * std
+    lower = mean - window_dev * std
+    width = upper - lower
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_b = np.where(width != 0, (close[window - 1:][-len(width):] - lower) / width * 100, np.nan)
+    if last_only:
+        return float(pct_b[-1])
+    return np.concatenate((np.full(window - 1, np.nan), pct_b))
+
+def compute_indicators(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                       rsi_period: Optional[int] = None, adx_period: Optional[int] = None,
+                       atr_period: Optional[int] = None, multiplier: float = 3.0,
+                       bb_period: Optional[int] = None, bb_std_dev: float = 2.0,
+                       last_only: bool = True) -> Dict[str, Values]:
+    """
+    Several indicators over one set of OHLC arrays
+
+    Each indicator whose period is given is computed from the same arrays:
+    "rsi", "adx", "supertrend" / "supertrend_direction" and "bb_pct". With
+    last_only (the default) only each indicator's latest value is returned,
+    so nothing full-length is kept beyond the recurrences' working arrays.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    results: Dict[str, Values] = {}
+    if rsi_period is not None:
+        results["rsi"] = rsi(close, rsi_period, last_only)
+    if adx_period is not None:
+        results["adx"] = adx(high, low, close, adx_period, last_only)
+    if atr_period is not None:
+        level, direction = supertrend(high, low, close, atr_period, multiplier)
+        results["supertrend"] = float(level[-1]) if last_only else level
+        results["supertrend_direction"] = int(direction[-1]) if last_only else direction
+    if bb_period is not None:
+        results["bb_pct"] = bollinger_pct_b(close, bb_period, bb_std_dev, last_only)
+    return results
@@ -0,0 +1,149 @@
+"""
+NSE market calendar helpers
+Session boundaries shared by candle resampling, market-hours checks and
+calendar-aware cache expiry
+"""
+
+import os
+from datetime import date, datetime, timezone, timedelta, time as dt_time
+from typing import List
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# NSE cash market regular session (IST)
+SESSION_OPEN = dt_time(9, 15)
+SESSION_CLOSE = dt_time(15, 30)
+
+# Exchange holidays on top of weekends (comma-separated YYYY-MM-DD)
+NSE_HOLIDAYS = {
+    date.fromisoformat(day.strip())
+    for day in os.environ.get('NSE_HOLIDAYS', '').split(',') if day.strip()
+}
+
+# Bar length in minutes of the intraday timeframes
+INTRADAY_BAR_MINUTES = {"15min": 15, "1hour": 60}
+
+# How far expiry lookups scan for the next/previous boundary (covers a month plus holidays)
+EXPIRY_SCAN_DAYS = 45
+
+def get_ist_now() -> datetime:
+    """Get current time in IST timezone"""
+    return datetime.now(IST)
+
+def to_ist(timestamp_str: str) -> datetime:
+    """Parse an ISO-8601 candle timestamp and convert it to IST"""
+    return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00')).astimezone(IST)
+
+def session_open_at(day: datetime) -> datetime:
+    """Session open (9:15 IST) on the IST calendar day of the given datetime"""
+    day_ist = day.astimezone(IST)
+    return day_ist.replace(hour=SESSION_OPEN.hour, minute=SESSION_OPEN.minute, second=0, microsecond=0)
+
+def week_start(day: datetime) -> datetime:
+    """Midnight IST on the Monday of the week containing the given datetime"""
+    day_ist = day.astimezone(IST).replace(hour=0, minute=0, second=0, microsecond=0)
+    return day_ist - timedelta(days=day_ist.weekday())
+
+def month_start(day: datetime) -> datetime:
+    """Midnight IST on the first day of the month containing the given datetime"""
+    return day.astimezone(IST).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def months_before(day: datetime, months: int) -> datetime:
+    """Same day-of-month `months` calendar months earlier, clamped to month end"""
+    month_index = day.year * 12 + (day.month - 1) - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    # Clamp e.g. May 31 - 3 months to Feb 28/29
+    next_month = datetime(year + (month // 12), (month % 12) + 1, 1)
+    last_day = (next_month - timedelta(days=1)).day
+    return day.replace(year=year, month=month, day=min(day.day, last_day))
+
+def is_trading_day(day: date) -> bool:
+    """Whether the exchange holds a session on this calendar day"""
+    return day.weekday() < 5 and day not in NSE_HOLIDAYS
+
+def is_session_open(at: datetime) -> bool:
+    """Whether the given instant falls inside a regular session"""
+    at_ist = at.astimezone(IST)
+    return is_trading_day(at_ist.date()) and SESSION_OPEN <= at_ist.time() < SESSION_CLOSE
+
+def _is_last_session_of(day: date, period_end: date) -> bool:
+    """Whether no trading day follows `day` up to and including `period_end`"""
+    following = day + timedelta(days=1)
+    while following <= period_end:
+        if is_trading_day(following):
+            return False
+        following += timedelta(days=1)
+    return True
+
+def _session_boundaries(day: date, timeframe: str, refresh_minutes: int) -> List[datetime]:
+    """Instants during one session at which cached `timeframe` data goes stale.
+
+    These are the closes of the timeframe's bars that complete that day plus,
+    with `refresh_minutes`, the session open and every `refresh_minutes` from
+    it, so bars still forming are refreshed while the market trades.
+    """
+    if not is_trading_day(day):
+        return []
+
+    open_at = datetime.combine(day, SESSION_OPEN, IST)
+    close_at = datetime.combine(day, SESSION_CLOSE, IST)
+    boundaries = {close_at}
+
+    bar_minutes = INTRADAY_BAR_MINUTES.get(timeframe)
+    if bar_minutes:
+        boundary = open_at + timedelta(minutes=bar_minutes)
+        while boundary < close_at:
+            boundaries.add(boundary)
+            boundary += timedelta(minutes=bar_minutes)
+    elif timeframe == "weekly":
+        sunday = day + timedelta(days=6 - day.weekday())
+        if not _is_last_session_of(day, sunday):
+            boundaries.discard(close_at)
+    elif timeframe == "monthly":
+        month_end = (month_start(close_at) + timedelta(days=32)).replace(day=1).date() - timedelta(days=1)
+        if not _is_last_session_of(day, month_end):
+            boundaries.discard(close_at)
+
+    if refresh_minutes > 0:
+        boundary = open_at
+        while boundary < close_at:
+            boundaries.add(boundary)
+            boundary += timedelta(minutes=refresh_minutes)
+
+    return sorted(boundaries)
+
+def next_expiry(timeframe: str, cached_at: datetime, refresh_minutes: int = 0) -> datetime:
+    """When data of a timeframe cached at `cached_at` next goes stale.
+
+    That is the next bar close of the timeframe (15-minute or hourly close,
+    session close, last session of the week or month), or the next forming-bar
+    refresh with `refresh_minutes`. Nothing expires while the market is closed.
+    """
+    cached_ist = cached_at.astimezone(IST)
+    day = cached_ist.date()
+    for _ in range(EXPIRY_SCAN_DAYS):
+        for boundary in _session_boundaries(day, timeframe, refresh_minutes):
+            if boundary > cached_ist:
+                return boundary
+        day += timedelta(days=1)
+    return cached_ist + timedelta(days=EXPIRY_SCAN_DAYS)
+
+def last_expiry(timeframe: str, now: datetime, refresh_minutes: int = 0) -> datetime:
+    """Latest staleness boundary at or before `now`.
+
+    Data cached at or after this instant is still fresh, i.e. its
+    next_expiry() lies in the future.
+    """
+    now_ist = now.astimezone(IST)
+    day = now_ist.date()
+    for _ in range(EXPIRY_SCAN_DAYS):
+        for boundary in reversed(_session_boundaries(day, timeframe, refresh_minutes)):
+            if boundary <= now_ist:
+                return boundary
+        day -= timedelta(days=1)
+    return now_ist - timedelta(days=EXPIRY_SCAN_DAYS)
+
+def fresh_for_minutes(timeframe: str, now: datetime, refresh_minutes: int = 0) -> float:
+    """Max cache age (minutes) that still counts as fresh at `now`, for age-filtered cache queries"""
+    return (now - last_expiry(timeframe, now, refresh_minutes)).total_seconds() / 60
@@ -0,0 +1,323 @@
+"""
+Market data provider module
+Every upstream market-data read (OHLC history, quote info, index constituents)
+goes through a MarketDataProvider so the analysis pipeline can run against
+Yahoo/NSE in production or against recorded fixtures offline
+"""
+
+import os
+import csv
+import json
+import time
+import logging
+from abc import ABC, abstractmethod
+from io import StringIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+from market_calendar import to_ist
+from resample import trim_to_period
+from upstream import TokenBucket, CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+NSE_CSV_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/csv,application/csv,text/plain',
+}
+
+NSE_CONSTITUENT_CSV_URLS = {
+    "nifty50": "https://nsearchives.nseindia.com/content/indices/ind_nifty50list.csv",
+    "nifty500": "https://nsearchives.nseindia.com/content/indices/ind_nifty500list.csv",
+}
+
+NSE_CONSTITUENT_API_URLS = {
+    "nifty500": "https://www.nseindia.com/api/equity-stockIndices?index=NIFTY%20500",
+}
+
+def _is_empty_frame(df: Optional[pd.DataFrame]) -> bool:
+    return df is None or df.empty
+
+def _split_download(df: Optional[pd.DataFrame], tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    """Per-ticker frames of a grouped yf.download result, tickers without bars omitted"""
+    frames = {}
+    if _is_empty_frame(df):
+        return frames
+
+    tickers_in_response = set(df.columns.get_level_values(0))
+    for ticker in tickers:
+        if ticker not in tickers_in_response:
+            continue
+        # The combined frame is indexed on the union of all tickers' bars
+        ticker_df = df[ticker].dropna(subset=["Open", "High", "Low", "Close"], how="all")
+        if not ticker_df.empty:
+            frames[ticker] = ticker_df
+    return frames
+
+class MarketDataProvider(ABC):
+    """
+    Interface for upstream market data
+
+    Symbols are Yahoo tickers (e.g. "TCS.NS", "^NSEI"). History frames use
+    yfinance's layout: an exchange-local DatetimeIndex and Open/High/Low/Close
+    columns. Implementations raise on upstream errors so callers keep their
+    retry and stale-cache handling.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def history(self, ticker: str, period: Optional[str] = None, interval: str = "1d", start=None) -> pd.DataFrame:
+        """Price history for one ticker, either a `period` window or everything since `start`"""
+        raise NotImplementedError
+
+    def download(self, tickers: List[str], period: Optional[str] = None, interval: str = "1d", start=None) -> Dict[str, pd.DataFrame]:
+        """Price history for many tickers at once: {ticker: frame}, tickers without data omitted"""
+        frames = {}
+        for ticker in tickers:
+            df = self.history(ticker, period=period, interval=interval, start=start)
+            if df is not None and not df.empty:
+                frames[ticker] = df
+        return frames
+
+    @abstractmethod
+    def info(self, ticker: str) -> Dict:
+        """Quote/fundamentals payload (Yahoo Ticker.info shape)"""
+        raise NotImplementedError
+
+    def major_holders(self, ticker: str) -> Optional[pd.DataFrame]:
+        """Major holders breakdown (Yahoo Ticker.major_holders shape)"""
+        return None
+
+    def constituents(self, index: str, source: str = "csv") -> Optional[List[str]]:
+        """Raw constituent symbols for an index ("nifty50", "nifty500"), unvalidated"""
+        return None
+
+    def probe(self):
+        """Raise unless upstream is reachable (used to close the circuit breaker)"""
+        return None
+
+class YahooNSEProvider(MarketDataProvider):
+    """Default provider: OHLC and quote info from Yahoo Finance, constituents from NSE"""
+
+    name = "yahoo"
+
+    # Cheap, always-listed request used to check whether Yahoo has recovered
+    PROBE_TICKER = "^NSEI"
+
+    def __init__(self, limiter: Optional[TokenBucket] = None, max_download_threads: int = 10,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.limiter = limiter
+        self.max_download_threads = max_download_threads
+        self.breaker = breaker
+
+    def _acquire(self, tokens: int = 1):
+        if self.limiter is not None:
+            self.limiter.acquire(tokens)
+
+    def _call(self, fn, *args, tokens: int = 1, failed: Optional[Callable[[Any], bool]] = None, **kwargs):
+        """Issue an upstream request: fail fast while the breaker is open, pace, record the outcome.
+
+        `failed` flags results that count as breaker failures without raising
+        (yfinance swallows per-ticker errors, rate limiting included, and
+        returns empty frames); such results are still returned to the caller.
+        """
+        if self.breaker is not None:
+            self.breaker.check()
+        self._acquire(tokens)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            raise
+        if self.breaker is not None:
+            if failed is not None and failed(result):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        return result
+
+    def probe(self):
+        """Breaker probe: one paced request that bypasses the breaker and raises unless Yahoo answers"""
+        self._acquire()
+        df = yf.Ticker(self.PROBE_TICKER).history(period="1d", interval="1d")
+        if df is None or df.empty:
+            raise RuntimeError(f"No data for {self.PROBE_TICKER}")
+
+    def history(self, ticker: str, period: Optional[str] = None, interval: str = "1d", start=None) -> pd.DataFrame:
+        window = {"start": start} if start is not None else {"period": period}
+        return self._call(yf.Ticker(ticker).history, **window, interval=interval, failed=_is_empty_frame)
+
+    def download(self, tickers: List[str], period: Optional[str] = None, interval: str = "1d", start=None) -> Dict[str, pd.DataFrame]:
+        tickers = [t.upper() for t in tickers]
+        if not tickers:
+            return {}
+
+        # yf.download issues one chart request per ticker. Batches go out in chunks of
+        # at most the limiter's burst, each reserving its tokens right before it is sent,
+        # so requests follow the refill rate instead of sleeping and then bursting
+        window = {"start": start} if start is not None else {"period": period}
+        chunk_size = self.limiter.burst if self.limiter is not None else len(tickers)
+
+        frames = {}
+        for i in range(0, len(tickers), chunk_size):
+            frames.update(self._download_chunk(tickers[i:i + chunk_size], window, interval))
+        return frames
+
+    def _download_chunk(self, tickers: List[str], window: Dict, interval: str) -> Dict[str, pd.DataFrame]:
+        # ignore_tz=False keeps the exchange-local index that Ticker.history returns,
+        # so timestamps match the per-symbol path exactly
+        df = self._call(
+            yf.download,
+            tickers,
+            tokens=len(tickers),
+            **window,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=True,
+            ignore_tz=False,
+            threads=min(len(tickers), self.max_download_threads),
+            progress=False,
+            # An empty or all-NaN frame means every ticker in the batch failed upstream
+            failed=lambda df: _is_empty_frame(df) or df.dropna(how="all").empty
+        )
+        return _split_download(df, tickers)
+
+    def info(self, ticker: str) -> Dict:
+        return self._call(lambda: yf.Ticker(ticker).info) or {}
+
+    def major_holders(self, ticker: str) -> Optional[pd.DataFrame]:
+        return self._call(lambda: yf.Ticker(ticker).major_holders)
+
+    def constituents(self, index: str, source: str = "csv") -> Optional[List[str]]:
+        if source == "api":
+            return self._constituents_from_api(index)
+        return self._constituents_from_csv(index)
+
+    def _constituents_from_csv(self, index: str) -> Optional[List[str]]:
+        url = NSE_CONSTITUENT_CSV_URLS.get(index)
+        if not url:
+            return None
+
+        logger.info(f"Fetching {index} constituents from CSV: {url}")
+        response = requests.get(url, headers=NSE_CSV_HEADERS, timeout=30)
+        if response.status_code != 200:
+            logger.warning(f"Failed to fetch {index} CSV: HTTP {response.status_code}")
+            return None
+
+        csv_reader = csv.DictReader(StringIO(response.text))
+        return [row.get('Symbol', '').strip() for row in csv_reader]
+
+    def _constituents_from_api(self, index: str) -> Optional[List[str]]:
+        url = NSE_CONSTITUENT_API_URLS.get(index)
+        if not url:
+            return None
+
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'application/json',
+        }
+        session = requests.Session()
+        session.get("https://www.nseindia.com", headers=headers, timeout=5)
+        response = session.get(url, headers=headers, timeout=10)
+        if response.status_code != 200:
+            return None
+        return [item['symbol'] for item in response.json().get('data', [])]
+
+class FixtureProvider(MarketDataProvider):
+    """
+    Offline provider that replays recorded data from a directory
+
+    Layout (candle files use the same dict format as the ohlc cache):
+        history/<TICKER>_<interval>.json   list of {timestamp, open, high, low, close}
+        info/<TICKER>.json                 Ticker.info payload
+        constituents/<index>.json          list of symbols
+
+    `latency_ms` is slept before every call to simulate upstream round trips.
+    """
+
+    name = "fixture"
+
+    def __init__(self, fixture_dir: str, latency_ms: float = 0.0):
+        self.root = Path(fixture_dir)
+        self.latency = max(0.0, latency_ms) / 1000.0
+        self._history: Dict[str, List[Dict]] = {}
+
+    def _simulate_latency(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _load_json(self, *parts: str):
+        path = self.root.joinpath(*parts)
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _candles(self, ticker: str, interval: str) -> List[Dict]:
+        key = f"{ticker}_{interval}"
+        if key not in self._history:
+            self._history[key] = self._load_json("history", f"{key}.json") or []
+        return self._history[key]
+
+    def history(self, ticker: str, period: Optional[str] = None, interval: str = "1d", start=None) -> pd.DataFrame:
+        self._simulate_latency()
+        return self._history_frame(ticker, period, interval, start)
+
+    def _history_frame(self, ticker: str, period: Optional[str], interval: str, start) -> pd.DataFrame:
+        candles = self._candles(ticker, interval)
+
+        if start is not None:
+            start_ts = pd.Timestamp(start)
+            candles = [c for c in candles if to_ist(c["timestamp"]) >= start_ts]
+        elif period:
+            candles = trim_to_period(candles, period, interval)
+
+        if not candles:
+            return pd.DataFrame(columns=["Open", "High", "Low", "Close"])
+
+        index = pd.DatetimeIndex([pd.Timestamp(c["timestamp"]) for c in candles])
+        return pd.DataFrame({
+            "Open": [c["open"] for c in candles],
+            "High": [c["high"] for c in candles],
+            "Low": [c["low"] for c in candles],
+            "Close": [c["close"] for c in candles],
+        }, index=index)
+
+    def download(self, tickers: List[str], period: Optional[str] = None, interval: str = "1d", start=None) -> Dict[str, pd.DataFrame]:
+        # One simulated round trip for the whole batch, like a multi-ticker request
+        self._simulate_latency()
+        frames = {}
+        for ticker in tickers:
+            df = self._history_frame(ticker, period, interval, start)
+            if not df.empty:
+                frames[ticker] = df
+        return frames
+
+    def info(self, ticker: str) -> Dict:
+        self._simulate_latency()
+        return self._load_json("info", f"{ticker}.json") or {}
+
+    def constituents(self, index: str, source: str = "csv") -> Optional[List[str]]:
+        self._simulate_latency()
+        return self._load_json("constituents", f"{index}.json")
+
+def create_provider(limiter: Optional[TokenBucket] = None, max_download_threads: int = 10,
+                    breaker: Optional[CircuitBreaker] = None) -> MarketDataProvider:
+    """Build the provider selected by MARKET_DATA_PROVIDER ("yahoo" or "fixture")"""
+    kind = os.environ.get('MARKET_DATA_PROVIDER', 'yahoo').lower()
+
+    if kind == "fixture":
+        fixture_dir = os.environ.get('MARKET_DATA_FIXTURE_DIR', 'fixtures')
+        latency_ms = float(os.environ.get('MARKET_DATA_FIXTURE_LATENCY_MS', '0'))
+        logger.info(f"Using fixture market data from {fixture_dir} ({latency_ms}ms simulated latency)")
+        return FixtureProvider(fixture_dir, latency_ms)
+
+    if kind != "yahoo":
+        logger.warning(f"Unknown MARKET_DATA_PROVIDER '{kind}', using yahoo")
+    return YahooNSEProvider(limiter=limiter, max_download_threads=max_download_threads, breaker=breaker)
@@ -0,0 +1,192 @@
+"""
+In-process (L1) cache module
+Bounded memory store checked before Supabase (L2) and upstream sources,
+with per-namespace TTLs and least-recently-used eviction
+"""
+
+import sys
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from market_calendar import get_ist_now
+
+logger = logging.getLogger(__name__)
+
+# Namespace TTL: minutes, or an expiry policy (key, cached_at) -> when the entry goes stale
+ExpiryPolicy = Callable[[str, datetime], datetime]
+
+def estimate_size(obj: Any) -> int:
+    """Approximate deep size in bytes of cached JSON-like data.
+
+    Lists are estimated from their first element so sizing a multi-thousand
+    candle series stays cheap.
+    """
+    if hasattr(obj, "nbytes"):
+        # Array-backed values (CandleSeries, ndarrays) report their buffer size
+        return sys.getsizeof(obj) + obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)) and obj:
+        size += estimate_size(obj[0]) * len(obj)
+    return size
+
+class MemoryCache:
+    """
+    Thread-safe L1 cache shared by every namespace
+
+    Each namespace has a `ttl` (minutes an entry counts as fresh, or an expiry
+    policy returning when an entry cached at a given time goes stale) and a
+    `retain` time (minutes an expired entry is still kept as a stale fallback
+    or incremental-refresh base; None keeps it until evicted). All entries
+    share one LRU order and one memory budget: inserting past `max_bytes`
+    evicts the least recently used entries, whatever their namespace.
+    """
+
+    def __init__(self, namespaces: Dict[str, Tuple[Union[float, ExpiryPolicy], Optional[float]]], max_bytes: int):
+        self.namespaces = dict(namespaces)
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Metrics, per namespace
+        self._hits = {namespace: 0 for namespace in self.namespaces}
+        self._misses = {namespace: 0 for namespace in self.namespaces}
+        self._evictions = {namespace: 0 for namespace in self.namespaces}
+
+    def _age_minutes(self, entry: Dict) -> float:
+        return (get_ist_now() - entry["timestamp"]).total_seconds() / 60
+
+    def _expires_at(self, namespace: str, key: str, timestamp: datetime) -> datetime:
+        ttl = self.namespaces[namespace][0]
+        if callable(ttl):
+            return ttl(key, timestamp)
+        return timestamp + timedelta(minutes=ttl)
+
+    def _is_entry_fresh(self, entry: Dict, max_age_minutes: Optional[float]) -> bool:
+        if max_age_minutes is None:
+            return get_ist_now() < entry["expires"]
+        return self._age_minutes(entry) < max_age_minutes
+
+    def _drop(self, full_key: Tuple[str, str]):
+        entry = self._entries.pop(full_key, None)
+        if entry:
+            self._bytes -= entry["size"]
+
+    def _lookup(self, namespace: str, key: str) -> Optional[Dict]:
+        """Entry for a key (touching its LRU position), dropping it once past retention"""
+        full_key = (namespace, key)
+        entry = self._entries.get(full_key)
+        if entry is None:
+            return None
+
+        retain = self.namespaces[namespace][1]
+        if retain is not None and self._age_minutes(entry) >= retain:
+            self._drop(full_key)
+            return None
+
+        self._entries.move_to_end(full_key)
+        return entry
+
+    def get(self, namespace: str, key: str, max_age_minutes: Optional[float] = None) -> Optional[Any]:
+        """Fresh cached data, or None if missing or expired (or older than `max_age_minutes` if given)"""
+        with self._lock:
+            entry = self._lookup(namespace, key)
+            if entry is not None and self._is_entry_fresh(entry, max_age_minutes):
+                self._hits[namespace] += 1
+                return entry["data"]
+            self._misses[namespace] += 1
+            return None
+
+    def get_stale(self, namespace: str, key: str) -> Optional[Any]:
+        """Cached data regardless of TTL (still within retention), for fallbacks and incremental refresh"""
+        with self._lock:
+            entry = self._lookup(namespace, key)
+            return entry["data"] if entry else None
+
+    def is_fresh(self, namespace: str, key: str, max_age_minutes: Optional[float] = None) -> bool:
+        """Whether a key holds unexpired data, without counting a hit or miss"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            return entry is not None and self._is_entry_fresh(entry, max_age_minutes)
+
+    def set(self, namespace: str, key: str, data: Any, timestamp: Optional[datetime] = None,
+            only_if_newer: bool = False) -> bool:
+        """Store data cached at `timestamp` (default now), evicting LRU entries over the budget.
+
+        With only_if_newer, an existing entry at least as recent is kept.
+        Returns whether the data was stored.
+        """
+        if namespace not in self.namespaces:
+            raise KeyError(f"Unknown cache namespace: {namespace}")
+
+        timestamp = timestamp or get_ist_now()
+        expires = self._expires_at(namespace, key, timestamp)
+        size = estimate_size(data)
+        full_key = (namespace, key)
+
+        with self._lock:
+            existing = self._entries.get(full_key)
+            if only_if_newer and existing and existing["timestamp"] >= timestamp:
+                return False
+
+            self._drop(full_key)
+            self._entries[full_key] = {"data": data, "timestamp": timestamp, "expires": expires, "size": size}
+            self._bytes += size
+
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+                self._evictions[oldest_key[0]] += 1
+            return True
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._drop((namespace, key))
+
+    def clear(self, *namespaces: str):
+        """Drop every entry in the given namespaces (all namespaces if none given)"""
+        with self._lock:
+            if not namespaces:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for full_key in [k for k in self._entries if k[0] in namespaces]:
+                self._drop(full_key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry counts per namespace, memory use against budget and hit/miss/eviction counts.
+
+        "namespaces" breaks entries, bytes, hits, misses and evictions down per namespace.
+        """
+        with self._lock:
+            namespaces = {
+                namespace: {
+                    "entries": 0,
+                    "bytes": 0,
+                    "hits": self._hits[namespace],
+                    "misses": self._misses[namespace],
+                    "evictions": self._evictions[namespace]
+                }
+                for namespace in self.namespaces
+            }
+            for (namespace, _), entry in self._entries.items():
+                namespaces[namespace]["entries"] += 1
+                namespaces[namespace]["bytes"] += entry["size"]
+
+            hits = sum(self._hits.values())
+            lookups = hits + sum(self._misses.values())
+            return {
+                "entries": {namespace: counts["entries"] for namespace, counts in namespaces.items()},
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": hits,
+                "misses": lookups - hits,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "evictions": sum(self._evictions.values()),
+                "namespaces": namespaces
+            }
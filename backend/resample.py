@@ -0,0 +1,193 @@
+"""
+Candle resampling module
+Derives 1-hour, weekly and monthly candles locally from finer fetched data
+so each symbol needs two upstream downloads instead of five
+"""
+
+from datetime import datetime, timedelta
+import logging
+from typing import Dict, List, Callable, Optional
+
+from market_calendar import (
+    IST,
+    to_ist,
+    session_open_at,
+    week_start,
+    month_start,
+    months_before,
+    get_ist_now,
+)
+
+logger = logging.getLogger(__name__)
+
+def _aggregate(bucket: List[Dict], bucket_start: datetime) -> Dict:
+    """Collapse consecutive candles into one bar (first open, last close, max high, min low)"""
+    return {
+        "timestamp": bucket_start.isoformat(),
+        "open": bucket[0]["open"],
+        "close": bucket[-1]["close"],
+        "high": max(c["high"] for c in bucket),
+        "low": min(c["low"] for c in bucket)
+    }
+
+def _resample(candles: List[Dict], bucket_of: Callable[[datetime], datetime]) -> List[Dict]:
+    """Group time-ordered candles by bucket start and aggregate each group.
+
+    The last bucket is emitted even if incomplete, the same way Yahoo returns
+    the still-forming bar, so in-scope filtering keeps working unchanged.
+    """
+    bars = []
+    bucket = []
+    current_start = None
+
+    for candle in candles:
+        try:
+            start = bucket_of(to_ist(candle["timestamp"]))
+        except Exception as e:
+            logger.warning(f"Error parsing candle timestamp while resampling: {e}")
+            continue
+
+        if current_start is not None and start != current_start:
+            bars.append(_aggregate(bucket, current_start))
+            bucket = []
+        current_start = start
+        bucket.append(candle)
+
+    if bucket:
+        bars.append(_aggregate(bucket, current_start))
+
+    return bars
+
+def resample_intraday(candles: List[Dict], minutes: int = 60) -> List[Dict]:
+    """Build N-minute bars from 15-minute candles, anchored at the 9:15 IST session open.
+
+    Matches Yahoo's NSE hourly bars: 9:15, 10:15, ... 15:15, where the final
+    15:15 bar only covers the 15 minutes up to the 15:30 close.
+    """
+    def bucket_of(ts: datetime) -> datetime:
+        open_ts = session_open_at(ts)
+        offset = int((ts - open_ts).total_seconds() // 60)
+        return open_ts + timedelta(minutes=(offset // minutes) * minutes)
+
+    return _resample(candles, bucket_of)
+
+def resample_weekly(candles: List[Dict]) -> List[Dict]:
+    """Build weekly bars from daily candles, anchored on Monday 00:00 IST"""
+    return _resample(candles, week_start)
+
+def resample_monthly(candles: List[Dict]) -> List[Dict]:
+    """Build monthly bars from daily candles, anchored on the 1st 00:00 IST"""
+    return _resample(candles, month_start)
+
+def last_sessions(candles: List[Dict], sessions: int) -> List[Dict]:
+    """Keep only intraday candles from the most recent N trading sessions"""
+    days = []
+    for candle in reversed(candles):
+        try:
+            day = to_ist(candle["timestamp"]).date()
+        except Exception:
+            continue
+        if not days or days[-1] != day:
+            days.append(day)
+        if len(days) > sessions:
+            break
+
+    if len(days) <= sessions:
+        return candles
+
+    oldest_kept = days[sessions - 1]
+    return [c for c in candles if to_ist(c["timestamp"]).date() >= oldest_kept]
+
+def candles_since(candles: List[Dict], start: datetime) -> List[Dict]:
+    """Keep candles whose bar starts at or after the given datetime"""
+    return [c for c in candles if to_ist(c["timestamp"]) >= start]
+
+def derive_from_15min(candles: List[Dict]) -> Dict[str, List[Dict]]:
+    """Derive the 15min (last 5 sessions) and 1hour timeframes from 15-minute history"""
+    return {
+        "15min": last_sessions(candles, 5),
+        "1hour": resample_intraday(candles, 60)
+    }
+
+def derive_from_daily(candles: List[Dict], now: Optional[datetime] = None) -> Dict[str, List[Dict]]:
+    """Derive daily (3 months), weekly (1 year) and monthly (3 years) timeframes from daily history"""
+    today = (now or get_ist_now()).astimezone(IST).replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "daily": candles_since(candles, months_before(today, 3)),
+        "weekly": candles_since(resample_weekly(candles), week_start(months_before(today, 12))),
+        "monthly": candles_since(resample_monthly(candles), month_start(months_before(today, 36)))
+    }
+
+def merge_candles(cached: List[Dict], fresh: List[Dict]) -> List[Dict]:
+    """Append freshly fetched bars to a cached series.
+
+    Cached bars at or after the first fresh bar are dropped, so the still-forming
+    last bar is replaced by its updated version instead of being duplicated.
+    """
+    if not fresh:
+        return list(cached)
+    if not cached:
+        return list(fresh)
+
+    first_new = to_ist(fresh[0]["timestamp"])
+    keep = len(cached)
+    while keep > 0 and to_ist(cached[keep - 1]["timestamp"]) >= first_new:
+        keep -= 1
+
+    return cached[:keep] + fresh
+
+def is_readjusted(cached: List[Dict], fresh: List[Dict], tolerance: float = 0.001) -> bool:
+    """Whether a fresh download re-prices bars the cached history already has completed.
+
+    Yahoo back-adjusts whole histories after splits and dividends, so cached
+    bars no longer line up with newly fetched ones. Closes are compared for
+    bars present in both, relative to `tolerance`; the cached last bar may
+    still be forming and is skipped.
+    """
+    completed = {}
+    for candle in cached[:-1]:
+        try:
+            completed[to_ist(candle["timestamp"])] = candle["close"]
+        except Exception:
+            continue
+
+    for candle in fresh:
+        try:
+            close = completed.get(to_ist(candle["timestamp"]))
+        except Exception:
+            continue
+        if close is not None and abs(candle["close"] - close) > tolerance * abs(close):
+            return True
+    return False
+
+def period_start(period: str, interval: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Start of a Yahoo-style calendar period ("3mo", "1y") for the given bar interval.
+
+    Returns None for session-counted periods ("5d", "30d"), which are trimmed by
+    trading sessions instead.
+    """
+    today = (now or get_ist_now()).astimezone(IST).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if period.endswith("mo"):
+        start = months_before(today, int(period[:-2]))
+    elif period.endswith("y"):
+        start = months_before(today, 12 * int(period[:-1]))
+    else:
+        return None
+
+    # Multi-day bars cover the window start with the bar that contains it
+    if interval == "1wk":
+        return week_start(start)
+    if interval == "1mo":
+        return month_start(start)
+    return start
+
+def trim_to_period(candles: List[Dict], period: str, interval: str, now: Optional[datetime] = None) -> List[Dict]:
+    """Drop bars that fall outside the window a fresh download of `period` would return"""
+    if period.endswith("d"):
+        return last_sessions(candles, int(period[:-1]))
+
+    start = period_start(period, interval, now)
+    if start is None:
+        return candles
+    return candles_since(candles, start)
@@ -3,11 +3,13 @@ from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.gzip import GZipMiddleware
 import os
+import json
+import hashlib
 import logging
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from datetime import datetime, timezone, timedelta
-import yfinance as yf
+import numpy as np
 import pandas as pd
 import time
 import threading
@@ -17,19 +19,47 @@ import csv
 from io import StringIO
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import asyncio
-import ta  # Technical Analysis library
+from resample import (
+    derive_from_15min,
+    derive_from_daily,
+    is_readjusted,
+    merge_candles,
+    period_start,
+    trim_to_period,
+)
+from market_calendar import to_ist, next_expiry, fresh_for_minutes
+from upstream import TokenBucket, SingleFlight, CircuitBreaker, CircuitOpenError
+from market_data import create_provider
+from memory_cache import MemoryCache
+from metrics import MetricsRegistry, gauge_family
+from candles import CandleSeries, to_candles, to_series
+from indicators import compute_indicators
+from udts import udts_indices, find_biggest_trend, DIRECTION_NAMES, NO_INDEX
 from database import (
-    init_supabase,
-    SUPABASE_AVAILABLE,
+    init_cache_backend,
+    cache_backend,
     get_ohlc_cache,
-    save_ohlc_cache,
-    get_fundamentals_cache,
+    get_ohlc_cache_entry,
+    get_ohlc_cache_bulk,
+    save_ohlc_cache_many,
+    get_ohlc_bars,
+    append_ohlc_bars,
+    OHLC_BARS_ENABLED,
+    get_fundamentals_cache_entry,
+    get_fundamentals_cache_bulk,
     save_fundamentals_cache,
-    get_institutional_cache,
+    get_institutional_cache_entry,
+    get_institutional_cache_bulk,
     save_institutional_cache,
     get_stock_list,
+    get_stock_list_entry,
     save_stock_list,
+    get_analysis_cache,
+    get_analysis_cache_bulk,
+    save_analysis_cache,
     clear_all_caches,
+    stop_cache_writer,
+    write_queue,
     get_ist_now as db_get_ist_now
 )
 
@@ -42,19 +72,44 @@ api_router = APIRouter(prefix="/api")
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize Supabase database
-init_supabase()
-
-# In-memory cache (fallback)
-cache = {
-    "ohlc": {},
-    "fundamentals": {},
-    "institutional_holdings": {},
-    "nifty500_list": {"data": None, "timestamp": None},
-    "nifty50_list": {"data": None, "timestamp": None},
-    "nifty50": {"data": None, "timestamp": None}
+# Initialize the persistent cache (Supabase, or SQLite with CACHE_BACKEND=sqlite)
+init_cache_backend()
+
+# Calendar-aware OHLC expiry: entries go stale at their timeframe's next bar close
+# and, while the session is open, every OHLC_FORMING_REFRESH_MINUTES so forming
+# bars (and CMP) stay current (0 = bar closes only). Nothing expires while the
+# market is closed.
+OHLC_FORMING_REFRESH_MINUTES = int(os.environ.get('OHLC_FORMING_REFRESH_MINUTES', '15'))
+# Raw download histories cached under their source name expire like this timeframe
+OHLC_SOURCE_TIMEFRAMES = {"intraday": "15min", "eod": "daily"}
+# How long expired OHLC stays usable as a stale fallback / incremental-refresh base
+OHLC_RETAIN_MINUTES = 10080
+
+def ohlc_cache_expiry(key: str, cached_at: datetime) -> datetime:
+    """When a "{symbol}_{timeframe}" OHLC cache entry cached at `cached_at` goes stale"""
+    timeframe = key.rsplit("_", 1)[-1]
+    return next_expiry(OHLC_SOURCE_TIMEFRAMES.get(timeframe, timeframe), cached_at, OHLC_FORMING_REFRESH_MINUTES)
+
+def ohlc_fresh_minutes(timeframe: str) -> float:
+    """Max age (minutes) of a persisted OHLC entry that is still fresh right now"""
+    return fresh_for_minutes(
+        OHLC_SOURCE_TIMEFRAMES.get(timeframe, timeframe), get_ist_now(), OHLC_FORMING_REFRESH_MINUTES
+    )
+
+# In-process L1 cache, checked before the persistent cache (L2) and upstream sources.
+# {namespace: (ttl minutes or expiry policy, retain minutes)} - expired entries
+# are kept for `retain` minutes as stale fallbacks and incremental-refresh bases
+CACHE_NAMESPACES = {
+    "ohlc": (ohlc_cache_expiry, OHLC_RETAIN_MINUTES),
+    "fundamentals": (1440, 10080),
+    "institutional_holdings": (129600, 129600),
+    "ticker_info": (1440, 1440),
+    "stock_lists": (1440, None),
+    "analysis": (10080, 10080),
+    "nifty50": (lambda key, cached_at: next_expiry("15min", cached_at, OHLC_FORMING_REFRESH_MINUTES), 10080),
 }
-cache_lock = threading.Lock()
+MEMORY_CACHE_MAX_MB = int(os.environ.get('MEMORY_CACHE_MAX_MB', '512'))
+cache = MemoryCache(CACHE_NAMESPACES, max_bytes=MEMORY_CACHE_MAX_MB * 1024 * 1024)
 
 # NIFTY 50 constituents - Updated January 2025 (fallback list)
 NIFTY50_SYMBOLS = [
@@ -135,6 +190,123 @@ NIFTY500_FALLBACK = [
 ]
 
 IST = timezone(timedelta(hours=5, minutes=30))
+IST_OFFSET_SECONDS = int(IST.utcoffset(None).total_seconds())
+
+# Process-wide limiter that every Yahoo Finance request goes through. Tuned to stay
+# just under Yahoo's throttle so scans run at a steady sustainable rate.
+YF_REQUESTS_PER_SECOND = float(os.environ.get('YF_REQUESTS_PER_SECOND', '5'))
+YF_REQUEST_BURST = int(os.environ.get('YF_REQUEST_BURST', '10'))
+yahoo_limiter = TokenBucket(rate=YF_REQUESTS_PER_SECOND, burst=YF_REQUEST_BURST, name="yahoo")
+
+# Opens when too many Yahoo requests fail (throttling/outage); while open, loaders
+# serve stale cached data immediately instead of retrying, and a background probe
+# closes it once Yahoo answers again
+yahoo_breaker = CircuitBreaker(
+    failure_rate=float(os.environ.get('YF_BREAKER_FAILURE_RATE', '0.5')),
+    window_seconds=float(os.environ.get('YF_BREAKER_WINDOW_SECONDS', '60')),
+    min_calls=int(os.environ.get('YF_BREAKER_MIN_CALLS', '20')),
+    probe_interval=float(os.environ.get('YF_BREAKER_PROBE_SECONDS', '30')),
+    probe=lambda: market_data.probe(),
+    name="yahoo"
+)
+
+# Source of all OHLC, quote info and constituent data (MARKET_DATA_PROVIDER selects
+# Yahoo/NSE or offline fixtures); the Yahoo provider goes through yahoo_limiter and yahoo_breaker
+market_data = create_provider(limiter=yahoo_limiter, max_download_threads=YF_REQUEST_BURST, breaker=yahoo_breaker)
+
+# Single-flight groups: concurrent loads of the same key wait on one in-flight fetch.
+# OHLC has two levels - per requested timeframe, and per upstream download that
+# may feed several timeframes - kept in separate groups so they never nest on one key.
+ohlc_flight = SingleFlight()
+ohlc_download_flight = SingleFlight()
+fundamentals_flight = SingleFlight()
+info_flight = SingleFlight()
+institutional_flight = SingleFlight()
+
+# Cache observability (/api/metrics): which tier answered each cache-backed load
+# and how long it took, per namespace (OHLC per timeframe). Sources: memory,
+# persistent (Supabase/SQLite), upstream, stale (expired copy served as a
+# fallback), fallback (built-in default) and empty; analysis lookups that
+# need a recomputation count as miss.
+metrics_registry = MetricsRegistry()
+CACHE_REQUESTS = metrics_registry.counter(
+    "makstox_cache_requests_total", "Cache-backed loads by namespace and the source that answered",
+    ("namespace", "source")
+)
+CACHE_LOAD_SECONDS = metrics_registry.histogram(
+    "makstox_cache_load_seconds", "Latency of cache-backed loads by namespace and answering source",
+    ("namespace", "source")
+)
+CACHE_FILLS = metrics_registry.counter(
+    "makstox_cache_fills_total", "Entries stored in the memory cache by namespace and origin",
+    ("namespace", "source")
+)
+
+def cache_served(namespace: str, source: str, started: float, value):
+    """Record the source and latency of a cache-backed load; returns value unchanged"""
+    CACHE_REQUESTS.inc(namespace=namespace, source=source)
+    CACHE_LOAD_SECONDS.observe(time.perf_counter() - started, namespace=namespace, source=source)
+    return value
+
+def cache_filled(namespace: str, source: str, count: int = 1):
+    if count:
+        CACHE_FILLS.inc(count, namespace=namespace, source=source)
+
+def collect_component_metrics():
+    """Memory cache, rate limiter, circuit breaker, single-flight and write queue stats as metrics"""
+    memory = cache.stats()
+    per_namespace = memory["namespaces"]
+    limiter = yahoo_limiter.stats()
+    breaker = yahoo_breaker.stats()
+    queue = write_queue.stats()
+    flights = {
+        "ohlc": ohlc_flight, "ohlc_download": ohlc_download_flight, "fundamentals": fundamentals_flight,
+        "ticker_info": info_flight, "institutional": institutional_flight
+    }
+    flight_stats = {name: flight.stats() for name, flight in flights.items()}
+
+    def per_ns(field):
+        return [({"namespace": namespace}, counts[field]) for namespace, counts in per_namespace.items()]
+
+    return [
+        gauge_family("makstox_memory_cache_entries", "Entries held in the memory cache", per_ns("entries")),
+        gauge_family("makstox_memory_cache_bytes", "Estimated memory cache size in bytes", per_ns("bytes")),
+        gauge_family("makstox_memory_cache_max_bytes", "Memory cache budget in bytes", [({}, memory["max_bytes"])]),
+        gauge_family("makstox_memory_cache_hits_total", "Fresh memory cache lookups", per_ns("hits"), "counter"),
+        gauge_family("makstox_memory_cache_misses_total", "Missing or expired memory cache lookups",
+                     per_ns("misses"), "counter"),
+        gauge_family("makstox_memory_cache_evictions_total", "Entries evicted to stay within the memory budget",
+                     per_ns("evictions"), "counter"),
+        gauge_family("makstox_rate_limiter_acquired_total", "Requests admitted by the rate limiter",
+                     [({"limiter": limiter["name"]}, limiter["acquired"])], "counter"),
+        gauge_family("makstox_rate_limiter_waited_total", "Requests that had to wait for a token",
+                     [({"limiter": limiter["name"]}, limiter["waited"])], "counter"),
+        gauge_family("makstox_rate_limiter_wait_seconds_total", "Time callers spent waiting for tokens",
+                     [({"limiter": limiter["name"]}, limiter["total_wait_seconds"])], "counter"),
+        gauge_family("makstox_rate_limiter_available_tokens", "Tokens currently available",
+                     [({"limiter": limiter["name"]}, limiter["available_tokens"])]),
+        gauge_family("makstox_circuit_open", "1 while the circuit breaker is open",
+                     [({"breaker": breaker["name"]}, 1 if breaker["state"] == "open" else 0)]),
+        gauge_family("makstox_circuit_window_failure_rate", "Upstream failure ratio over the breaker window",
+                     [({"breaker": breaker["name"]}, breaker["window_failure_rate"])]),
+        gauge_family("makstox_circuit_opened_total", "Times the circuit breaker opened",
+                     [({"breaker": breaker["name"]}, breaker["times_opened"])], "counter"),
+        gauge_family("makstox_circuit_rejected_total", "Upstream calls rejected while the breaker was open",
+                     [({"breaker": breaker["name"]}, breaker["rejected"])], "counter"),
+        gauge_family("makstox_singleflight_in_flight", "Loads currently in flight",
+                     [({"group": name}, stats["in_flight"]) for name, stats in flight_stats.items()]),
+        gauge_family("makstox_singleflight_coalesced_total", "Duplicate loads that waited on an in-flight one",
+                     [({"group": name}, stats["coalesced"]) for name, stats in flight_stats.items()], "counter"),
+        gauge_family("makstox_write_queue_pending", "Cache writes waiting to be persisted", [({}, queue["pending"])]),
+        gauge_family("makstox_write_queue_queued_total", "Cache writes queued", [({}, queue["queued"])], "counter"),
+        gauge_family("makstox_write_queue_coalesced_total", "Queued writes superseded by a newer write of the same key",
+                     [({}, queue["coalesced"])], "counter"),
+        gauge_family("makstox_write_queue_written_total", "Cache rows persisted", [({}, queue["written"])], "counter"),
+        gauge_family("makstox_write_queue_failed_total", "Cache rows that failed to persist",
+                     [({}, queue["failed"])], "counter"),
+    ]
+
+metrics_registry.register_collector(collect_component_metrics)
 
 # Server-side heartbeat to keep application alive
 heartbeat_active = True
@@ -191,11 +363,6 @@ def is_nifty_index(symbol: str) -> bool:
             return True
     return False
 
-def is_cache_valid(timestamp, max_age_minutes):
-    if timestamp is None:
-        return False
-    return (get_ist_now() - timestamp).total_seconds() < max_age_minutes * 60
-
 def is_market_currently_open() -> bool:
     """Check if market is currently open (Mon-Fri, 9:15 AM - 3:30 PM IST)"""
     now = datetime.now(IST)
@@ -233,36 +400,19 @@ def is_valid_symbol(symbol: str) -> bool:
 def fetch_nifty50_from_csv():
     """Fetch NIFTY 50 list from NSE CSV"""
     try:
-        url = "https://nsearchives.nseindia.com/content/indices/ind_nifty50list.csv"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'text/csv,application/csv,text/plain',
-        }
-        
-        logger.info(f"Fetching NIFTY 50 from CSV: {url}")
-        response = requests.get(url, headers=headers, timeout=30)
+        raw_symbols = market_data.constituents("nifty50", source="csv")
+        if raw_symbols is None:
+            return None
+
+        symbols = [symbol for symbol in raw_symbols if is_valid_symbol(symbol)]
+        logger.info(f"Fetched {len(symbols)} valid stocks from NSE CSV for NIFTY 50")
         
-        if response.status_code == 200:
-            csv_content = StringIO(response.text)
-            csv_reader = csv.DictReader(csv_content)
-            
-            symbols = []
-            for row in csv_reader:
-                symbol = row.get('Symbol', '').strip()
-                if is_valid_symbol(symbol):
-                    symbols.append(symbol)
-            
-            logger.info(f"Fetched {len(symbols)} valid stocks from NSE CSV for NIFTY 50")
-            
-            if len(symbols) >= 50:
-                symbols = symbols[:50]
-                logger.info(f"Returning exactly 50 NIFTY50 stocks from CSV")
-                return symbols
-            else:
-                logger.warning(f"Only {len(symbols)} valid stocks in CSV, need 50 - using fallback")
-                return None
+        if len(symbols) >= 50:
+            symbols = symbols[:50]
+            logger.info(f"Returning exactly 50 NIFTY50 stocks from CSV")
+            return symbols
         else:
-            logger.warning(f"Failed to fetch NIFTY 50 CSV: HTTP {response.status_code}")
+            logger.warning(f"Only {len(symbols)} valid stocks in CSV, need 50 - using fallback")
             return None
             
     except Exception as e:
@@ -272,36 +422,19 @@ def fetch_nifty50_from_csv():
 def fetch_nifty500_from_csv():
     """Fetch NIFTY 500 list from NSE CSV"""
     try:
-        url = "https://nsearchives.nseindia.com/content/indices/ind_nifty500list.csv"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'text/csv,application/csv,text/plain',
-        }
-        
-        logger.info(f"Fetching NIFTY 500 from CSV: {url}")
-        response = requests.get(url, headers=headers, timeout=30)
+        raw_symbols = market_data.constituents("nifty500", source="csv")
+        if raw_symbols is None:
+            return None
+
+        symbols = [symbol for symbol in raw_symbols if is_valid_symbol(symbol)]
+        logger.info(f"Fetched {len(symbols)} valid stocks from NSE CSV for NIFTY 500")
         
-        if response.status_code == 200:
-            csv_content = StringIO(response.text)
-            csv_reader = csv.DictReader(csv_content)
-            
-            symbols = []
-            for row in csv_reader:
-                symbol = row.get('Symbol', '').strip()
-                if is_valid_symbol(symbol):
-                    symbols.append(symbol)
-            
-            logger.info(f"Fetched {len(symbols)} valid stocks from NSE CSV for NIFTY 500")
-            
-            if len(symbols) >= 500:
-                symbols = symbols[:500]
-                logger.info(f"Returning exactly 500 NIFTY500 stocks from CSV")
-                return symbols
-            else:
-                logger.warning(f"Only {len(symbols)} valid stocks in CSV, need 500 - using fallback")
-                return None
+        if len(symbols) >= 500:
+            symbols = symbols[:500]
+            logger.info(f"Returning exactly 500 NIFTY500 stocks from CSV")
+            return symbols
         else:
-            logger.warning(f"Failed to fetch NIFTY 500 CSV: HTTP {response.status_code}")
+            logger.warning(f"Only {len(symbols)} valid stocks in CSV, need 500 - using fallback")
             return None
             
     except Exception as e:
@@ -311,17 +444,9 @@ def fetch_nifty500_from_csv():
 def fetch_nifty500_from_nse():
     """Try to fetch NIFTY 500 list from NSE website"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'application/json',
-        }
-        url = "https://www.nseindia.com/api/equity-stockIndices?index=NIFTY%20500"
-        session = requests.Session()
-        session.get("https://www.nseindia.com", headers=headers, timeout=5)
-        response = session.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            symbols = [item['symbol'] for item in data.get('data', []) if not is_nifty_index(item['symbol']) and is_valid_symbol(item['symbol'])]
+        raw_symbols = market_data.constituents("nifty500", source="api")
+        if raw_symbols:
+            symbols = [s for s in raw_symbols if not is_nifty_index(s) and is_valid_symbol(s)]
             if len(symbols) >= 50:
                 logger.info(f"Fetched {len(symbols)} stocks from NSE for NIFTY 500")
                 return symbols
@@ -331,149 +456,483 @@ def fetch_nifty500_from_nse():
 
 def get_nifty50_symbols():
     """Fetch NIFTY 50 constituents with fallback"""
-    # Check Supabase first
-    cached = get_stock_list('nifty50', 1440)
+    started = time.perf_counter()
+
+    # Check in-memory cache first
+    cached = cache.get("stock_lists", "nifty50")
     if cached:
-        logger.info("Using NIFTY 50 from Supabase cache")
-        return cached
+        return cache_served("stock_lists", "memory", started, cached)
 
-    # Check in-memory cache
-    with cache_lock:
-        if is_cache_valid(cache["nifty50_list"]["timestamp"], 1440):
-            return cache["nifty50_list"]["data"]
+    # Check Supabase
+    entry = get_stock_list_entry('nifty50', 1440)
+    if entry and entry[0]:
+        cached, cached_at = entry
+        logger.info("Using NIFTY 50 from Supabase cache")
+        cache.set("stock_lists", "nifty50", cached, cached_at)
+        cache_filled("stock_lists", "persistent")
+        return cache_served("stock_lists", "persistent", started, cached)
 
     # Try NSE CSV first
     symbols = fetch_nifty50_from_csv()
     if symbols and len(symbols) == 50:
         save_stock_list('nifty50', symbols)
-        with cache_lock:
-            cache["nifty50_list"] = {"data": symbols, "timestamp": get_ist_now()}
+        cache.set("stock_lists", "nifty50", symbols)
+        cache_filled("stock_lists", "upstream")
         logger.info("Using NIFTY 50 from NSE CSV")
-        return symbols
+        return cache_served("stock_lists", "upstream", started, symbols)
 
     # Fallback to hardcoded list
     logger.info("Using NIFTY 50 fallback list")
     save_stock_list('nifty50', NIFTY50_SYMBOLS)
-    with cache_lock:
-        cache["nifty50_list"] = {"data": NIFTY50_SYMBOLS, "timestamp": get_ist_now()}
-    return NIFTY50_SYMBOLS
+    cache.set("stock_lists", "nifty50", NIFTY50_SYMBOLS)
+    cache_filled("stock_lists", "fallback")
+    return cache_served("stock_lists", "fallback", started, NIFTY50_SYMBOLS)
 
 def get_nifty500_symbols():
     """Fetch NIFTY 500 constituents with fallback"""
-    # Check Supabase first
-    cached = get_stock_list('nifty500', 1440)
+    started = time.perf_counter()
+
+    # Check in-memory cache first
+    cached = cache.get("stock_lists", "nifty500")
     if cached:
-        logger.info("Using NIFTY 500 from Supabase cache")
-        return cached
+        return cache_served("stock_lists", "memory", started, cached)
 
-    # Check in-memory cache
-    with cache_lock:
-        if is_cache_valid(cache["nifty500_list"]["timestamp"], 1440):
-            return cache["nifty500_list"]["data"]
+    # Check Supabase
+    entry = get_stock_list_entry('nifty500', 1440)
+    if entry and entry[0]:
+        cached, cached_at = entry
+        logger.info("Using NIFTY 500 from Supabase cache")
+        cache.set("stock_lists", "nifty500", cached, cached_at)
+        cache_filled("stock_lists", "persistent")
+        return cache_served("stock_lists", "persistent", started, cached)
 
     # Try NSE CSV first
     symbols = fetch_nifty500_from_csv()
     if symbols and len(symbols) == 500:
         save_stock_list('nifty500', symbols)
-        with cache_lock:
-            cache["nifty500_list"] = {"data": symbols, "timestamp": get_ist_now()}
+        cache.set("stock_lists", "nifty500", symbols)
+        cache_filled("stock_lists", "upstream")
         logger.info("Using NIFTY 500 from NSE CSV")
-        return symbols
+        return cache_served("stock_lists", "upstream", started, symbols)
 
     # Try NSE API as secondary option
     symbols = fetch_nifty500_from_nse()
     if symbols:
         symbols = [s for s in symbols if not is_nifty_index(s) and is_valid_symbol(s)]
         save_stock_list('nifty500', symbols)
-        with cache_lock:
-            cache["nifty500_list"] = {"data": symbols, "timestamp": get_ist_now()}
+        cache.set("stock_lists", "nifty500", symbols)
+        cache_filled("stock_lists", "upstream")
         logger.info("Using NIFTY 500 from NSE API")
-        return symbols
+        return cache_served("stock_lists", "upstream", started, symbols)
 
     # Fallback to hardcoded list
     logger.info("Using NIFTY 500 fallback list")
     save_stock_list('nifty500', NIFTY500_FALLBACK)
-    with cache_lock:
-        cache["nifty500_list"] = {"data": NIFTY500_FALLBACK, "timestamp": get_ist_now()}
-    return NIFTY500_FALLBACK
+    cache.set("stock_lists", "nifty500", NIFTY500_FALLBACK)
+    cache_filled("stock_lists", "fallback")
+    return cache_served("stock_lists", "fallback", started, NIFTY500_FALLBACK)
 
 def get_yf_symbol(symbol):
     return f"{symbol}.NS"
 
-def get_ohlc_data(symbol: str, timeframe: str, retry_count: int = 0, max_retries: int = 5):
-    """Fetch OHLC data with Supabase and in-memory caching, with retry logic for rate limits"""
-    cache_key = f"{symbol}_{timeframe}"
-
-    # Check Supabase first with extended validity during rate limit periods
-    # Check for recent cache first (15 min), then try older cache (24 hours) as fallback
-    cached = get_ohlc_cache(symbol, timeframe, 15)
-    if cached:
-        return cached
+# Yahoo history window (period, interval) for each UDTS timeframe
+OHLC_TIMEFRAME_PARAMS = {
+    "monthly": ("3y", "1mo"),
+    "weekly": ("1y", "1wk"),
+    "daily": ("3mo", "1d"),
+    "1hour": ("30d", "1h"),
+    "15min": ("5d", "15m"),
+}
 
-    # Try older cache (24 hours) as fallback for rate limit scenarios
-    cached_old = get_ohlc_cache(symbol, timeframe, 1440)
+# When resampling is on, only these two histories are downloaded per symbol and
+# every UDTS timeframe is derived locally from them (see resample.py)
+OHLC_RESAMPLE_ENABLED = os.environ.get('OHLC_RESAMPLE', 'true').lower() == 'true'
+OHLC_RESAMPLE_SOURCES = {
+    "intraday": ("30d", "15m", derive_from_15min),
+    "eod": ("3y", "1d", derive_from_daily),
+}
+OHLC_RESAMPLE_TIMEFRAMES = {
+    "15min": "intraday",
+    "1hour": "intraday",
+    "daily": "eod",
+    "weekly": "eod",
+    "monthly": "eod",
+}
 
-    # Check in-memory cache
-    with cache_lock:
-        if cache_key in cache["ohlc"] and is_cache_valid(cache["ohlc"][cache_key]["timestamp"], 15):
-            return cache["ohlc"][cache_key]["data"]
+# Max symbols per multi-ticker yf.download call when prefetching a scan
+OHLC_BATCH_DOWNLOAD_SIZE = 100
+
+# Refresh expired OHLC by fetching only bars newer than the cached tail
+OHLC_INCREMENTAL_ENABLED = os.environ.get('OHLC_INCREMENTAL', 'true').lower() == 'true'
+# Completed bars re-requested before the cached last bar; if Yahoo re-priced them
+# (split/dividend adjustment) the history is downloaded again in full
+OHLC_INCREMENTAL_OVERLAP_BARS = int(os.environ.get('OHLC_INCREMENTAL_OVERLAP_BARS', '3'))
+
+def get_ohlc_download_plan() -> Dict[str, tuple]:
+    """Upstream downloads needed to build every timeframe: {source: (period, interval)}"""
+    if OHLC_RESAMPLE_ENABLED:
+        return {source: (period, interval) for source, (period, interval, _) in OHLC_RESAMPLE_SOURCES.items()}
+    return dict(OHLC_TIMEFRAME_PARAMS)
+
+def get_ohlc_source(timeframe: str) -> Optional[str]:
+    """Download plan entry that a timeframe is built from"""
+    if OHLC_RESAMPLE_ENABLED:
+        return OHLC_RESAMPLE_TIMEFRAMES.get(timeframe)
+    return timeframe if timeframe in OHLC_TIMEFRAME_PARAMS else None
+
+def split_ohlc_download(source: str, candles: List[Dict]) -> Dict[str, List[Dict]]:
+    """Turn one downloaded history into {timeframe: candles} for every timeframe it feeds"""
+    if OHLC_RESAMPLE_ENABLED:
+        derive = OHLC_RESAMPLE_SOURCES[source][2]
+        return derive(candles)
+    return {source: candles}
+
+def store_ohlc_timeframes(symbol: str, frames: Dict[str, List[Dict]]):
+    """Save derived timeframes to both Supabase and in-memory cache"""
+    store_ohlc_timeframes_many({symbol: frames})
+
+def store_ohlc_timeframes_many(frames_by_symbol: Dict[str, Dict[str, List[Dict]]]):
+    """Save derived timeframes for many symbols, writing Supabase in batched upserts"""
+    now = get_ist_now()
+    entries = []
+    for symbol, frames in frames_by_symbol.items():
+        for timeframe, candles in frames.items():
+            if not candles:
+                continue
+            # Stored columnar: a fraction of the dict list's memory and payload size
+            series = CandleSeries.from_dicts(candles)
+            if OHLC_BARS_ENABLED:
+                # Per-bar table: only bars new or changed since the cached copy are written
+                previous = to_series(cache.get_stale("ohlc", f"{symbol}_{timeframe}"))
+                append_ohlc_bars(symbol, timeframe, series.changed_since(previous))
+            cache.set("ohlc", f"{symbol}_{timeframe}", series, now)
+            cache_filled(f"ohlc_{timeframe}", "upstream")
+            entries.append((symbol, timeframe, series))
+    save_ohlc_cache_many(entries)
+
+def is_incremental_tail(tail: Optional[List[Dict]], source: str) -> bool:
+    """Whether a cached history is recent enough to extend instead of refetching in full"""
+    if not OHLC_INCREMENTAL_ENABLED or not tail:
+        return False
 
+    period, interval = get_ohlc_download_plan()[source]
     try:
-        yf_symbol = get_yf_symbol(symbol)
-        ticker = yf.Ticker(yf_symbol)
-
-        if timeframe == "monthly":
-            df = ticker.history(period="3y", interval="1mo")
-        elif timeframe == "weekly":
-            df = ticker.history(period="1y", interval="1wk")
-        elif timeframe == "daily":
-            df = ticker.history(period="3mo", interval="1d")
-        elif timeframe == "1hour":
-            df = ticker.history(period="30d", interval="1h")
-        elif timeframe == "15min":
-            df = ticker.history(period="5d", interval="15m")
-        else:
-            return []
+        last_bar = to_ist(tail[-1]["timestamp"])
+    except Exception:
+        return False
 
-        if df.empty:
-            # If fetch failed but we have old cache, use it
-            if cached_old:
-                logger.info(f"Using stale cache for {symbol} {timeframe} due to empty response")
-                return cached_old
-            return []
-
-        candles = []
-        for idx, row in df.iterrows():
-            candles.append({
-                "timestamp": idx.isoformat(),
-                "open": round(float(row["Open"]), 2),
-                "close": round(float(row["Close"]), 2),
-                "high": round(float(row["High"]), 2),
-                "low": round(float(row["Low"]), 2)
+    window_start = period_start(period, interval)
+    if window_start is None:
+        # Session-counted periods ("5d", "30d"): bound by calendar days
+        window_start = get_ist_now() - timedelta(days=int(period[:-1]))
+    return last_bar >= window_start
+
+def incremental_start(tail: List[Dict]) -> datetime:
+    """Start of an incremental refresh: the cached last bar, minus the overlap bars"""
+    return to_ist(tail[max(0, len(tail) - 1 - OHLC_INCREMENTAL_OVERLAP_BARS)]["timestamp"])
+
+def get_memory_history_tail(symbol: str, source: str) -> Optional[List[Dict]]:
+    """Last in-memory history for a download source, ignoring TTL"""
+    tail = to_candles(cache.get_stale("ohlc", f"{symbol}_{source}"))
+    return tail if is_incremental_tail(tail, source) else None
+
+def get_ohlc_history_tail(symbol: str, source: str, cached_old: Optional[List[Dict]] = None) -> Optional[List[Dict]]:
+    """Last cached history for a download source (memory, then Supabase), ignoring TTL.
+
+    cached_old is an already-read Supabase copy of the same key ([] if there was
+    none), which saves a second probe when the timeframe is its own download source.
+    """
+    if not OHLC_INCREMENTAL_ENABLED:
+        return None
+
+    tail = get_memory_history_tail(symbol, source)
+    if tail:
+        return tail
+
+    if cached_old is None:
+        cached_old = to_candles(get_ohlc_cache(symbol, source, OHLC_RETAIN_MINUTES))
+    if not cached_old and OHLC_BARS_ENABLED:
+        # The per-bar table keeps histories past the snapshot's retention
+        cached_old = get_ohlc_bars_window(symbol, source)
+    return cached_old if is_incremental_tail(cached_old, source) else None
+
+def get_ohlc_bars_window(symbol: str, source: str) -> Optional[List[Dict]]:
+    """A download source's history from the per-bar table, limited to its download window"""
+    period, interval = get_ohlc_download_plan()[source]
+    start = period_start(period, interval)
+    if start is None:
+        # Session-counted periods ("30d"): read with slack for weekends and holidays, trim by sessions
+        start = get_ist_now() - timedelta(days=2 * int(period[:-1]) + 7)
+    bars = to_candles(get_ohlc_bars(symbol, source, start=start))
+    return trim_to_period(bars, period, interval) if bars else None
+
+def extend_ohlc_history(tail: List[Dict], fresh: List[Dict], source: str) -> List[Dict]:
+    """Append newly fetched bars to a cached history and trim it to the download window"""
+    period, interval = get_ohlc_download_plan()[source]
+    return trim_to_period(merge_candles(tail, fresh), period, interval)
+
+def history_to_candles(df: pd.DataFrame) -> List[Dict]:
+    """Convert a yfinance history DataFrame into the candle dict list used everywhere"""
+    candles = []
+    for idx, row in df.iterrows():
+        candles.append({
+            "timestamp": idx.isoformat(),
+            "open": round(float(row["Open"]), 2),
+            "close": round(float(row["Close"]), 2),
+            "high": round(float(row["High"]), 2),
+            "low": round(float(row["Low"]), 2)
+        })
+    return candles
+
+def fetch_ohlc_batch(symbols: List[str], period: str, interval: str, start: Optional[datetime] = None) -> Dict[str, List[Dict]]:
+    """Download one history window for many symbols with a single multi-ticker request.
+
+    With `start` set, only bars from that time onwards are requested (incremental
+    refresh) and `period` is ignored.
+
+    Returns {symbol: candles} for every symbol Yahoo returned data for; symbols
+    missing from the response are simply absent so callers can fall back to
+    the per-symbol path.
+    """
+    if not symbols:
+        return {}
+
+    yf_symbols = {get_yf_symbol(s).upper(): s for s in symbols}
+    frames = market_data.download(list(yf_symbols.keys()), period=period, interval=interval, start=start)
+
+    return {
+        yf_symbols[ticker]: history_to_candles(df)
+        for ticker, df in frames.items()
+        if ticker in yf_symbols
+    }
+
+def load_cache_rows(namespace: str, rows: List[Dict], key_of: Callable[[Dict], str]) -> int:
+    """Copy Supabase cache rows into the in-memory cache, keeping their original age.
+
+    Entries already in memory that are at least as recent are left alone.
+    Returns the number of entries loaded.
+    """
+    loaded = 0
+    for row in rows:
+        try:
+            cached_at = to_ist(row["timestamp"])
+        except Exception:
+            continue
+        if row.get("data") is None:
+            continue
+        if cache.set(namespace, key_of(row), row["data"], cached_at, only_if_newer=True):
+            loaded += 1
+            cache_filled(f"ohlc_{row['timeframe']}" if namespace == "ohlc" else namespace, "persistent")
+    return loaded
+
+def warm_caches_from_supabase(symbols: List[str]):
+    """Load the Supabase OHLC, fundamentals and holdings caches for a whole symbol list.
+
+    Scan endpoints call this before prefetching and fanning out, so lookups for
+    every symbol hit memory instead of issuing their own Supabase queries. Rows
+    keep their cached time, so expired entries still refresh (incrementally,
+    for OHLC histories) as usual.
+    """
+    if not symbols:
+        return
+
+    ohlc_keys = list(dict.fromkeys(list(OHLC_TIMEFRAME_PARAMS) + list(get_ohlc_download_plan())))
+    ohlc = load_cache_rows(
+        "ohlc", get_ohlc_cache_bulk(symbols, ohlc_keys, OHLC_RETAIN_MINUTES),
+        lambda row: f"{row['symbol']}_{row['timeframe']}"
+    )
+    fundamentals = load_cache_rows(
+        "fundamentals", get_fundamentals_cache_bulk(symbols, 10080), lambda row: row["symbol"]
+    )
+    holdings = load_cache_rows(
+        "institutional_holdings", get_institutional_cache_bulk(symbols, 129600), lambda row: row["symbol"]
+    )
+    analyses = 0
+    if ANALYSIS_CACHE_PERSIST:
+        analyses = load_cache_rows("analysis", get_analysis_cache_bulk(symbols), lambda row: row["symbol"])
+    logger.info(
+        f"Loaded Supabase caches for {len(symbols)} symbols: "
+        f"{ohlc} OHLC, {fundamentals} fundamentals, {holdings} holdings, {analyses} analysis entries"
+    )
+
+def prefetch_ohlc_data(symbols: List[str]):
+    """Warm the OHLC caches for a whole symbol list using batched downloads.
+
+    Scan endpoints call this before fanning out to analyze_stock, which then
+    reads the prefilled in-memory cache instead of issuing one request per
+    symbol per timeframe.
+    """
+    if yahoo_breaker.is_open:
+        logger.warning("Yahoo circuit open, skipping OHLC prefetch")
+        return
+
+    for source, (period, interval) in get_ohlc_download_plan().items():
+        timeframes = [tf for tf in OHLC_TIMEFRAME_PARAMS if get_ohlc_source(tf) == source]
+        missing = [
+            s for s in symbols
+            if not all(cache.is_fresh("ohlc", f"{s}_{tf}") for tf in timeframes)
+        ]
+
+        if not missing:
+            continue
+
+        fetched_count = 0
+        for i in range(0, len(missing), OHLC_BATCH_DOWNLOAD_SIZE):
+            chunk = missing[i:i + OHLC_BATCH_DOWNLOAD_SIZE]
+
+            # Symbols with a usable cached tail only need bars since their last one
+            tails = {s: get_memory_history_tail(s, source) for s in chunk}
+            incremental = [s for s in chunk if tails[s]]
+            full = [s for s in chunk if not tails[s]]
+
+            fetched = {}
+            try:
+                if incremental:
+                    since = min(incremental_start(tails[s]) for s in incremental)
+                    fresh = fetch_ohlc_batch(incremental, period, interval, start=since)
+                    for symbol, candles in fresh.items():
+                        if is_readjusted(tails[symbol], candles):
+                            logger.info(f"{symbol} {source} history re-adjusted upstream, refetching in full")
+                            full.append(symbol)
+                        else:
+                            fetched[symbol] = extend_ohlc_history(tails[symbol], candles, source)
+                if full:
+                    fetched.update(fetch_ohlc_batch(full, period, interval))
+            except Exception as e:
+                logger.warning(f"Batch download failed for {len(chunk)} symbols ({source}): {e}")
+
+            # One batched write per chunk instead of one per symbol and timeframe
+            store_ohlc_timeframes_many({
+                symbol: {source: history, **split_ohlc_download(source, history)}
+                for symbol, history in fetched.items()
             })
+            fetched_count += len(fetched)
 
-        # Save to both Supabase and in-memory cache
-        save_ohlc_cache(symbol, timeframe, candles)
-        with cache_lock:
-            cache["ohlc"][cache_key] = {"data": candles, "timestamp": get_ist_now()}
+        logger.info(f"Prefetched {source} OHLC for {fetched_count}/{len(missing)} symbols")
 
-        return candles
+def download_ohlc_history(symbol: str, source: str, cached_old: Optional[List[Dict]] = None) -> Dict[str, List[Dict]]:
+    """Download (or incrementally extend) one source history and cache every timeframe it feeds.
+
+    Concurrent callers for the same symbol/source share a single upstream request,
+    so e.g. daily and weekly lookups racing on a cold cache download once.
+    Returns {timeframe: candles}, empty if Yahoo returned nothing.
+    """
+    return ohlc_download_flight.do(f"{symbol}_{source}", _download_ohlc_history, symbol, source, cached_old)
+
+def _download_ohlc_history(symbol: str, source: str, cached_old: Optional[List[Dict]]) -> Dict[str, List[Dict]]:
+    yf_symbol = get_yf_symbol(symbol)
+
+    period, interval = get_ohlc_download_plan()[source]
+    tail = get_ohlc_history_tail(symbol, source, cached_old)
+
+    history = None
+    if tail:
+        # Incremental refresh: only bars from shortly before the cached last (possibly forming) bar
+        fresh = history_to_candles(market_data.history(yf_symbol, interval=interval, start=incremental_start(tail)))
+        if is_readjusted(tail, fresh):
+            logger.info(f"{symbol} {source} history re-adjusted upstream, refetching in full")
+        else:
+            history = extend_ohlc_history(tail, fresh, source)
+
+    if history is None:
+        df = market_data.history(yf_symbol, period=period, interval=interval)
+        history = history_to_candles(df)
+
+    if not history:
+        return {}
+
+    # One download can feed several timeframes - cache all of them, plus the
+    # raw history so the next refresh can be incremental
+    frames = split_ohlc_download(source, history)
+    store_ohlc_timeframes(symbol, {source: history, **frames})
+    return frames
+
+def get_ohlc_series(symbol: str, timeframe: str) -> CandleSeries:
+    """Fetch OHLC bars with Supabase and in-memory caching, as the cached columnar series.
+
+    Cache hits return the cached series itself, so analysis reads its arrays
+    without converting. Concurrent callers for the same symbol/timeframe wait
+    on one in-flight load instead of each probing the caches and Yahoo on their own.
+    """
+    return ohlc_flight.do(f"{symbol}_{timeframe}", _load_ohlc_series, symbol, timeframe)
+
+def get_ohlc_data(symbol: str, timeframe: str) -> List[Dict]:
+    """OHLC bars as candle dicts, for endpoints that serialize candles"""
+    return get_ohlc_series(symbol, timeframe).to_dicts()
+
+def _load_ohlc_series(symbol: str, timeframe: str, retry_count: int = 0, max_retries: int = 5,
+                      started: Optional[float] = None) -> CandleSeries:
+    """Cache lookup and upstream fetch behind get_ohlc_series, with retry logic for rate limits"""
+    cache_key = f"{symbol}_{timeframe}"
+    namespace = f"ohlc_{timeframe}"
+    started = started or time.perf_counter()
+
+    # Check in-memory cache first - batch prefetching fills it for whole scans
+    cached = cache.get("ohlc", cache_key)
+    if cached:
+        return cache_served(namespace, "memory", started, cached)
+
+    # One Supabase read within the retention window: the entry is fresh if cached since
+    # the timeframe last went stale (any age while the market has been closed since)
+    # [] rather than None tells the incremental refresh Supabase was already read
+    cached_old = []
+    stale = CandleSeries.empty()
+    entry = get_ohlc_cache_entry(symbol, timeframe, OHLC_RETAIN_MINUTES)
+    if entry:
+        cached, cached_at = entry
+        if cached_at >= get_ist_now() - timedelta(minutes=ohlc_fresh_minutes(timeframe)):
+            # Keep the row's cached time so the entry expires when it would have in Supabase
+            cache.set("ohlc", cache_key, cached, cached_at)
+            cache_filled(namespace, "persistent")
+            return cache_served(namespace, "persistent", started, cached)
+
+        # Older copy: fallback for rate limit scenarios and incremental-refresh base
+        stale = cached
+        cached_old = cached.to_dicts()
+
+    source = get_ohlc_source(timeframe)
+    if source is None:
+        return cache_served(namespace, "empty", started, CandleSeries.empty())
+
+    try:
+        frames = download_ohlc_history(symbol, source, cached_old if source == timeframe else None)
+
+        if not frames:
+            # If fetch failed but we have old cache, use it
+            if stale:
+                logger.info(f"Using stale cache for {symbol} {timeframe} due to empty response")
+                return cache_served(namespace, "stale", started, stale)
+            return cache_served(namespace, "empty", started, CandleSeries.empty())
+
+        # The series store_ohlc_timeframes just cached for these candles, rather than rebuilding it
+        candles = frames.get(timeframe) or []
+        series = cache.get_stale("ohlc", cache_key) if candles else None
+        if series is None or len(series) != len(candles):
+            series = to_series(candles)
+        return cache_served(namespace, "upstream", started, series)
+    except CircuitOpenError:
+        # Yahoo is degraded - answer from whatever we have instead of retrying
+        stale = stale or cache.get_stale("ohlc", cache_key)
+        if stale:
+            logger.info(f"Using stale cache for {symbol} {timeframe} while Yahoo circuit is open")
+            return cache_served(namespace, "stale", started, stale)
+        return cache_served(namespace, "empty", started, CandleSeries.empty())
     except Exception as e:
         error_msg = str(e)
         # If rate limited, retry with exponential backoff
         if ("Too Many Requests" in error_msg or "Rate limit" in error_msg) and retry_count < max_retries:
             wait_time = min(2 ** retry_count, 30)  # Exponential backoff, max 30 seconds
             logger.warning(f"Rate limited for {symbol} {timeframe}, retrying in {wait_time}s (attempt {retry_count + 1}/{max_retries})")
-            time.sleep(wait_time)
-            return get_ohlc_data(symbol, timeframe, retry_count + 1, max_retries)
+            yahoo_breaker.backoff(wait_time)  # returns early if the circuit opens
+            return _load_ohlc_series(symbol, timeframe, retry_count + 1, max_retries, started)
         elif "Too Many Requests" in error_msg or "Rate limit" in error_msg:
-            if cached_old:
+            if stale:
                 logger.info(f"Using stale cache for {symbol} {timeframe} after max retries")
-                return cached_old
+                return cache_served(namespace, "stale", started, stale)
             logger.error(f"Rate limited for {symbol} {timeframe}, max retries exceeded, no cache available")
         else:
             logger.error(f"Error fetching OHLC for {symbol} {timeframe}: {e}")
-        return []
+        return cache_served(namespace, "empty", started, CandleSeries.empty())
 
 def is_green(candle):
     return candle["close"] > candle["open"]
@@ -481,10 +940,10 @@ def is_green(candle):
 def is_red(candle):
     return candle["close"] < candle["open"]
 
-def get_in_scope_candles(candles: List[Dict], timeframe: str) -> List[Dict]:
-    """Filter candles based on in-scope rules"""
+def get_in_scope_candles(candles: CandleSeries, timeframe: str) -> CandleSeries:
+    """Filter candles based on in-scope rules (a view of the leading bars, no copy)"""
     if not candles:
-        return []
+        return candles
     
     now = get_ist_now()
     weekday = now.weekday()
@@ -503,17 +962,12 @@ def get_in_scope_candles(candles: List[Dict], timeframe: str) -> List[Dict]:
         # For intraday timeframes, if market is closed, include the last candle (it's complete)
         # If market is open, exclude the last candle (it's forming)
         if not market_closed:
-            return candles[:-1] if len(candles) > 1 else []
+            return candles[:-1] if len(candles) > 1 else candles[:0]
         return candles
     
     elif timeframe == "monthly":
-        if not candles:
-            return candles
-        
         try:
-            last_candle = candles[-1]
-            last_candle_date = datetime.fromisoformat(last_candle["timestamp"].replace('Z', '+00:00'))
-            last_candle_date_ist = last_candle_date.astimezone(IST)
+            last_candle_date_ist = datetime.fromtimestamp(int(candles.ts[-1]), IST)
             
             # Check if last candle is from previous month or current month
             last_candle_month = last_candle_date_ist.month
@@ -532,7 +986,7 @@ def get_in_scope_candles(candles: List[Dict], timeframe: str) -> List[Dict]:
                 return candles
             else:
                 # Current month not yet 80% complete, exclude the forming candle
-                return candles[:-1] if len(candles) > 1 else []
+                return candles[:-1] if len(candles) > 1 else candles[:0]
                 
         except Exception as e:
             logger.warning(f"Error parsing monthly candle date: {e}")
@@ -541,16 +995,11 @@ def get_in_scope_candles(candles: List[Dict], timeframe: str) -> List[Dict]:
             if day_of_month >= 24:
                 return candles
             else:
-                return candles[:-1] if len(candles) > 1 else []
+                return candles[:-1] if len(candles) > 1 else candles[:0]
     
     elif timeframe == "weekly":
-        if not candles:
-            return []
-        
         try:
-            last_candle = candles[-1]
-            last_candle_date = datetime.fromisoformat(last_candle["timestamp"].replace('Z', '+00:00'))
-            last_candle_date_ist = last_candle_date.astimezone(IST)
+            last_candle_date_ist = datetime.fromtimestamp(int(candles.ts[-1]), IST)
             
             # Get the start of current week (Monday)
             current_week_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -574,7 +1023,7 @@ def get_in_scope_candles(candles: List[Dict], timeframe: str) -> List[Dict]:
                 return candles
             else:
                 # All other cases - exclude the forming candle
-                return candles[:-1] if len(candles) > 1 else []
+                return candles[:-1] if len(candles) > 1 else candles[:0]
                 
         except Exception as e:
             logger.warning(f"Error parsing weekly candle date: {e}")
@@ -586,167 +1035,63 @@ def get_in_scope_candles(candles: List[Dict], timeframe: str) -> List[Dict]:
             elif weekday == 0 and (hour < 9 or (hour == 9 and minute < 15)):  # Monday before 9:15AM
                 return candles
             else:
-                return candles[:-1] if len(candles) > 1 else []
+                return candles[:-1] if len(candles) > 1 else candles[:0]
     
     return candles
 
-def calculate_udts(candles: List[Dict]) -> Dict:
+def calculate_udts(candles: CandleSeries) -> Dict:
     """Calculate UDTS direction and return G1, R1, R2, G2 candles"""
     if not candles:
         return {"direction": "UNKNOWN", "g1": None, "r1": None, "r2": None, "g2": None}
-    
-    g1_idx = None
-    r1_idx = None
-    
-    for i in range(len(candles) - 1, -1, -1):
-        if is_green(candles[i]):
-            for j in range(i - 1, -1, -1):
-                if is_red(candles[j]):
-                    if candles[i]["close"] > candles[j]["open"]:
-                        g1_idx = i
-                        r1_idx = j
-                    break
-            if g1_idx is not None:
-                break
-    
-    if g1_idx is None:
-        # No G1 found - use alternative logic
-        # Check if there are any closed candles (all candles except the last one which is forming)
-        closed_candles = candles[:-1] if len(candles) > 1 else []
-        
-        if len(closed_candles) == 0:
-            # Case (a): No closed candles - use forming candle's color
-            forming_candle = candles[-1]
-            direction = "UP" if is_green(forming_candle) else "DOWN"
-        else:
-            # Case (b): At least one closed candle exists
-            # Compare newest closed candle's close vs oldest closed candle's open
-            oldest_closed = closed_candles[0]
-            newest_closed = closed_candles[-1]
-            price_diff = newest_closed["close"] - oldest_closed["open"]
-            direction = "UP" if price_diff >= 0 else "DOWN"
-        
-        return {"direction": direction, "g1": None, "r1": None, "r2": None, "g2": None}
-    
-    r2_idx = None
-    g2_idx = None
-    
-    for i in range(g1_idx + 1, len(candles)):
-        if is_red(candles[i]):
-            for j in range(i - 1, -1, -1):
-                if is_green(candles[j]):
-                    if candles[i]["close"] < candles[j]["open"]:
-                        r2_idx = i
-                        g2_idx = j
-                    break
-            if r2_idx is not None:
-                break
-    
-    direction = "DOWN" if r2_idx is not None else "UP"
-    
-    return {
-        "direction": direction,
-        "g1": candles[g1_idx] if g1_idx is not None else None,
-        "r1": candles[r1_idx] if r1_idx is not None else None,
-        "r2": candles[r2_idx] if r2_idx is not None else None,
-        "g2": candles[g2_idx] if g2_idx is not None else None
-    }
 
-def get_support_price(candles: List[Dict], direction: str) -> Optional[float]:
-    """Get support price"""
+    direction, *indices = udts_indices(candles.open, candles.close)
+    g1, r1, r2, g2 = (candles.candle(i) if i != NO_INDEX else None for i in indices)
+    return {"direction": DIRECTION_NAMES[direction], "g1": g1, "r1": r1, "r2": r2, "g2": g2}
+
+def get_support_price(candles: CandleSeries, direction: str) -> Optional[float]:
+    """Get support price: the open of the latest green (UP) or red (DOWN) candle"""
     if not candles:
         return None
-    
-    for i in range(len(candles) - 1, -1, -1):
-        if direction == "UP" and is_green(candles[i]):
-            return candles[i]["open"]
-        elif direction == "DOWN" and is_red(candles[i]):
-            return candles[i]["open"]
-    return None
 
-def get_9_15_to_9_30_candle(candles: List[Dict]) -> Optional[Dict]:
+    if direction == "UP":
+        bars = np.flatnonzero(candles.close > candles.open)
+    elif direction == "DOWN":
+        bars = np.flatnonzero(candles.close < candles.open)
+    else:
+        return None
+    return float(candles.open[bars[-1]]) if len(bars) else None
+
+def get_9_15_to_9_30_candle(candles: CandleSeries) -> Optional[Dict]:
     """Find the most recent 15-min candle for 9:15-9:30 IST"""
     if not candles:
         return None
-    
-    for candle in reversed(candles):
-        try:
-            timestamp = datetime.fromisoformat(candle["timestamp"].replace('Z', '+00:00'))
-            timestamp_ist = timestamp.astimezone(IST)
-            
-            if timestamp_ist.hour == 9 and timestamp_ist.minute == 15:
-                return candle
-        except Exception as e:
-            logger.warning(f"Error parsing candle timestamp: {e}")
-            continue
-    
-    return None
+
+    minute_of_day = (candles.ts + IST_OFFSET_SECONDS) % 86400 // 60
+    bars = np.flatnonzero(minute_of_day == 9 * 60 + 15)
+    return candles.candle(int(bars[-1])) if len(bars) else None
 
 
-def get_todays_session_candles(candles: List[Dict]) -> List[Dict]:
+def get_todays_session_candles(candles: CandleSeries) -> CandleSeries:
     """
     Get all candles from today's trading session (if market open) 
     or last trading session (if market closed)
     """
     if not candles:
-        return []
-    
-    # Get current IST time
-    now = datetime.now(IST)
-    weekday = now.weekday()
-    hour = now.hour
-    minute = now.minute
-    
-    # Check if market is currently open
-    market_open = False
-    if weekday in [0, 1, 2, 3, 4]:  # Monday to Friday
-        if (hour > 9 or (hour == 9 and minute >= 15)) and (hour < 15 or (hour == 15 and minute < 30)):
-            market_open = True
-    
-    # Filter candles for today's or last session
-    session_candles = []
+        return candles
     
-    if market_open:
+    # IST calendar day and hour of every bar
+    local = candles.ts + IST_OFFSET_SECONDS
+    days = local // 86400
+
+    if is_market_currently_open():
         # Market is open - get today's candles (from 9:15 AM today onwards)
-        for candle in candles:
-            try:
-                timestamp = datetime.fromisoformat(candle["timestamp"].replace('Z', '+00:00'))
-                timestamp_ist = timestamp.astimezone(IST)
-                
-                if (timestamp_ist.year == now.year and 
-                    timestamp_ist.month == now.month and 
-                    timestamp_ist.day == now.day and
-                    timestamp_ist.hour >= 9):
-                    session_candles.append(candle)
-            except Exception as e:
-                logger.warning(f"Error parsing candle timestamp: {e}")
-                continue
-    else:
-        # Market is closed - get LAST (most recent) trading session's candles
-        # Iterate in REVERSE to find the most recent session
-        for candle in reversed(candles):
-            try:
-                timestamp = datetime.fromisoformat(candle["timestamp"].replace('Z', '+00:00'))
-                timestamp_ist = timestamp.astimezone(IST)
-                
-                if session_candles:
-                    # Already have some candles, check if this is from same session
-                    first_ts = datetime.fromisoformat(session_candles[0]["timestamp"].replace('Z', '+00:00')).astimezone(IST)
-                    if (timestamp_ist.year == first_ts.year and 
-                        timestamp_ist.month == first_ts.month and 
-                        timestamp_ist.day == first_ts.day):
-                        session_candles.insert(0, candle)  # Insert at beginning to maintain order
-                    else:
-                        # Different day, stop collecting
-                        break
-                else:
-                    # This is the first (most recent) candle - start collecting from this day
-                    session_candles.append(candle)
-            except Exception as e:
-                logger.warning(f"Error parsing candle timestamp: {e}")
-                continue
-    
-    return session_candles
+        today = (int(time.time()) + IST_OFFSET_SECONDS) // 86400
+        return candles.take((days == today) & (local % 86400 // 3600 >= 9))
+
+    # Market is closed - get LAST (most recent) trading session's candles:
+    # the run of bars at the end that share the last bar's day
+    earlier = np.flatnonzero(days != days[-1])
+    return candles[int(earlier[-1]) + 1:] if len(earlier) else candles
 
 def get_latest_closed_candles(candles: List[Dict], min_count: int = 24) -> List[Dict]:
     """Get latest closed candles"""
@@ -755,140 +1100,82 @@ def get_latest_closed_candles(candles: List[Dict], min_count: int = 24) -> List[
     closed = candles[:-1] if len(candles) > 1 else candles
     return closed[-min_count:] if len(closed) > min_count else closed
 
-def calculate_15min_blocks(candles: List[Dict]) -> List[Dict]:
+def get_biggest_trend(candles: CandleSeries) -> Optional[Dict]:
     """
-    Partition candles into blocks using simplified logic for 15-min biggest trend.
-    
-    Logic:
-    1. Start with first candle color - determines first block direction
-    2. Same color candles continue the same block
-    3. Opposite color candle triggers trend change check:
-       - If previous is GREEN and current is RED: check if RED close < GREEN open
-       - If previous is RED and current is GREEN: check if GREEN close > RED open
-       - If condition met: trend changes, new block starts
-       - If condition not met: continue same block
-    4. Calculate power for each block as max - min of all opens/closes
-    """
-    if not candles or len(candles) < 1:
-        return []
-    
-    blocks = []
-    current_block = [candles[0]]
-    current_direction = "UP" if is_green(candles[0]) else "DOWN"
-    
-    for i in range(1, len(candles)):
-        current_candle = candles[i]
-        previous_candle = candles[i - 1]
-        current_color = "GREEN" if is_green(current_candle) else "RED"
-        previous_color = "GREEN" if is_green(previous_candle) else "RED"
-        
-        # Check if candle color matches current block direction
-        if current_direction == "UP" and current_color == "GREEN":
-            # Same color, continue block
-            current_block.append(current_candle)
-        elif current_direction == "DOWN" and current_color == "RED":
-            # Same color, continue block
-            current_block.append(current_candle)
-        else:
-            # Opposite color - check if trend actually changes
-            trend_changed = False
-            
-            if current_direction == "UP" and current_color == "RED":
-                # Was UP (previous GREEN), now RED - check if RED close < GREEN open
-                if current_candle["close"] < previous_candle["open"]:
-                    trend_changed = True
-            elif current_direction == "DOWN" and current_color == "GREEN":
-                # Was DOWN (previous RED), now GREEN - check if GREEN close > RED open
-                if current_candle["close"] > previous_candle["open"]:
-                    trend_changed = True
-            
-            if trend_changed:
-                # Save current block
-                block_opens_closes = []
-                for c in current_block:
-                    block_opens_closes.extend([c["open"], c["close"]])
-                
-                if block_opens_closes:
-                    blocks.append({
-                        "candles": current_block.copy(),
-                        "direction": current_direction,
-                        "power": max(block_opens_closes) - min(block_opens_closes),
-                        "start_price": current_block[0]["open"],
-                        "low": min(block_opens_closes),
-                        "high": max(block_opens_closes)
-                    })
-                
-                # Start new block
-                current_block = [current_candle]
-                current_direction = "UP" if current_color == "GREEN" else "DOWN"
-            else:
-                # No trend change, continue same block
-                current_block.append(current_candle)
-    
-    # Save the last block
-    if current_block:
-        block_opens_closes = []
-        for c in current_block:
-            block_opens_closes.extend([c["open"], c["close"]])
-        
-        if block_opens_closes:
-            blocks.append({
-                "candles": current_block,
-                "direction": current_direction,
-                "power": max(block_opens_closes) - min(block_opens_closes),
-                "start_price": current_block[0]["open"],
-                "low": min(block_opens_closes),
-                "high": max(block_opens_closes)
-            })
-    
-    return blocks
+    Biggest 15-min trend block of a candle list, with its start and end candles
 
-def get_biggest_trend(blocks: List[Dict]) -> Optional[Dict]:
-    """Get block with maximum power (first occurrence from left to right)"""
-    if not blocks:
+    Blocks and their power (max - min of the block's opens/closes) come from
+    udts.trend_blocks; the first block with maximum power, left to right on
+    the chart, wins.
+    """
+    if not candles:
         return None
-    
-    max_power = max(b["power"] for b in blocks)
-    # Return the FIRST block with max power (left to right on chart)
-    for b in blocks:
-        if b["power"] == max_power:
-            # Add start and end candle details
-            candles = b.get("candles", [])
-            if candles:
-                start_candle = candles[0]
-                end_candle = candles[-1]
-                b["start_candle"] = {
-                    "datetime": start_candle.get("timestamp"),  # Fixed: was "datetime", should be "timestamp"
-                    "open": start_candle.get("open"),
-                    "close": start_candle.get("close")
-                }
-                b["end_candle"] = {
-                    "datetime": end_candle.get("timestamp"),  # Fixed: was "datetime", should be "timestamp"
-                    "open": end_candle.get("open"),
-                    "close": end_candle.get("close")
-                }
-            return b
-    return blocks[0]
 
-def get_institutional_holding_percentage(symbol: str) -> str:
-    """Get absolute % of shares held by institutional investors"""
-    # Check Supabase first
-    cached = get_institutional_cache(symbol, 129600)
-    if cached:
+    trend = find_biggest_trend(candles.open, candles.close)
+    start_candle = candles.candle(trend["start"])
+    end_candle = candles.candle(trend["end"])
+    trend["start_candle"] = {
+        "datetime": start_candle.get("timestamp"),
+        "open": start_candle.get("open"),
+        "close": start_candle.get("close")
+    }
+    trend["end_candle"] = {
+        "datetime": end_candle.get("timestamp"),
+        "open": end_candle.get("open"),
+        "close": end_candle.get("close")
+    }
+    return trend
+
+def get_ticker_info(symbol: str) -> Dict:
+    """
+    Raw Ticker.info payload, fetched from Yahoo at most once per symbol per day
+
+    Fundamentals and institutional holdings are both extracted from this one
+    payload. Upstream errors propagate so callers keep their own retry and
+    fallback handling.
+    """
+    cached = cache.get("ticker_info", symbol)
+    if cached is not None:
         return cached
 
-    # Check in-memory cache
-    with cache_lock:
-        if symbol in cache["institutional_holdings"] and is_cache_valid(
-            cache["institutional_holdings"][symbol]["timestamp"], 129600
-        ):
-            return cache["institutional_holdings"][symbol]["data"]
+    return info_flight.do(symbol, _fetch_ticker_info, symbol)
 
-    try:
-        ticker = yf.Ticker(get_yf_symbol(symbol))
+def _fetch_ticker_info(symbol: str) -> Dict:
+    info = market_data.info(get_yf_symbol(symbol)) or {}
+
+    cache.set("ticker_info", symbol, info)
+    return info
+
+def get_institutional_holding_percentage(symbol: str, info: Optional[Dict] = None) -> str:
+    """Get absolute % of shares held by institutional investors.
+
+    `info` is an already-fetched Ticker.info payload; when omitted the shared
+    get_ticker_info copy is used. Concurrent callers for the same symbol share
+    one in-flight load.
+    """
+    return institutional_flight.do(symbol, _load_institutional_holding_percentage, symbol, info)
 
+def _load_institutional_holding_percentage(symbol: str, info: Optional[Dict] = None) -> str:
+    """Cache lookup and upstream fetch behind get_institutional_holding_percentage"""
+    started = time.perf_counter()
+
+    # Check in-memory cache first - scans bulk-load it from Supabase
+    cached = cache.get("institutional_holdings", symbol)
+    if cached:
+        return cache_served("institutional_holdings", "memory", started, cached)
+
+    # Check Supabase
+    entry = get_institutional_cache_entry(symbol, 129600)
+    if entry and entry[0]:
+        cached, cached_at = entry
+        cache.set("institutional_holdings", symbol, cached, cached_at)
+        cache_filled("institutional_holdings", "persistent")
+        return cache_served("institutional_holdings", "persistent", started, cached)
+
+    try:
         try:
-            info = ticker.info
+            if info is None:
+                info = get_ticker_info(symbol)
             held_pct = info.get('heldPercentInstitutions', None)
 
             if held_pct is not None:
@@ -896,19 +1183,20 @@ def get_institutional_holding_percentage(symbol: str) -> str:
                 result = f"{pct_value:.2f}"
 
                 save_institutional_cache(symbol, result)
-                with cache_lock:
-                    cache["institutional_holdings"][symbol] = {
-                        "data": result,
-                        "timestamp": get_ist_now()
-                    }
+                cache.set("institutional_holdings", symbol, result)
+                cache_filled("institutional_holdings", "upstream")
 
                 logger.info(f"{symbol}: Institutional holding = {result}% (Method 1)")
-                return result
+                return cache_served("institutional_holdings", "upstream", started, result)
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.warning(f"{symbol}: Could not use info['heldPercentInstitutions']: {e}")
 
+        # Lazy fallback - major_holders is a separate request, only made when
+        # the info payload lacks the institutional figure
         try:
-            major_holders = ticker.major_holders
+            major_holders = market_data.major_holders(get_yf_symbol(symbol))
 
             if major_holders is not None and not major_holders.empty:
                 for idx, row in major_holders.iterrows():
@@ -920,65 +1208,80 @@ def get_institutional_holding_percentage(symbol: str) -> str:
                             result = f"{pct_value:.2f}"
 
                             save_institutional_cache(symbol, result)
-                            with cache_lock:
-                                cache["institutional_holdings"][symbol] = {
-                                    "data": result,
-                                    "timestamp": get_ist_now()
-                                }
+                            cache.set("institutional_holdings", symbol, result)
+                            cache_filled("institutional_holdings", "upstream")
 
                             logger.info(f"{symbol}: Institutional holding = {result}% (Method 2)")
-                            return result
+                            return cache_served("institutional_holdings", "upstream", started, result)
                         except ValueError:
                             pass
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.warning(f"{symbol}: Could not use major_holders: {e}")
 
         result = "NA"
         save_institutional_cache(symbol, result)
-        with cache_lock:
-            cache["institutional_holdings"][symbol] = {
-                "data": result,
-                "timestamp": get_ist_now()
-            }
+        cache.set("institutional_holdings", symbol, result)
+        cache_filled("institutional_holdings", "upstream")
 
         logger.info(f"{symbol}: Institutional holdings data not available")
-        return result
-
+        return cache_served("institutional_holdings", "upstream", started, result)
+
+    except CircuitOpenError:
+        # Yahoo is degraded - answer from whatever we have, and cache nothing: an "NA"
+        # stored now would hide the real figure for the whole 90-day TTL
+        stale = cache.get_stale("institutional_holdings", symbol)
+        if not stale:
+            entry = get_institutional_cache_entry(symbol, None)
+            stale = entry[0] if entry else None
+        if stale:
+            logger.info(f"Using stale cache for {symbol} institutional holding while Yahoo circuit is open")
+            return cache_served("institutional_holdings", "stale", started, stale)
+        return cache_served("institutional_holdings", "empty", started, "NA")
     except Exception as e:
         logger.error(f"{symbol}: Error fetching institutional holding: {e}")
         result = "NA"
 
         save_institutional_cache(symbol, result)
-        with cache_lock:
-            cache["institutional_holdings"][symbol] = {
-                "data": result,
-                "timestamp": get_ist_now()
-            }
+        cache.set("institutional_holdings", symbol, result)
 
-        return result
+        return cache_served("institutional_holdings", "empty", started, result)
 
-def get_fundamentals(symbol: str, retry_count: int = 0, max_retries: int = 5) -> Dict:
-    """Fetch fundamental data with Supabase and in-memory caching, with retry logic for rate limits"""
-    # Check Supabase first (24 hours validity)
-    cached = get_fundamentals_cache(symbol, 1440)
-    if cached:
-        return cached
+def get_fundamentals(symbol: str) -> Dict:
+    """Fetch fundamental data with Supabase and in-memory caching.
 
-    # Try older cache (7 days) as fallback
-    cached_old = get_fundamentals_cache(symbol, 10080)
+    Concurrent callers for the same symbol share one in-flight load.
+    """
+    return fundamentals_flight.do(symbol, _load_fundamentals, symbol)
+
+def _load_fundamentals(symbol: str, retry_count: int = 0, max_retries: int = 5,
+                       started: Optional[float] = None) -> Dict:
+    """Cache lookup and upstream fetch behind get_fundamentals, with retry logic for rate limits"""
+    started = started or time.perf_counter()
 
-    # Check in-memory cache
-    with cache_lock:
-        if symbol in cache["fundamentals"] and is_cache_valid(cache["fundamentals"][symbol]["timestamp"], 1440):
-            return cache["fundamentals"][symbol]["data"]
+    # Check in-memory cache first - scans bulk-load it from Supabase
+    cached = cache.get("fundamentals", symbol)
+    if cached:
+        return cache_served("fundamentals", "memory", started, cached)
+
+    # One Supabase read: fresh within 24 hours, usable as a fallback for 7 days
+    cached_old = None
+    entry = get_fundamentals_cache_entry(symbol, 10080)
+    if entry:
+        cached, cached_at = entry
+        if cached_at >= get_ist_now() - timedelta(minutes=1440):
+            cache.set("fundamentals", symbol, cached, cached_at)
+            cache_filled("fundamentals", "persistent")
+            return cache_served("fundamentals", "persistent", started, cached)
+        cached_old = cached
 
     try:
-        ticker = yf.Ticker(get_yf_symbol(symbol))
-        info = ticker.info
+        info = get_ticker_info(symbol)
 
         sector = info.get("sector", None)
         industry = info.get("industry", None)
-        inst_holding_pct = get_institutional_holding_percentage(symbol)
+        inst_holding_pct = get_institutional_holding_percentage(symbol, info)
 
         # Get analyst count
         analyst_count = info.get("numberOfAnalystOpinions", None)
@@ -1032,241 +1335,198 @@ def get_fundamentals(symbol: str, retry_count: int = 0, max_retries: int = 5) ->
             fundamentals["market_cap_tkc"] = None
 
         save_fundamentals_cache(symbol, fundamentals)
-        with cache_lock:
-            cache["fundamentals"][symbol] = {"data": fundamentals, "timestamp": get_ist_now()}
-
-        return fundamentals
+        cache.set("fundamentals", symbol, fundamentals)
+        cache_filled("fundamentals", "upstream")
+
+        return cache_served("fundamentals", "upstream", started, fundamentals)
+    except CircuitOpenError:
+        stale = cached_old or cache.get_stale("fundamentals", symbol)
+        if stale:
+            logger.info(f"Using stale cache for {symbol} fundamentals while Yahoo circuit is open")
+            return cache_served("fundamentals", "stale", started, stale)
+        return cache_served("fundamentals", "empty", started, {})
     except Exception as e:
         error_msg = str(e)
         # If rate limited, retry with exponential backoff
         if ("Too Many Requests" in error_msg or "Rate limit" in error_msg) and retry_count < max_retries:
             wait_time = min(2 ** retry_count, 30)  # Exponential backoff, max 30 seconds
             logger.warning(f"Rate limited for {symbol} fundamentals, retrying in {wait_time}s (attempt {retry_count + 1}/{max_retries})")
-            time.sleep(wait_time)
-            return get_fundamentals(symbol, retry_count + 1, max_retries)
+            yahoo_breaker.backoff(wait_time)  # returns early if the circuit opens
+            return _load_fundamentals(symbol, retry_count + 1, max_retries, started)
         elif "Too Many Requests" in error_msg or "Rate limit" in error_msg:
             if cached_old:
                 logger.info(f"Using stale cache for {symbol} fundamentals after max retries")
-                return cached_old
+                return cache_served("fundamentals", "stale", started, cached_old)
             logger.error(f"Rate limited for {symbol} fundamentals, max retries exceeded, no cache available")
         else:
             logger.error(f"Error fetching fundamentals for {symbol}: {e}")
-        return {}
+        return cache_served("fundamentals", "empty", started, {})
 
 
-def calculate_rsi(candles: List[Dict], period: int = 14) -> Optional[float]:
-    """Calculate RSI (Relative Strength Index) for the latest candle"""
-    try:
-        if not candles or len(candles) < period + 1:
-            return None
-        
-        # Convert to pandas DataFrame
-        df = pd.DataFrame(candles)
-        if 'close' not in df.columns or df['close'].isna().all():
-            return None
-        
-        # Calculate RSI using ta library
-        rsi_series = ta.momentum.RSIIndicator(close=df['close'], window=period).rsi()
-        
-        # Get the last RSI value
-        if not rsi_series.empty and not pd.isna(rsi_series.iloc[-1]):
-            return round(float(rsi_series.iloc[-1]), 2)
-        return None
-    except Exception as e:
-        logger.warning(f"Error calculating RSI: {e}")
-        return None
+def calculate_indicators(candles: CandleSeries, rsi_period: Optional[int] = None, adx_period: Optional[int] = None,
+                         atr_period: Optional[int] = None, multiplier: float = 3.0,
+                         bb_period: Optional[int] = None, bb_std_dev: float = 2.0) -> Dict:
+    """
+    Latest RSI, ADX, Supertrend and Bollinger %B of a candle list
 
-def calculate_adx(candles: List[Dict], period: int = 14) -> Optional[float]:
-    """Calculate ADX (Average Directional Index) for the latest candle"""
-    try:
-        if not candles or len(candles) < period + 1:
-            return None
-        
-        # Convert to pandas DataFrame
-        df = pd.DataFrame(candles)
-        required_cols = ['high', 'low', 'close']
-        if not all(col in df.columns for col in required_cols):
-            return None
-        if df[required_cols].isna().all().any():
-            return None
-        
-        # Calculate ADX using ta library
-        adx_series = ta.trend.ADXIndicator(
-            high=df['high'], 
-            low=df['low'], 
-            close=df['close'], 
-            window=period
-        ).adx()
-        
-        # Get the last ADX value
-        if not adx_series.empty and not pd.isna(adx_series.iloc[-1]):
-            return round(float(adx_series.iloc[-1]), 2)
-        return None
-    except Exception as e:
-        logger.warning(f"Error calculating ADX: {e}")
-        return None
+    Every indicator whose period is given is computed straight from the
+    series' price arrays (indicators.compute_indicators, latest
+    values only). Returns {"rsi", "adx", "supertrend", "bb_pct"}, each None if
+    not requested, there are too few candles or there is no valid value.
+    """
+    results = {"rsi": None, "adx": None, "supertrend": None, "bb_pct": None}
+    if not candles:
+        return results
 
-def calculate_supertrend(candles: List[Dict], atr_period: int = 10, multiplier: float = 3.0) -> Optional[Dict]:
-    """Calculate Supertrend indicator for the latest candle"""
     try:
-        if not candles or len(candles) < atr_period + 1:
-            return None
-        
-        # Convert to pandas DataFrame
-        df = pd.DataFrame(candles)
-        required_cols = ['high', 'low', 'close']
-        if not all(col in df.columns for col in required_cols):
-            return None
-        if df[required_cols].isna().all().any():
-            return None
-        
-        # Calculate ATR
-        atr = ta.volatility.AverageTrueRange(
-            high=df['high'],
-            low=df['low'],
-            close=df['close'],
-            window=atr_period
-        ).average_true_range()
-        
-        # Calculate basic bands
-        hl_avg = (df['high'] + df['low']) / 2
-        upper_band = hl_avg + (multiplier * atr)
-        lower_band = hl_avg - (multiplier * atr)
-        
-        # Initialize supertrend
-        supertrend = pd.Series(index=df.index, dtype=float)
-        direction = pd.Series(index=df.index, dtype=str)
-        
-        # First valid supertrend value
-        first_valid_idx = atr.first_valid_index()
-        if first_valid_idx is None:
-            return None
-        
-        supertrend.iloc[first_valid_idx] = lower_band.iloc[first_valid_idx]
-        direction.iloc[first_valid_idx] = 'UP'
-        
-        # Calculate supertrend for rest of the data
-        for i in range(first_valid_idx + 1, len(df)):
-            prev_supertrend = supertrend.iloc[i-1]
-            prev_direction = direction.iloc[i-1]
-            curr_close = df['close'].iloc[i]
-            curr_lower = lower_band.iloc[i]
-            curr_upper = upper_band.iloc[i]
-            
-            if pd.isna(prev_supertrend):
-                supertrend.iloc[i] = curr_lower
-                direction.iloc[i] = 'UP'
-                continue
-            
-            # Update bands based on previous supertrend
-            if curr_lower > prev_supertrend:
-                final_lower = curr_lower
-            else:
-                final_lower = prev_supertrend if prev_direction == 'UP' else curr_lower
-                
-            if curr_upper < prev_supertrend:
-                final_upper = curr_upper
-            else:
-                final_upper = prev_supertrend if prev_direction == 'DOWN' else curr_upper
-            
-            # Determine direction
-            if prev_direction == 'UP':
-                if curr_close <= final_lower:
-                    supertrend.iloc[i] = final_upper
-                    direction.iloc[i] = 'DOWN'
-                else:
-                    supertrend.iloc[i] = final_lower
-                    direction.iloc[i] = 'UP'
-            else:  # prev_direction == 'DOWN'
-                if curr_close >= final_upper:
-                    supertrend.iloc[i] = final_lower
-                    direction.iloc[i] = 'UP'
-                else:
-                    supertrend.iloc[i] = final_upper
-                    direction.iloc[i] = 'DOWN'
-        
-        # Get last values
-        last_close = df['close'].iloc[-1]
-        last_supertrend = supertrend.iloc[-1]
-        last_direction = direction.iloc[-1]
-        
-        if pd.isna(last_supertrend) or pd.isna(last_close):
-            return None
-        
-        # Determine if price is above or below supertrend
-        if last_close > last_supertrend:
-            trend = "UP"
-        else:
-            trend = "DOWN"
-        
-        return {
-            "direction": trend,
-            "level": round(float(last_supertrend), 2)
-        }
+        high, low, close = candles.high, candles.low, candles.close
+        n = len(close)
+        has_close = not np.isnan(close).all()
+        has_hlc = has_close and not np.isnan(high).all() and not np.isnan(low).all()
+
+        values = compute_indicators(
+            high, low, close,
+            rsi_period=rsi_period if rsi_period and n >= rsi_period + 1 and has_close else None,
+            adx_period=adx_period if adx_period and n >= adx_period + 1 and has_hlc else None,
+            atr_period=atr_period if atr_period and n >= atr_period + 1 and has_hlc else None,
+            multiplier=multiplier,
+            bb_period=bb_period if bb_period and n >= bb_period and has_close else None,
+            bb_std_dev=bb_std_dev,
+            last_only=True,
+        )
     except Exception as e:
-        logger.warning(f"Error calculating Supertrend: {e}")
-        return None
+        logger.warning(f"Error calculating indicators: {e}")
+        return results
+
+    for name in ("rsi", "adx", "bb_pct"):
+        value = values.get(name)
+        if value is not None and not np.isnan(value):
+            results[name] = round(float(value), 2)
+
+    level = values.get("supertrend")
+    last_close = close[-1]
+    if level is not None and not np.isnan(level) and not np.isnan(last_close):
+        # Price above or below the Supertrend level
+        results["supertrend"] = {
+            "direction": "UP" if last_close > level else "DOWN",
+            "level": round(float(level), 2)
+        }
+    return results
+
+UDTS_TIMEFRAMES = ["monthly", "weekly", "daily", "1hour", "15min"]
+
+# Analysis-result cache: analyze_stock output keyed by a fingerprint of its inputs.
+# Bump ANALYSIS_VERSION whenever the analysis calculations change.
+ANALYSIS_VERSION = "1"
+ANALYSIS_CACHE_PERSIST = os.environ.get('ANALYSIS_CACHE_PERSIST', 'true').lower() == 'true'
+# Bars hashed from each end of every timeframe's history
+ANALYSIS_FINGERPRINT_BARS = 5
+ANALYSIS_SECONDS = metrics_registry.histogram(
+    "makstox_analysis_compute_seconds", "Time spent computing analyses on analysis cache misses"
+)
+
+def load_candle_bundle(symbol: str) -> Dict[str, Dict[str, CandleSeries]]:
+    """
+    Load every timeframe for one analysis exactly once
 
-def calculate_bollinger_bands_pct(candles: List[Dict], period: int = 20, std_dev: float = 2.0) -> Optional[float]:
-    """Calculate Bollinger Bands %B for the latest candle
-    %B = ((close - lower_band) / (upper_band - lower_band)) * 100
+    Returns {"raw": {tf: series}, "in_scope": {tf: series}} so analyze_stock
+    and the calculations it calls never go back to the cache layers for the
+    same symbol/timeframe.
     """
+    raw = {tf: get_ohlc_series(symbol, tf) for tf in UDTS_TIMEFRAMES}
+    in_scope = {tf: get_in_scope_candles(raw[tf], tf) for tf in UDTS_TIMEFRAMES}
+    return {"raw": raw, "in_scope": in_scope}
+
+def analysis_fingerprint(bundle: Dict[str, Dict[str, CandleSeries]], fundamentals: Dict) -> str:
+    """
+    Hash of every input an analysis result depends on
+
+    Covers the analysis version, the fundamentals, and per timeframe the bar
+    counts (raw and in-scope) plus the first and last bars - histories only
+    change by bars being appended, the forming bar updating, or the whole
+    series being re-adjusted, all of which show at the ends. The session
+    state is included because forming-bar handling depends on the clock.
+    """
+    market_open = is_market_currently_open()
+    inputs = {
+        "version": ANALYSIS_VERSION,
+        "session": get_ist_now().date().isoformat() if market_open else "closed",
+        "candles": {
+            tf: [
+                len(bundle["raw"][tf]),
+                len(bundle["in_scope"][tf]),
+                bundle["raw"][tf][:ANALYSIS_FINGERPRINT_BARS].to_payload(),
+                bundle["raw"][tf][-ANALYSIS_FINGERPRINT_BARS:].to_payload(),
+            ]
+            for tf in UDTS_TIMEFRAMES
+        },
+        "fundamentals": fundamentals,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+def get_cached_analysis(symbol: str, fingerprint: str) -> Optional[Dict]:
+    """Cached analysis result for a symbol if it was computed from the same inputs"""
+    started = time.perf_counter()
+    source = "memory"
+    entry = cache.get("analysis", symbol)
+    if entry is None and ANALYSIS_CACHE_PERSIST:
+        source = "persistent"
+        entry = get_analysis_cache(symbol)
+        if entry:
+            cache.set("analysis", symbol, entry)
+            cache_filled("analysis", "persistent")
+
+    if entry and entry.get("fingerprint") == fingerprint:
+        return cache_served("analysis", source, started, dict(entry["result"]))
+    # Missing or computed from different inputs
+    return cache_served("analysis", "miss", started, None)
+
+def store_analysis(symbol: str, fingerprint: str, result: Dict):
+    """Cache an analysis result in memory and, if enabled, the persistent cache"""
+    entry = {"fingerprint": fingerprint, "result": result}
+    cache.set("analysis", symbol, entry)
+    cache_filled("analysis", "computed")
+    if ANALYSIS_CACHE_PERSIST:
+        save_analysis_cache(symbol, entry)
+
+def analyze_stock(symbol: str) -> Dict:
+    """Full analysis for a single stock, reused from the analysis cache while its inputs are unchanged"""
     try:
-        if not candles or len(candles) < period:
-            return None
-        
-        # Convert to pandas DataFrame
-        df = pd.DataFrame(candles)
-        if 'close' not in df.columns or df['close'].isna().all():
-            return None
-        
-        # Calculate Bollinger Bands using ta library
-        bb = ta.volatility.BollingerBands(close=df['close'], window=period, window_dev=std_dev)
-        upper_band = bb.bollinger_hband()
-        lower_band = bb.bollinger_lband()
-        
-        # Get last values
-        last_close = df['close'].iloc[-1]
-        last_upper = upper_band.iloc[-1]
-        last_lower = lower_band.iloc[-1]
-        
-        if pd.isna(last_close) or pd.isna(last_upper) or pd.isna(last_lower):
-            return None
-        
-        # Avoid division by zero
-        band_width = last_upper - last_lower
-        if band_width == 0:
-            return None
-        
-        # Calculate %B
-        pct_b = ((last_close - last_lower) / band_width) * 100
-        return round(float(pct_b), 2)
+        bundle = load_candle_bundle(symbol)
+        fundamentals = get_fundamentals(symbol)
+        fingerprint = analysis_fingerprint(bundle, fundamentals)
     except Exception as e:
-        logger.warning(f"Error calculating Bollinger Bands %B: {e}")
-        return None
+        logger.error(f"Error analyzing {symbol}: {e}")
+        return {"symbol": symbol, "error": str(e)}
 
-def analyze_stock(symbol: str) -> Dict:
-    """Full analysis for a single stock"""
+    cached = get_cached_analysis(symbol, fingerprint)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    result = compute_analysis(symbol, bundle, fundamentals)
+    ANALYSIS_SECONDS.observe(time.perf_counter() - started)
+    if not result["error"]:
+        store_analysis(symbol, fingerprint, result)
+    return result
+
+def compute_analysis(symbol: str, bundle: Dict[str, Dict[str, CandleSeries]], fundamentals: Dict) -> Dict:
+    """Full analysis for a single stock from its loaded candles and fundamentals"""
     result = {"symbol": symbol, "error": None}
     
     try:
-        timeframes = ["monthly", "weekly", "daily", "1hour", "15min"]
-        ohlc_data = {}
+        timeframes = UDTS_TIMEFRAMES
+        ohlc_data = bundle["in_scope"]
         udts_results = {}
         support_prices = {}
         
         for tf in timeframes:
-            candles = get_ohlc_data(symbol, tf)
-            in_scope = get_in_scope_candles(candles, tf)
-            ohlc_data[tf] = in_scope
-            udts_result = calculate_udts(in_scope)
-            udts_results[tf] = udts_result
+            udts_results[tf] = calculate_udts(ohlc_data[tf])
         
-        fundamentals = get_fundamentals(symbol)
         analyst_count = fundamentals.get("analyst_count")
         
         # Get ALL daily candles (not in-scope) to calculate CMP and CMP change
-        all_daily_candles = get_ohlc_data(symbol, "daily")
+        all_daily_candles = bundle["raw"]["daily"]
         
         # CMP is the last candle's close price (whether forming or complete)
         cmp = None
@@ -1274,11 +1534,11 @@ def analyze_stock(symbol: str) -> Dict:
         previous_close = None
         
         if all_daily_candles and len(all_daily_candles) >= 1:
-            cmp = all_daily_candles[-1]["close"]
+            cmp = float(all_daily_candles.close[-1])
         
         if all_daily_candles and len(all_daily_candles) >= 2:
-            latest_close = all_daily_candles[-1]["close"]
-            previous_close = all_daily_candles[-2]["close"]
+            latest_close = float(all_daily_candles.close[-1])
+            previous_close = float(all_daily_candles.close[-2])
             
             # Calculate CMP change percentage: how much % the latest close changed from previous close
             if latest_close and previous_close and previous_close > 0:
@@ -1286,24 +1546,16 @@ def analyze_stock(symbol: str) -> Dict:
         
         # Calculate 2yr high % from monthly chart
         # Get ALL monthly candles (including last candle, even if not in scope)
-        all_monthly_candles = get_ohlc_data(symbol, "monthly")
+        all_monthly_candles = bundle["raw"]["monthly"]
         two_yr_high_pct = None
         
         if all_monthly_candles and len(all_monthly_candles) >= 1:
             # Find highest open or close price in ALL monthly candles
-            all_monthly_prices = []
-            for candle in all_monthly_candles:
-                if candle.get("open") is not None:
-                    all_monthly_prices.append(candle["open"])
-                if candle.get("close") is not None:
-                    all_monthly_prices.append(candle["close"])
-            
-            if all_monthly_prices:
-                highest_monthly_price = max(all_monthly_prices)
-                last_monthly_close = all_monthly_candles[-1].get("close")
-                
-                if last_monthly_close and last_monthly_close > 0:
-                    two_yr_high_pct = round(((highest_monthly_price / last_monthly_close) - 1) * 100, 2)
+            highest_monthly_price = float(max(all_monthly_candles.open.max(), all_monthly_candles.close.max()))
+            last_monthly_close = float(all_monthly_candles.close[-1])
+
+            if last_monthly_close and last_monthly_close > 0:
+                two_yr_high_pct = round(((highest_monthly_price / last_monthly_close) - 1) * 100, 2)
         
         is_triple_up = all(udts_results[tf]["direction"] == "UP" for tf in ["monthly", "weekly", "daily"])
         is_triple_down = all(udts_results[tf]["direction"] == "DOWN" for tf in ["monthly", "weekly", "daily"])
@@ -1350,7 +1602,7 @@ def analyze_stock(symbol: str) -> Dict:
                     cmp_score = 0
         
         # Get ALL candles from today's trading session (or last session if market closed)
-        all_15min_candles = get_ohlc_data(symbol, "15min")
+        all_15min_candles = bundle["raw"]["15min"]
         todays_session_candles = get_todays_session_candles(all_15min_candles)
         
         # Remove the last candle ONLY if market is currently open (it's incomplete/forming)
@@ -1363,8 +1615,7 @@ def analyze_stock(symbol: str) -> Dict:
             closed_session_candles = todays_session_candles
         
         # Calculate blocks for biggest trend using ALL session candles
-        blocks_15min = calculate_15min_blocks(closed_session_candles) if closed_session_candles else []
-        biggest_trend = get_biggest_trend(blocks_15min)
+        biggest_trend = get_biggest_trend(closed_session_candles)
         
         candle_9_15_to_9_30 = get_9_15_to_9_30_candle(all_15min_candles)
         
@@ -1442,18 +1693,21 @@ def analyze_stock(symbol: str) -> Dict:
         
         # Calculate technical indicators using LATEST candle (whether forming or closed)
         # Daily indicators
-        daily_rsi = calculate_rsi(all_daily_candles, period=14)
-        daily_adx = calculate_adx(all_daily_candles, period=14)
-        daily_supertrend = calculate_supertrend(all_daily_candles, atr_period=10, multiplier=3.0)
-        daily_bb_pct = calculate_bollinger_bands_pct(all_daily_candles, period=20, std_dev=2.0)
+        daily_indicators = calculate_indicators(
+            all_daily_candles, rsi_period=14, adx_period=14, atr_period=10, multiplier=3.0,
+            bb_period=20, bb_std_dev=2.0
+        )
+        daily_rsi = daily_indicators["rsi"]
+        daily_adx = daily_indicators["adx"]
+        daily_supertrend = daily_indicators["supertrend"]
+        daily_bb_pct = daily_indicators["bb_pct"]
         
         # Weekly indicators
-        all_weekly_candles = get_ohlc_data(symbol, "weekly")
-        weekly_bb_pct = calculate_bollinger_bands_pct(all_weekly_candles, period=20, std_dev=2.0)
+        all_weekly_candles = bundle["raw"]["weekly"]
+        weekly_bb_pct = calculate_indicators(all_weekly_candles, bb_period=20, bb_std_dev=2.0)["bb_pct"]
         
         # Monthly indicators
-        all_monthly_candles = get_ohlc_data(symbol, "monthly")
-        monthly_bb_pct = calculate_bollinger_bands_pct(all_monthly_candles, period=20, std_dev=2.0)
+        monthly_bb_pct = calculate_indicators(all_monthly_candles, bb_period=20, bb_std_dev=2.0)["bb_pct"]
         
         result.update({
             "udts": {tf: udts_results[tf]["direction"] for tf in timeframes},
@@ -1536,11 +1790,10 @@ def calculate_nifty50_ad():
     for symbol in nifty50_symbols:
         try:
             yf_symbol = get_yf_symbol(symbol)
-            ticker = yf.Ticker(yf_symbol)
             
             if market_open:
-                intraday = ticker.history(period="1d", interval="5m")
-                daily = ticker.history(period="5d", interval="1d")
+                intraday = market_data.history(yf_symbol, period="1d", interval="5m")
+                daily = market_data.history(yf_symbol, period="5d", interval="1d")
                 
                 if not intraday.empty and len(daily) >= 2:
                     curr_price = float(intraday["Close"].iloc[-1])
@@ -1558,7 +1811,7 @@ def calculate_nifty50_ad():
                     elif curr_close < prev_close:
                         declines += 1
             else:
-                daily = ticker.history(period="5d", interval="1d")
+                daily = market_data.history(yf_symbol, period="5d", interval="1d")
                 
                 if len(daily) >= 2:
                     curr_close = float(daily["Close"].iloc[-1])
@@ -1578,16 +1831,16 @@ def calculate_nifty50_ad():
 
 def get_nifty50_data() -> Dict:
     """Get NIFTY 50 index data with fallback to last available data"""
-    # Check in-memory cache first (15 min validity)
-    with cache_lock:
-        if cache["nifty50"]["data"] and is_cache_valid(cache["nifty50"]["timestamp"], 15):
-            return cache["nifty50"]["data"]
+    started = time.perf_counter()
+
+    # Check in-memory cache first (valid until the next 15-minute close)
+    cached = cache.get("nifty50", "index")
+    if cached:
+        return cache_served("nifty50", "memory", started, cached)
     
     try:
-        nifty = yf.Ticker("^NSEI")
-        
         # Get daily data first (for prices and pivot)
-        daily = nifty.history(period="5d", interval="1d")
+        daily = market_data.history("^NSEI", period="5d", interval="1d")
         
         # If no daily data available, try to get from Supabase (last available session)
         if daily.empty:
@@ -1595,12 +1848,12 @@ def get_nifty50_data() -> Dict:
             cached = get_stock_list('nifty50_index', None)
             if cached:
                 logger.info("Using last available NIFTY50 data from Supabase")
-                return cached
+                return cache_served("nifty50", "stale", started, cached)
             logger.warning("No cached NIFTY50 data found")
-            return {}
+            return cache_served("nifty50", "empty", started, {})
         
         # Get 15-min data (still needed for blocks calculation)
-        hist = nifty.history(period="5d", interval="15m")
+        hist = market_data.history("^NSEI", period="5d", interval="15m")
         
         # Current price = last DAILY close
         current = float(daily["Close"].iloc[-1])
@@ -1613,26 +1866,16 @@ def get_nifty50_data() -> Dict:
         last_daily = daily.iloc[-1]
         pivot = round((float(last_daily["High"]) + float(last_daily["Low"]) + float(last_daily["Close"])) / 3, 2)
         
-        candles = []
-        for idx, row in hist.iterrows():
-            candles.append({
-                "timestamp": idx.isoformat(),
-                "open": float(row["Open"]),
-                "close": float(row["Close"]),
-                "high": float(row["High"]),
-                "low": float(row["Low"])
-            })
+        # Blocks come straight from the 15-min open/close columns
+        opens = hist["Open"].to_numpy(dtype=np.float64)
+        closes = hist["Close"].to_numpy(dtype=np.float64)
         
         # Remove last candle ONLY if market is currently open
         market_open = is_market_currently_open()
-        if market_open:
-            closed_candles = candles[:-1] if len(candles) > 1 else candles
-        else:
-            # Market closed - all candles are complete
-            closed_candles = candles
+        if market_open and len(closes) > 1:
+            opens, closes = opens[:-1], closes[:-1]
         
-        blocks = calculate_15min_blocks(closed_candles[-24:]) if closed_candles else []
-        biggest = get_biggest_trend(blocks)
+        biggest = find_biggest_trend(opens[-24:], closes[-24:])
         
         advances, declines = calculate_nifty50_ad()
         
@@ -1648,21 +1891,21 @@ def get_nifty50_data() -> Dict:
         }
         
         # Save to both in-memory cache and Supabase for fallback
-        with cache_lock:
-            cache["nifty50"] = {"data": result, "timestamp": get_ist_now()}
+        cache.set("nifty50", "index", result)
+        cache_filled("nifty50", "upstream")
 
         # Save to Supabase as last valid data (no expiry for fallback)
         save_stock_list('nifty50_index', result)
 
-        return result
+        return cache_served("nifty50", "upstream", started, result)
     except Exception as e:
         logger.error(f"Error fetching NIFTY 50: {e}")
         # Try Supabase fallback on error
         cached = get_stock_list('nifty50_index', None)
         if cached:
             logger.info("Using last available NIFTY50 data from Supabase (after error)")
-            return cached
-        return {}
+            return cache_served("nifty50", "stale", started, cached)
+        return cache_served("nifty50", "empty", started, {})
 
 # API Endpoints
 @api_router.get("/")
@@ -1672,7 +1915,15 @@ async def root():
 @api_router.get("/health")
 async def api_health():
     """Health check endpoint for API router"""
-    return {"status": "healthy", "service": "UDTS Stock Analyzer API", "database": "supabase", "db_status": "connected" if SUPABASE_AVAILABLE else "unavailable", "timestamp": get_ist_now().isoformat()}
+    return {"status": "healthy", "service": "UDTS Stock Analyzer API", "database": cache_backend.name, "db_status": "connected" if cache_backend.available() else "unavailable", "yahoo_circuit": yahoo_breaker.stats()["state"], "timestamp": get_ist_now().isoformat()}
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Cache, rate limiter, circuit breaker and write queue metrics in Prometheus text format"""
+    return Response(
+        content=metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 @api_router.get("/nifty50")
 async def get_nifty50():
@@ -1700,6 +1951,11 @@ async def get_all_stocks(response: Response):
     
     logger.info(f"Starting BATCH PARALLEL analysis of {len(symbols)} stocks (20 stocks per batch)")
     logger.info("Estimated time: 4-6 minutes with Supabase cache, ensuring NO UNKNOWN values")
+
+    # Load cached data for the whole universe in bulk, then pull missing OHLC
+    # in multi-ticker batches up front
+    warm_caches_from_supabase(symbols)
+    prefetch_ohlc_data(symbols)
     
     # Process stocks in BATCHES of 20 with parallel processing
     # Optimized batch size balances speed with rate limit avoidance and ensures complete data
@@ -1728,13 +1984,13 @@ async def get_all_stocks(response: Response):
         # Progress logging
         processed = min(batch_idx + batch_size, len(symbols))
         logger.info(f"Progress: {processed}/{len(symbols)} stocks analyzed ({(processed / len(symbols) * 100):.1f}%)")
-        
-        # Small delay between batches to avoid overwhelming the API
-        # 0.8 second per batch = ~20 seconds total for 500 stocks in ~25 batches (batch size 20)
-        if batch_idx + batch_size < len(symbols):
-            time.sleep(0.8)
     
+    # No fixed delay between batches - yahoo_limiter paces every upstream request
     logger.info(f"Completed batch parallel analysis of {len(results)} stocks")
+    logger.info(f"Yahoo rate limiter: {yahoo_limiter.stats()}")
+    logger.info(f"Yahoo circuit breaker: {yahoo_breaker.stats()}")
+    logger.info(f"Memory cache: {cache.stats()}")
+    logger.info(f"Cache write-behind queue: {write_queue.stats()}")
     
     def sort_key(x):
         score = x.get("scores", {}).get("total", -999)
@@ -1762,6 +2018,11 @@ async def get_sector_trends(response: Response):
         sector_stocks = {}  # {sector: [stock_data, ...]}
         
         logger.info(f"Calculating sector trends for {len(symbols)} stocks (BATCH PARALLEL)")
+
+        # Load cached data for the whole universe in bulk, then pull missing OHLC
+        # in multi-ticker batches up front
+        warm_caches_from_supabase(symbols)
+        prefetch_ohlc_data(symbols)
         
         # Process stocks in BATCHES of 20 with parallel processing
         batch_size = 20
@@ -1822,10 +2083,6 @@ async def get_sector_trends(response: Response):
             if (batch_idx // batch_size + 1) % 20 == 0:
                 processed = min(batch_idx + batch_size, len(symbols))
                 logger.info(f"Sector trends progress: {processed}/{len(symbols)} stocks")
-            
-            # Small delay between batches
-            if batch_idx + batch_size < len(symbols):
-                time.sleep(1)
         
         # Calculate median score and percentage metrics for each sector
         sector_trends = []
@@ -1901,6 +2158,11 @@ async def get_industry_trends(response: Response):
         industry_stocks = {}  # {industry: [stock_data, ...]}
         
         logger.info(f"Calculating industry trends for {len(symbols)} stocks (BATCH PARALLEL)")
+
+        # Load cached data for the whole universe in bulk, then pull missing OHLC
+        # in multi-ticker batches up front
+        warm_caches_from_supabase(symbols)
+        prefetch_ohlc_data(symbols)
         
         # Process stocks in BATCHES of 20 with parallel processing
         batch_size = 20
@@ -1961,10 +2223,6 @@ async def get_industry_trends(response: Response):
             if (batch_idx // batch_size + 1) % 20 == 0:
                 processed = min(batch_idx + batch_size, len(symbols))
                 logger.info(f"Industry trends progress: {processed}/{len(symbols)} stocks")
-            
-            # Small delay between batches
-            if batch_idx + batch_size < len(symbols):
-                time.sleep(1)
         
         # Calculate median score and percentage metrics for each industry
         industry_trends = []
@@ -2028,19 +2286,11 @@ async def get_industry_trends(response: Response):
 
 @api_router.get("/refresh")
 async def refresh_data():
-    global cache
-    
     # Clear in-memory cache
-    with cache_lock:
-        cache["ohlc"] = {}
-        cache["fundamentals"] = {}
-        cache["institutional_holdings"] = {}
-        cache["nifty50"] = {"data": None, "timestamp": None}
-        cache["nifty50_list"] = {"data": None, "timestamp": None}
-        cache["nifty500_list"] = {"data": None, "timestamp": None}
-
-    # Clear Supabase cache
-    if clear_all_caches():
+    cache.clear()
+
+    # Clear Supabase cache (off the event loop - the fallback path is a few HTTP calls)
+    if await asyncio.to_thread(clear_all_caches):
         logger.info("Supabase caches cleared (OHLC, fundamentals, and institutional holdings)")
     else:
         logger.warning("Error clearing Supabase caches or Supabase not available")
@@ -2051,14 +2301,11 @@ async def refresh_data():
 @api_router.get("/refresh_stock_list")
 async def refresh_stock_list():
     """Manually refresh NIFTY 500 stock list from NSE CSV"""
-    global cache
-    
     try:
         # Store old list for comparison
-        old_list = None
-        with cache_lock:
-            if cache["nifty500_list"]["data"]:
-                old_list = cache["nifty500_list"]["data"].copy()
+        old_list = cache.get_stale("stock_lists", "nifty500")
+        if old_list:
+            old_list = old_list.copy()
         
         import time
         
@@ -2125,12 +2372,8 @@ async def refresh_stock_list():
                 list_changed = True
                 logger.info("Stock list HAS CHANGED - clearing all caches")
                 
-                with cache_lock:
-                    cache["ohlc"] = {}
-                    cache["fundamentals"] = {}
-                    cache["nifty50"] = {"data": None, "timestamp": None}
-                    cache["nifty50_list"] = {"data": None, "timestamp": None}
-                    cache["nifty500_list"] = {"data": symbols, "timestamp": get_ist_now()}
+                cache.clear("ohlc", "fundamentals", "ticker_info", "analysis", "nifty50", "stock_lists")
+                cache.set("stock_lists", "nifty500", symbols)
                 
                 save_stock_list('nifty500', symbols)
 
@@ -2140,8 +2383,7 @@ async def refresh_stock_list():
                     logger.warning("Error clearing Supabase caches")
             else:
                 logger.info("Stock list unchanged - keeping existing caches")
-                with cache_lock:
-                    cache["nifty500_list"] = {"data": symbols, "timestamp": get_ist_now()}
+                cache.set("stock_lists", "nifty500", symbols)
                 save_stock_list('nifty500', symbols)
             
             return {
@@ -2175,11 +2417,11 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)  # Compress responses > 1K
 
 @app.get("/")
 async def root_health():
-    return {"status": "healthy", "service": "UDTS Stock Analyzer API", "database": "supabase", "db_status": "connected" if SUPABASE_AVAILABLE else "unavailable"}
+    return {"status": "healthy", "service": "UDTS Stock Analyzer API", "database": cache_backend.name, "db_status": "connected" if cache_backend.available() else "unavailable"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "database": "supabase", "db_status": "connected" if SUPABASE_AVAILABLE else "unavailable"}
+    return {"status": "healthy", "database": cache_backend.name, "db_status": "connected" if cache_backend.available() else "unavailable"}
 
 app.add_middleware(
     CORSMiddleware,
@@ -2192,3 +2434,5 @@ app.add_middleware(
 @app.on_event("shutdown")
 async def shutdown():
     logger.info("Shutting down server")
+    # Persist cache writes still waiting in the write-behind queue
+    await asyncio.to_thread(stop_cache_writer)
@@ -0,0 +1,162 @@
+"""
+UDTS engine module
+Vectorized UDTS trend detection on open/close arrays, for a single series or
+for a padded (symbols x bars) matrix covering a whole universe in one call,
+and the trend-block partition behind the 15-min biggest trend
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+UP = 1
+DOWN = -1
+UNKNOWN = 0
+DIRECTION_NAMES = {UP: "UP", DOWN: "DOWN", UNKNOWN: "UNKNOWN"}
+
+# Index value for a G1/R1/R2/G2 candle that does not exist
+NO_INDEX = -1
+
+def pad_series(rows: Sequence[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Left-align series of different lengths into a NaN-padded matrix; returns (matrix, lengths)"""
+    lengths = np.array([len(row) for row in rows], dtype=np.int64)
+    matrix = np.full((len(rows), int(lengths.max()) if len(rows) else 0), np.nan)
+    for i, row in enumerate(rows):
+        matrix[i, :lengths[i]] = row
+    return matrix, lengths
+
+def _previous_index(mask: np.ndarray) -> np.ndarray:
+    """Per bar, the index of the nearest earlier bar where mask is set (NO_INDEX if none)"""
+    positions = np.where(mask, np.arange(mask.shape[-1]), NO_INDEX)
+    latest = np.maximum.accumulate(positions, axis=-1)
+    previous = np.full_like(latest, NO_INDEX)
+    previous[:, 1:] = latest[:, :-1]
+    return previous
+
+def _opens_at(opens: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """opens[row, index[row, bar]] with NaN where index is NO_INDEX"""
+    picked = np.take_along_axis(opens, np.maximum(index, 0), axis=-1)
+    return np.where(index >= 0, picked, np.nan)
+
+def udts_batch(opens: np.ndarray, closes: np.ndarray, lengths: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    UDTS for many series of one timeframe at once
+
+    opens/closes are (symbols x bars) matrices with each series left-aligned
+    and padded with NaN (see pad_series); lengths defaults to the non-NaN
+    closes per row. Returns {"direction": UP/DOWN/UNKNOWN per row, "g1", "r1",
+    "r2", "g2": bar indices or NO_INDEX}.
+
+    G1 is the latest green candle closing above the open of the nearest red
+    candle before it (R1). R2 is the first red candle after G1 closing below
+    the open of the nearest green candle before it (G2). The trend is DOWN
+    once an R2 exists, otherwise UP. Without a G1 the trend follows the closed
+    candles' net move (or the forming candle's color if none are closed).
+    """
+    opens = np.atleast_2d(np.asarray(opens, dtype=np.float64))
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    if lengths is None:
+        lengths = np.count_nonzero(~np.isnan(closes), axis=1)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    rows = np.arange(closes.shape[0])
+    bars = closes.shape[1]
+    if bars == 0:
+        none = np.full(len(rows), NO_INDEX)
+        return {"direction": np.full(len(rows), UNKNOWN, dtype=np.int8),
+                "g1": none, "r1": none.copy(), "r2": none.copy(), "g2": none.copy()}
+
+    # NaN padding compares False, so padded bars are neither green nor red
+    green = closes > opens
+    red = closes < opens
+
+    prev_red = _previous_index(red)
+    with np.errstate(invalid="ignore"):
+        g1_mask = green & (closes > _opens_at(opens, prev_red))
+    has_g1 = g1_mask.any(axis=1)
+    g1 = np.where(has_g1, bars - 1 - np.argmax(g1_mask[:, ::-1], axis=1), NO_INDEX)
+    r1 = np.where(has_g1, prev_red[rows, np.maximum(g1, 0)], NO_INDEX)
+
+    prev_green = _previous_index(green)
+    with np.errstate(invalid="ignore"):
+        r2_mask = red & (closes < _opens_at(opens, prev_green))
+    r2_mask &= np.arange(bars) > g1[:, None]
+    r2_mask &= has_g1[:, None]
+    has_r2 = r2_mask.any(axis=1)
+    r2 = np.where(has_r2, np.argmax(r2_mask, axis=1), NO_INDEX)
+    g2 = np.where(has_r2, prev_green[rows, np.maximum(r2, 0)], NO_INDEX)
+
+    # No G1: newest closed close vs oldest closed open, or the forming candle's color
+    newest_closed = closes[rows, np.maximum(lengths - 2, 0)]
+    with np.errstate(invalid="ignore"):
+        net_up = np.where(lengths > 1, newest_closed - opens[:, 0] >= 0, green[:, 0])
+    fallback = np.where(lengths > 0, np.where(net_up, UP, DOWN), UNKNOWN)
+
+    direction = np.where(has_g1, np.where(has_r2, DOWN, UP), fallback).astype(np.int8)
+    return {"direction": direction, "g1": g1, "r1": r1, "r2": r2, "g2": g2}
+
+def udts_indices(opens: np.ndarray, closes: np.ndarray) -> Tuple[int, int, int, int, int]:
+    """UDTS of a single series: (direction, g1, r1, r2, g2) as in udts_batch"""
+    closes = np.asarray(closes, dtype=np.float64)
+    result = udts_batch(opens, closes, np.array([len(closes)]))
+    return tuple(int(result[name][0]) for name in ("direction", "g1", "r1", "r2", "g2"))
+
+def trend_blocks(opens: np.ndarray, closes: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Partition a series into trend blocks (15-min biggest trend)
+
+    A block runs while candles keep its color; an opposite-colored candle
+    (doji count as red) starts a new block only if it closes beyond the
+    previous candle's open - below it for red, above it for green. So each
+    candle's block direction is the color of the latest candle that closed
+    beyond its predecessor's open (or the first candle's), which is a forward
+    fill rather than a scan.
+
+    Returns arrays per block: "start"/"end" bar index ranges (end exclusive),
+    "direction" (UP/DOWN), "low"/"high" over the block's opens and closes,
+    "power" (high - low) and "start_price" (first open).
+    """
+    opens = np.asarray(opens, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    bars = len(closes)
+    if bars == 0:
+        empty = np.empty(0)
+        return {"start": np.empty(0, dtype=np.int64), "end": np.empty(0, dtype=np.int64),
+                "direction": np.empty(0, dtype=np.int8), "low": empty, "high": empty.copy(),
+                "power": empty.copy(), "start_price": empty.copy()}
+
+    green = closes > opens
+    crossed = np.empty(bars, dtype=bool)
+    crossed[0] = True
+    crossed[1:] = np.where(green[1:], closes[1:] > opens[:-1], closes[1:] < opens[:-1])
+
+    setter = np.maximum.accumulate(np.where(crossed, np.arange(bars), 0))
+    direction = np.where(green[setter], UP, DOWN).astype(np.int8)
+
+    start = np.flatnonzero(np.r_[True, direction[1:] != direction[:-1]])
+    end = np.r_[start[1:], bars]
+    high = np.maximum.reduceat(np.maximum(opens, closes), start)
+    low = np.minimum.reduceat(np.minimum(opens, closes), start)
+    return {"start": start, "end": end, "direction": direction[start], "low": low, "high": high,
+            "power": high - low, "start_price": opens[start]}
+
+def find_biggest_trend(opens: np.ndarray, closes: np.ndarray) -> Optional[Dict]:
+    """
+    The trend block with the most power (the first one, left to right, on ties)
+
+    Returns {"direction", "power", "start_price", "low", "high", "start", "end"}
+    with "end" the index of the block's last bar, or None for an empty series.
+    """
+    blocks = trend_blocks(opens, closes)
+    if not len(blocks["start"]):
+        return None
+
+    i = int(np.argmax(blocks["power"]))
+    return {
+        "direction": DIRECTION_NAMES[int(blocks["direction"][i])],
+        "power": float(blocks["power"][i]),
+        "start_price": float(blocks["start_price"][i]),
+        "low": float(blocks["low"][i]),
+        "high": float(blocks["high"][i]),
+        "start": int(blocks["start"][i]),
+        "end": int(blocks["end"][i]) - 1,
+    }
@@ -0,0 +1,263 @@
+"""
+Upstream call guards
+Shared throttling, request coalescing and circuit breaking for outbound
+market-data requests (Yahoo Finance)
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter
+
+    Tokens refill continuously at `rate` per second up to `burst`. Callers
+    reserve tokens under the lock (the balance may go negative) and sleep
+    outside it, so concurrent callers queue up in arrival order instead of
+    all waking at once and bursting past the limit.
+    """
+
+    def __init__(self, rate: float, burst: int, name: str = "default"):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.name = name
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._acquired = 0
+        self._waited = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Block until `tokens` requests may be issued; returns seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            self._acquired += tokens
+            if wait > 0:
+                self._waited += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of limiter configuration and caller wait metrics"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "name": self.name,
+                "rate_per_sec": self.rate,
+                "burst": self.burst,
+                "available_tokens": round(self._tokens, 2),
+                "acquired": self._acquired,
+                "waited": self._waited,
+                "total_wait_seconds": round(self._total_wait, 3),
+                "max_wait_seconds": round(self._max_wait, 3),
+                "avg_wait_seconds": round(self._total_wait / self._waited, 3) if self._waited else 0.0
+            }
+
+class _Call:
+    """One in-flight execution that duplicate callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """
+    Request coalescing
+
+    Concurrent do() calls with the same key run the function once; the other
+    callers block until it finishes and receive the same result (or exception).
+    Nothing is cached after the call completes - caching stays the caller's job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, _Call] = {}
+        self._coalesced = 0
+
+    def do(self, key: Any, fn: Callable, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of keys currently in flight and duplicate calls coalesced so far"""
+        with self._lock:
+            return {"in_flight": len(self._calls), "coalesced": self._coalesced}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker for an upstream service
+
+    Outcomes of real calls are kept for a sliding `window_seconds`. Once at
+    least `min_calls` were seen and the failure ratio reaches `failure_rate`,
+    the breaker opens: check() raises CircuitOpenError so callers fall back to
+    stale data immediately instead of retrying. While open, a background
+    thread runs `probe` every `probe_interval` seconds and closes the breaker
+    on the first success.
+    """
+
+    def __init__(self, failure_rate: float = 0.5, window_seconds: float = 60.0, min_calls: int = 20,
+                 probe_interval: float = 30.0, probe: Optional[Callable[[], Any]] = None,
+                 name: str = "default"):
+        self.failure_rate = float(failure_rate)
+        self.window = float(window_seconds)
+        self.min_calls = max(1, int(min_calls))
+        self.probe_interval = float(probe_interval)
+        self.probe = probe
+        self.name = name
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (monotonic time, succeeded)
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._opened = threading.Event()
+        self._probe_thread: Optional[threading.Thread] = None
+
+        # Metrics
+        self._times_opened = 0
+        self._rejected = 0
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, ok = self._outcomes.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def check(self):
+        """Raise CircuitOpenError if calls should not go upstream right now"""
+        with self._lock:
+            is_open = self._opened_at is not None
+            if is_open:
+                self._rejected += 1
+        if is_open:
+            raise CircuitOpenError(f"{self.name} circuit open, upstream calls suspended")
+
+    def backoff(self, seconds: float):
+        """Sleep before a retry, cut short as soon as the breaker opens"""
+        self._opened.wait(seconds)
+
+    def record_success(self):
+        self._record(True)
+
+    def record_failure(self):
+        self._record(False)
+
+    def _record(self, ok: bool):
+        now = time.monotonic()
+        with self._lock:
+            if self._opened_at is not None:
+                # Late results from calls issued before opening don't count
+                return
+            self._outcomes.append((now, ok))
+            if not ok:
+                self._failures += 1
+            self._trim(now)
+
+            calls = len(self._outcomes)
+            if calls < self.min_calls or self._failures / calls < self.failure_rate:
+                return
+
+            self._opened_at = now
+            self._opened.set()
+            self._times_opened += 1
+            logger.warning(
+                f"{self.name} circuit opened: {self._failures}/{calls} calls failed "
+                f"in the last {self.window:.0f}s, serving cached data"
+            )
+            self._start_probe()
+
+    def _start_probe(self):
+        if self.probe is None or (self._probe_thread and self._probe_thread.is_alive()):
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        while self.is_open:
+            time.sleep(self.probe_interval)
+            try:
+                self.probe()
+            except Exception as e:
+                logger.info(f"{self.name} circuit probe failed, staying open: {e}")
+                continue
+            self.close()
+
+    def close(self):
+        """Resume upstream calls with a fresh error window"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            open_for = time.monotonic() - self._opened_at
+            self._opened_at = None
+            self._opened.clear()
+            self._outcomes.clear()
+            self._failures = 0
+        logger.info(f"{self.name} circuit closed after {open_for:.0f}s, upstream calls resumed")
+
+    def stats(self) -> Dict[str, Any]:
+        """Current state, failure ratio over the window and open/reject counts"""
+        with self._lock:
+            self._trim(time.monotonic())
+            calls = len(self._outcomes)
+            return {
+                "name": self.name,
+                "state": "open" if self._opened_at is not None else "closed",
+                "window_calls": calls,
+                "window_failure_rate": round(self._failures / calls, 3) if calls else 0.0,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected
+            }
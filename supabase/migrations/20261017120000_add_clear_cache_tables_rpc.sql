@@ -0,0 +1,53 @@
+/*
+  # Cache Clearing RPC Migration
+
+  ## Summary
+  Adds a function that empties the cache tables with TRUNCATE, so clearing the caches
+  takes one call regardless of how many rows are cached. The backend calls it through
+  the Supabase RPC endpoint from clear_all_caches and falls back to bulk DELETE when
+  the function is missing.
+
+  ## New Functions
+
+  ### clear_cache_tables(table_names text[])
+  - Truncates each named table in one statement
+  - Only the cache tables (ohlc_cache, fundamentals_cache, institutional_cache) are accepted;
+    any other name raises an exception and nothing is truncated
+  - Defaults to all three cache tables when called without arguments
+
+  ## Security
+  - SECURITY DEFINER so the service role can truncate without owning the tables
+  - search_path is pinned to public
+  - EXECUTE is revoked from PUBLIC, anon and authenticated; only service_role may call it
+*/
+
+CREATE OR REPLACE FUNCTION clear_cache_tables(
+  table_names text[] DEFAULT ARRAY['ohlc_cache', 'fundamentals_cache', 'institutional_cache']
+)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  allowed text[] := ARRAY['ohlc_cache', 'fundamentals_cache', 'institutional_cache'];
+  name text;
+BEGIN
+  IF table_names IS NULL OR array_length(table_names, 1) IS NULL THEN
+    RETURN;
+  END IF;
+
+  FOREACH name IN ARRAY table_names LOOP
+    IF NOT name = ANY(allowed) THEN
+      RAISE EXCEPTION 'clear_cache_tables: % is not a cache table', name;
+    END IF;
+  END LOOP;
+
+  EXECUTE 'TRUNCATE TABLE ' || (
+    SELECT string_agg(format('%I', t), ', ') FROM unnest(table_names) AS t
+  );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION clear_cache_tables(text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION clear_cache_tables(text[]) TO service_role;
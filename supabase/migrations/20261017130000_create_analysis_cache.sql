@@ -0,0 +1,96 @@
+/*
+  # Analysis Result Cache Migration
+
+  ## Summary
+  Adds a table for finished per-stock analysis results, so symbols whose candles and
+  fundamentals have not changed are answered without recomputing the analysis (also
+  across backend restarts). Each row holds the result together with the fingerprint
+  of the inputs it was computed from; the backend only reuses it while the fingerprint
+  still matches.
+
+  ## New Tables
+
+  ### analysis_cache
+  - id (uuid, primary key) - Unique identifier
+  - symbol (text, unique, not null) - Stock symbol
+  - data (jsonb, not null) - {fingerprint, result} where result is the analyze_stock output
+  - timestamp (timestamptz, not null) - When this result was cached
+  - created_at (timestamptz) - Record creation time
+  - updated_at (timestamptz) - Last update time
+  - Unique constraint: symbol must be unique
+  - Index: Index on symbol for fast lookups
+
+  ## Modified Functions
+
+  ### clear_cache_tables(table_names text[])
+  - analysis_cache is added to the accepted tables and to the default list
+
+  ## Security
+  - RLS enabled with the same policies as the other cache tables: public read,
+    writes restricted to service_role
+*/
+
+CREATE TABLE IF NOT EXISTS analysis_cache (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  symbol text UNIQUE NOT NULL,
+  data jsonb NOT NULL,
+  timestamp timestamptz NOT NULL DEFAULT now(),
+  created_at timestamptz DEFAULT now(),
+  updated_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_analysis_symbol ON analysis_cache(symbol);
+
+ALTER TABLE analysis_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access to analysis_cache"
+  ON analysis_cache FOR SELECT
+  TO anon, authenticated
+  USING (true);
+
+CREATE POLICY "Allow service role to insert analysis_cache"
+  ON analysis_cache FOR INSERT
+  TO service_role
+  WITH CHECK (true);
+
+CREATE POLICY "Allow service role to update analysis_cache"
+  ON analysis_cache FOR UPDATE
+  TO service_role
+  USING (true)
+  WITH CHECK (true);
+
+CREATE POLICY "Allow service role to delete analysis_cache"
+  ON analysis_cache FOR DELETE
+  TO service_role
+  USING (true);
+
+CREATE OR REPLACE FUNCTION clear_cache_tables(
+  table_names text[] DEFAULT ARRAY['ohlc_cache', 'fundamentals_cache', 'institutional_cache', 'analysis_cache']
+)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  allowed text[] := ARRAY['ohlc_cache', 'fundamentals_cache', 'institutional_cache', 'analysis_cache'];
+  name text;
+BEGIN
+  IF table_names IS NULL OR array_length(table_names, 1) IS NULL THEN
+    RETURN;
+  END IF;
+
+  FOREACH name IN ARRAY table_names LOOP
+    IF NOT name = ANY(allowed) THEN
+      RAISE EXCEPTION 'clear_cache_tables: % is not a cache table', name;
+    END IF;
+  END LOOP;
+
+  EXECUTE 'TRUNCATE TABLE ' || (
+    SELECT string_agg(format('%I', t), ', ') FROM unnest(table_names) AS t
+  );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION clear_cache_tables(text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION clear_cache_tables(text[]) TO service_role;
@@ -0,0 +1,102 @@
+/*
+  # Normalized OHLC Bars Migration
+
+  ## Summary
+  Adds a per-bar OHLC table next to ohlc_cache. ohlc_cache keeps a whole candle history
+  as one JSONB document per (symbol, timeframe), so every read decodes and every update
+  rewrites the full history. ohlc_bars stores one row per bar: range and "last N bars"
+  reads return only the bars asked for, and an incremental refresh upserts only the bars
+  that are new or changed. The backend mirrors histories into it when OHLC_BARS_ENABLED
+  is set.
+
+  ## New Tables
+
+  ### ohlc_bars
+  - symbol (text, not null) - Stock symbol
+  - timeframe (text, not null) - Timeframe or download source (daily, 15min, eod, intraday, ...)
+  - bar_ts (timestamptz, not null) - Bar open time
+  - open, high, low, close (double precision, not null) - Bar prices
+  - updated_at (timestamptz) - When the bar was last written
+  - Primary key: (symbol, timeframe, bar_ts)
+  - Covering index: (symbol, timeframe, bar_ts DESC) including the prices, so range and
+    latest-bars reads are answered by index-only scans
+
+  ## Modified Functions
+
+  ### clear_cache_tables(table_names text[])
+  - ohlc_bars is added to the accepted tables and to the default list
+
+  ## Security
+  - RLS enabled with the same policies as the other cache tables: public read,
+    writes restricted to service_role
+*/
+
+CREATE TABLE IF NOT EXISTS ohlc_bars (
+  symbol text NOT NULL,
+  timeframe text NOT NULL,
+  bar_ts timestamptz NOT NULL,
+  open double precision NOT NULL,
+  high double precision NOT NULL,
+  low double precision NOT NULL,
+  close double precision NOT NULL,
+  updated_at timestamptz DEFAULT now(),
+  PRIMARY KEY (symbol, timeframe, bar_ts)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ohlc_bars_latest
+  ON ohlc_bars (symbol, timeframe, bar_ts DESC)
+  INCLUDE (open, high, low, close);
+
+ALTER TABLE ohlc_bars ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access to ohlc_bars"
+  ON ohlc_bars FOR SELECT
+  TO anon, authenticated
+  USING (true);
+
+CREATE POLICY "Allow service role to insert ohlc_bars"
+  ON ohlc_bars FOR INSERT
+  TO service_role
+  WITH CHECK (true);
+
+CREATE POLICY "Allow service role to update ohlc_bars"
+  ON ohlc_bars FOR UPDATE
+  TO service_role
+  USING (true)
+  WITH CHECK (true);
+
+CREATE POLICY "Allow service role to delete ohlc_bars"
+  ON ohlc_bars FOR DELETE
+  TO service_role
+  USING (true);
+
+CREATE OR REPLACE FUNCTION clear_cache_tables(
+  table_names text[] DEFAULT ARRAY['ohlc_cache', 'fundamentals_cache', 'institutional_cache', 'analysis_cache', 'ohlc_bars']
+)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  allowed text[] := ARRAY['ohlc_cache', 'fundamentals_cache', 'institutional_cache', 'analysis_cache', 'ohlc_bars'];
+  name text;
+BEGIN
+  IF table_names IS NULL OR array_length(table_names, 1) IS NULL THEN
+    RETURN;
+  END IF;
+
+  FOREACH name IN ARRAY table_names LOOP
+    IF NOT name = ANY(allowed) THEN
+      RAISE EXCEPTION 'clear_cache_tables: % is not a cache table', name;
+    END IF;
+  END LOOP;
+
+  EXECUTE 'TRUNCATE TABLE ' || (
+    SELECT string_agg(format('%I', t), ', ') FROM unnest(table_names) AS t
+  );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION clear_cache_tables(text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION clear_cache_tables(text[]) TO service_role;
@@ -0,0 +1,152 @@
+"""Tests for the fingerprinted analysis-result cache"""
+
+import copy
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import database  # noqa: E402
+import server  # noqa: E402
+from cache_backends import SQLiteCacheBackend  # noqa: E402
+from candles import CandleSeries  # noqa: E402
+from market_calendar import IST  # noqa: E402
+
+
+def make_bundle(bars=20):
+    start = datetime(2026, 1, 5, 9, 15, tzinfo=IST)
+    raw = {
+        tf: CandleSeries.from_dicts([
+            {"timestamp": (start + timedelta(days=i)).isoformat(), "open": 100.0 + i, "close": 101.0 + i,
+             "high": 102.0 + i, "low": 99.0 + i}
+            for i in range(bars)
+        ])
+        for tf in server.UDTS_TIMEFRAMES
+    }
+    return {"raw": raw, "in_scope": {tf: series[:-1] for tf, series in raw.items()}}
+
+
+FUNDAMENTALS = {"sector": "Technology", "pe": 30, "inst_holding_pct": "40.00"}
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path, monkeypatch):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    assert backend.init()
+    monkeypatch.setattr(database, "cache_backend", backend)
+    monkeypatch.setattr(server, "ANALYSIS_CACHE_PERSIST", True)
+    server.cache.clear()
+    yield backend
+    server.cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def market_closed(monkeypatch):
+    monkeypatch.setattr(server, "is_market_currently_open", lambda: False)
+
+
+def test_fingerprint_is_stable_for_the_same_inputs():
+    assert server.analysis_fingerprint(make_bundle(), FUNDAMENTALS) == \
+        server.analysis_fingerprint(make_bundle(), dict(FUNDAMENTALS))
+
+
+@pytest.mark.parametrize("timeframe", server.UDTS_TIMEFRAMES)
+def test_fingerprint_covers_the_first_and_last_bars_of_every_timeframe(timeframe):
+    base = server.analysis_fingerprint(make_bundle(), FUNDAMENTALS)
+
+    # Forming bar updated
+    bundle = make_bundle()
+    bundle["raw"][timeframe].close[-1] += 0.05
+    assert server.analysis_fingerprint(bundle, FUNDAMENTALS) != base
+
+    # History re-adjusted: the oldest bar moves too
+    bundle = make_bundle()
+    bundle["raw"][timeframe].open[0] /= 5
+    assert server.analysis_fingerprint(bundle, FUNDAMENTALS) != base
+
+    # A bar appended
+    bundle = make_bundle()
+    appended = make_bundle(21)
+    bundle["raw"][timeframe] = appended["raw"][timeframe]
+    assert server.analysis_fingerprint(bundle, FUNDAMENTALS) != base
+
+    # The in-scope cut moved without the raw bars changing
+    bundle = make_bundle()
+    bundle["in_scope"][timeframe] = bundle["raw"][timeframe]
+    assert server.analysis_fingerprint(bundle, FUNDAMENTALS) != base
+
+
+def test_fingerprint_covers_fundamentals_and_version(monkeypatch):
+    base = server.analysis_fingerprint(make_bundle(), FUNDAMENTALS)
+    assert server.analysis_fingerprint(make_bundle(), {**FUNDAMENTALS, "pe": 31}) != base
+
+    monkeypatch.setattr(server, "ANALYSIS_VERSION", server.ANALYSIS_VERSION + "-next")
+    assert server.analysis_fingerprint(make_bundle(), FUNDAMENTALS) != base
+
+
+def test_persisted_entry_with_another_fingerprint_is_a_miss(sqlite_cache):
+    result = {"symbol": "TCS", "error": None, "cmp": 101.0}
+    server.store_analysis("TCS", "fingerprint-a", result)
+    assert database.write_queue.flush(timeout=5)
+    server.cache.clear()
+
+    assert server.get_cached_analysis("TCS", "fingerprint-b") is None
+    assert server.get_cached_analysis("TCS", "fingerprint-a") == result
+    # Served copies are not the cached object
+    served = server.get_cached_analysis("TCS", "fingerprint-a")
+    served["cmp"] = 0
+    assert server.get_cached_analysis("TCS", "fingerprint-a") == result
+
+
+def test_error_results_are_never_stored(sqlite_cache, monkeypatch):
+    bundle = make_bundle()
+    monkeypatch.setattr(server, "load_candle_bundle", lambda symbol: copy.deepcopy(bundle))
+    monkeypatch.setattr(server, "get_fundamentals", lambda symbol: dict(FUNDAMENTALS))
+    monkeypatch.setattr(server, "compute_analysis", lambda symbol, b, f: {"symbol": symbol, "error": "no data"})
+
+    assert server.analyze_stock("TCS")["error"] == "no data"
+
+    def failing_bundle(symbol):
+        raise RuntimeError("cache down")
+
+    monkeypatch.setattr(server, "load_candle_bundle", failing_bundle)
+    assert server.analyze_stock("INFY")["error"] == "cache down"
+
+    assert database.write_queue.flush(timeout=5)
+    for symbol in ("TCS", "INFY"):
+        assert server.cache.get_stale("analysis", symbol) is None
+        assert sqlite_cache.get('analysis_cache', {'symbol': symbol}) is None
+
+
+def test_memory_hits_serve_the_cached_series_itself():
+    series = make_bundle()["raw"]["daily"]
+    server.cache.clear()
+    server.cache.set("ohlc", "TCS_daily", series)
+    try:
+        assert server.get_ohlc_series("TCS", "daily") is series
+        assert server.get_ohlc_data("TCS", "daily") == series.to_dicts()
+    finally:
+        server.cache.clear()
+
+
+def test_array_helpers_match_the_candle_dicts():
+    start = datetime(2026, 1, 5, 9, 15, tzinfo=IST)
+    candles = [
+        {"timestamp": (start + timedelta(days=i // 3, minutes=15 * (i % 3))).isoformat(),
+         "open": 100.0 + i, "close": 100.0 + i + (1 if i % 4 else -1), "high": 103.0 + i, "low": 98.0 + i}
+        for i in range(12)
+    ]
+    series = CandleSeries.from_dicts(candles)
+
+    last_green = [c for c in candles if c["close"] > c["open"]][-1]
+    last_red = [c for c in candles if c["close"] < c["open"]][-1]
+    assert server.get_support_price(series, "UP") == last_green["open"]
+    assert server.get_support_price(series, "DOWN") == last_red["open"]
+    assert server.get_support_price(series, "UNKNOWN") is None
+
+    assert server.get_9_15_to_9_30_candle(series) == candles[9]
+    # Market closed (weekday after hours): the last session is the trailing day's bars
+    assert server.get_todays_session_candles(series).to_dicts() == candles[9:]
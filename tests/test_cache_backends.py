@@ -0,0 +1,72 @@
+"""Tests for the embedded SQLite cache backend"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from cache_backends import SQLiteCacheBackend  # noqa: E402
+
+
+def make_backend(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    assert backend.init()
+    return backend
+
+
+def test_save_get_and_upsert(tmp_path):
+    backend = make_backend(tmp_path)
+    assert backend.save("ohlc_cache", {"symbol": "TCS", "timeframe": "daily"}, {"c": [1.5, 2.5]})
+    assert backend.save("ohlc_cache", {"symbol": "TCS", "timeframe": "daily"}, {"c": [3.5]})
+
+    assert backend.get("ohlc_cache", {"symbol": "TCS", "timeframe": "daily"}, 15) == {"c": [3.5]}
+    assert backend.get("ohlc_cache", {"symbol": "TCS", "timeframe": "weekly"}) is None
+    # Rows cached "in the future" relative to a negative age window count as expired
+    assert backend.get("ohlc_cache", {"symbol": "TCS", "timeframe": "daily"}, -1) is None
+
+
+def test_get_many_returns_rows_with_keys_and_timestamp(tmp_path):
+    backend = make_backend(tmp_path)
+    backend.save_many("fundamentals_cache", [({"symbol": s}, {"pe": i}) for i, s in enumerate(["A", "B", "C"])])
+
+    rows = backend.get_many("fundamentals_cache", {"symbol": ["A", "C", "Z"]}, 60)
+    assert sorted((r["symbol"], r["data"]["pe"]) for r in rows) == [("A", 0), ("C", 2)]
+    assert all(r["timestamp"].endswith("+00:00") for r in rows)
+
+
+def test_delete_and_clear(tmp_path):
+    backend = make_backend(tmp_path)
+    backend.save_many("institutional_cache", [({"symbol": s}, "10.00") for s in ["A", "B", "C"]])
+
+    assert backend.delete("institutional_cache", {"symbol": ["A", "B"]})
+    assert [r["symbol"] for r in backend.get_many("institutional_cache", {"symbol": ["A", "B", "C"]})] == ["C"]
+    assert backend.clear(["institutional_cache"])
+    assert backend.get("institutional_cache", {"symbol": "C"}) is None
+
+
+def test_bar_range_and_last_n_reads(tmp_path):
+    from datetime import datetime, timedelta
+    from candles import CandleSeries
+    from market_calendar import IST
+
+    backend = make_backend(tmp_path)
+    start = datetime(2026, 1, 5, 9, 15, tzinfo=IST)
+    candles = [
+        {"timestamp": (start + timedelta(days=i)).isoformat(), "open": 100.0 + i, "close": 101.0 + i,
+         "high": 102.0 + i, "low": 99.0 + i}
+        for i in range(10)
+    ]
+    series = CandleSeries.from_dicts(candles)
+    assert backend.upsert_bars("TCS", "daily", series)
+    # Re-upserting the forming bar with new prices overwrites only that bar
+    forming = series.take([9])
+    forming.close[:] = 120.0
+    assert backend.upsert_bars("TCS", "daily", forming)
+
+    assert backend.get_bars("TCS", "daily").to_dicts() == candles[:9] + [{**candles[9], "close": 120.0}]
+    assert backend.get_bars("TCS", "daily", last_n=3).close.tolist() == [108.0, 109.0, 120.0]
+    in_range = backend.get_bars("TCS", "daily", start=start + timedelta(days=2), end=start + timedelta(days=4))
+    assert in_range.to_dicts() == candles[2:5]
+    assert backend.get_bars("TCS", "weekly") is None
+    assert backend.clear(["ohlc_bars"])
+    assert backend.get_bars("TCS", "daily") is None
@@ -0,0 +1,129 @@
+"""Tests for filling the memory cache from persistent cache rows"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import database  # noqa: E402
+import server  # noqa: E402
+from cache_backends import SQLiteCacheBackend  # noqa: E402
+from market_data import YahooNSEProvider  # noqa: E402
+from upstream import CircuitBreaker  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path, monkeypatch):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    assert backend.init()
+    monkeypatch.setattr(database, "cache_backend", backend)
+    server.cache.clear()
+    yield backend
+    server.cache.clear()
+
+
+def age_rows(backend, table_name, minutes):
+    """Backdate every row of a table as if it had been cached `minutes` ago"""
+    cached_at = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+    backend._conn.execute(
+        f"UPDATE {table_name} SET timestamp = ?, cached_at = ?", (cached_at.isoformat(), cached_at.timestamp())
+    )
+    backend._conn.commit()
+    return cached_at
+
+
+def test_memory_fills_keep_the_row_cached_time(sqlite_cache):
+    sqlite_cache.save('institutional_cache', {'symbol': 'TCS'}, "40.00")
+    sqlite_cache.save('stock_lists', {'list_type': 'nifty50'}, ["TCS", "INFY"])
+    age_rows(sqlite_cache, 'institutional_cache', 3 * 1440)
+    age_rows(sqlite_cache, 'stock_lists', 600)
+
+    assert server._load_institutional_holding_percentage("TCS", info={}) == "40.00"
+    assert server.get_nifty50_symbols() == ["TCS", "INFY"]
+
+    # A fill stamped "now" would look minutes old rather than days/hours old
+    assert server.cache.is_fresh("institutional_holdings", "TCS")
+    assert not server.cache.is_fresh("institutional_holdings", "TCS", max_age_minutes=2 * 1440)
+    assert server.cache.is_fresh("stock_lists", "nifty50")
+    assert not server.cache.is_fresh("stock_lists", "nifty50", max_age_minutes=500)
+
+
+def test_open_breaker_never_caches_na_holdings(sqlite_cache, monkeypatch):
+    breaker = CircuitBreaker(min_calls=1, name="test")
+    breaker.record_failure()
+    assert breaker.is_open
+    monkeypatch.setattr(server, "market_data", YahooNSEProvider(breaker=breaker))
+
+    # Nothing cached anywhere: "NA" for now, but neither tier keeps it
+    assert server._load_institutional_holding_percentage("TCS") == "NA"
+    assert database.write_queue.flush(timeout=5)
+    assert sqlite_cache.get('institutional_cache', {'symbol': 'TCS'}) is None
+    assert server.cache.get_stale("institutional_holdings", "TCS") is None
+
+    # A persisted row past its TTL is served as is, neither refreshed nor replaced
+    sqlite_cache.save('institutional_cache', {'symbol': 'INFY'}, "35.00")
+    cached_at = age_rows(sqlite_cache, 'institutional_cache', 129600 + 60)
+    assert server._load_institutional_holding_percentage("INFY") == "35.00"
+    assert database.write_queue.flush(timeout=5)
+    assert sqlite_cache.get_entry('institutional_cache', {'symbol': 'INFY'})[1].timestamp() == \
+        pytest.approx(cached_at.timestamp())
+    assert server.cache.get_stale("institutional_holdings", "INFY") is None
+    assert breaker.stats()["rejected"] == 2
+
+
+def daily_candles(days):
+    start = datetime(2026, 1, 5, tzinfo=timezone(timedelta(hours=5, minutes=30)))
+    return [
+        {"timestamp": (start + timedelta(days=i)).isoformat(), "open": 100.0 + i, "close": 101.0 + i,
+         "high": 102.0 + i, "low": 99.0 + i}
+        for i in range(days)
+    ]
+
+
+def test_ohlc_rows_are_graded_fresh_or_stale_from_one_read(sqlite_cache, monkeypatch):
+    monkeypatch.setattr(server, "ohlc_fresh_minutes", lambda timeframe: 60)
+    downloads = []
+    monkeypatch.setattr(server, "download_ohlc_history", lambda *args: downloads.append(args) or {})
+    candles = daily_candles(5)
+    key = {'symbol': 'TCS', 'timeframe': 'daily'}
+
+    # Cached 30 minutes ago: served and filled into memory with its original cached time
+    sqlite_cache.save('ohlc_cache', key, database.encode_payload('ohlc_cache', candles))
+    age_rows(sqlite_cache, 'ohlc_cache', 30)
+    assert server._load_ohlc_series("TCS", "daily").to_dicts() == candles
+    assert downloads == []
+    assert server.cache.is_fresh("ohlc", "TCS_daily", max_age_minutes=40)
+    assert not server.cache.is_fresh("ohlc", "TCS_daily", max_age_minutes=20)
+
+    # Cached 10 hours ago, within retention: only the fallback when the download comes back empty
+    server.cache.clear()
+    age_rows(sqlite_cache, 'ohlc_cache', 600)
+    assert server._load_ohlc_series("TCS", "daily").to_dicts() == candles
+    assert len(downloads) == 1
+    assert server.cache.get_stale("ohlc", "TCS_daily") is None
+
+    # Past retention: not read at all
+    age_rows(sqlite_cache, 'ohlc_cache', server.OHLC_RETAIN_MINUTES + 60)
+    assert len(server._load_ohlc_series("TCS", "daily")) == 0
+
+
+def test_fundamentals_rows_are_graded_fresh_or_stale_from_one_read(sqlite_cache, monkeypatch):
+    def circuit_open(symbol):
+        raise server.CircuitOpenError("open")
+
+    monkeypatch.setattr(server, "get_ticker_info", circuit_open)
+    fundamentals = {"sector": "Technology", "pe": 30}
+    sqlite_cache.save('fundamentals_cache', {'symbol': 'TCS'}, fundamentals)
+
+    age_rows(sqlite_cache, 'fundamentals_cache', 600)
+    assert server._load_fundamentals("TCS") == fundamentals
+    assert server.cache.is_fresh("fundamentals", "TCS", max_age_minutes=700)
+    assert not server.cache.is_fresh("fundamentals", "TCS", max_age_minutes=500)
+
+    server.cache.clear()
+    age_rows(sqlite_cache, 'fundamentals_cache', 3 * 1440)
+    assert server._load_fundamentals("TCS") == fundamentals
+    assert server.cache.get_stale("fundamentals", "TCS") is None
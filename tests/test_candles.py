@@ -0,0 +1,78 @@
+"""Tests for the columnar CandleSeries cache format"""
+
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from market_calendar import IST  # noqa: E402
+from candles import CandleSeries, to_candles, to_series, is_columnar_payload, merge_series  # noqa: E402
+
+
+def make_candles(n=30):
+    start = datetime(2026, 1, 5, 9, 15, tzinfo=IST)
+    return [
+        {
+            "timestamp": (start + timedelta(minutes=15 * i)).isoformat(),
+            "open": round(100 + i * 0.37, 2),
+            "close": round(100.05 + i * 0.41, 2),
+            "high": round(101.1 + i * 0.4, 2),
+            "low": round(99.3 + i * 0.35, 2),
+        }
+        for i in range(n)
+    ]
+
+
+def test_dict_round_trip_is_lossless():
+    candles = make_candles()
+    series = CandleSeries.from_dicts(candles)
+
+    assert len(series) == len(candles)
+    assert series.tz_offset == 19800
+    assert series.to_dicts() == candles
+    # Same key order, so API responses serialize identically
+    assert json.dumps(series.to_dicts()) == json.dumps(candles)
+
+
+def test_payload_round_trip_through_json():
+    candles = make_candles()
+    payload = json.loads(json.dumps(CandleSeries.from_dicts(candles).to_payload()))
+
+    assert is_columnar_payload(payload)
+    assert to_candles(payload) == candles
+    assert to_series(payload).close.tolist() == [c["close"] for c in candles]
+
+
+def test_legacy_dict_lists_are_still_accepted():
+    candles = make_candles(3)
+    assert to_candles(candles) is candles
+    assert to_series(candles).to_dicts() == candles
+    assert to_series(None) is None
+    assert not to_series([])
+
+
+def test_changed_since_and_merge_keep_only_new_or_updated_bars():
+    candles = make_candles(6)
+    previous = CandleSeries.from_dicts(candles[:5])
+    refreshed = CandleSeries.from_dicts(candles[:4] + [{**candles[4], "close": 150.0}, candles[5]])
+
+    delta = refreshed.changed_since(previous)
+    assert delta.ts.tolist() == refreshed.ts[4:].tolist()
+    assert refreshed.changed_since(None) is refreshed
+
+    merged = merge_series(CandleSeries.from_dicts(candles[2:5]), delta)
+    assert merged.to_dicts() == candles[2:4] + [{**candles[4], "close": 150.0}, candles[5]]
+
+
+def test_slices_are_views_and_single_bars_match_to_dicts():
+    candles = make_candles()
+    series = CandleSeries.from_dicts(candles)
+
+    head = series[:-1]
+    assert len(head) == len(candles) - 1
+    assert head.close.base is series.close or head.close.base is series.close.base
+    assert series[:0].to_dicts() == [] and not CandleSeries.empty()
+    assert series[-5:].to_dicts() == candles[-5:]
+    assert [series.candle(i) for i in (0, 7, -1)] == [candles[0], candles[7], candles[-1]]
@@ -0,0 +1,113 @@
+"""Tests for the array indicator kernels"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import ta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from indicators import (  # noqa: E402
+    UP, DOWN, average_true_range, supertrend, rsi, adx, bollinger_pct_b, compute_indicators
+)
+
+
+def random_ohlc(seed, n):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1.5, n))
+    open_ = close + rng.normal(0, 0.8, n)
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close})
+
+
+def reference_supertrend(df, atr_period=10, multiplier=3.0):
+    """The original pandas Supertrend loop, returning the full level and direction series"""
+    atr = ta.volatility.AverageTrueRange(
+        high=df['high'], low=df['low'], close=df['close'], window=atr_period
+    ).average_true_range()
+    hl_avg = (df['high'] + df['low']) / 2
+    upper_band = hl_avg + (multiplier * atr)
+    lower_band = hl_avg - (multiplier * atr)
+
+    level = pd.Series(index=df.index, dtype=float)
+    direction = pd.Series(index=df.index, dtype=str)
+    first = atr.first_valid_index()
+    level.iloc[first] = lower_band.iloc[first]
+    direction.iloc[first] = 'UP'
+    for i in range(first + 1, len(df)):
+        prev_level = level.iloc[i - 1]
+        prev_direction = direction.iloc[i - 1]
+        close = df['close'].iloc[i]
+        if lower_band.iloc[i] > prev_level:
+            final_lower = lower_band.iloc[i]
+        else:
+            final_lower = prev_level if prev_direction == 'UP' else lower_band.iloc[i]
+        if upper_band.iloc[i] < prev_level:
+            final_upper = upper_band.iloc[i]
+        else:
+            final_upper = prev_level if prev_direction == 'DOWN' else upper_band.iloc[i]
+        if prev_direction == 'UP':
+            level.iloc[i], direction.iloc[i] = (final_upper, 'DOWN') if close <= final_lower else (final_lower, 'UP')
+        else:
+            level.iloc[i], direction.iloc[i] = (final_lower, 'UP') if close >= final_upper else (final_upper, 'DOWN')
+    return level.to_numpy(), direction.tolist()
+
+
+def test_atr_matches_ta():
+    for seed, n, window in [(1, 300, 14), (2, 40, 10), (3, 11, 10), (4, 5, 10)]:
+        df = random_ohlc(seed, n)
+        expected = ta.volatility.AverageTrueRange(
+            high=df["high"], low=df["low"], close=df["close"], window=window
+        ).average_true_range().to_numpy() if n >= window else np.zeros(n)
+        got = average_true_range(df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy(), window)
+        assert np.array_equal(got, expected)
+
+
+def test_supertrend_matches_the_pandas_loop():
+    for seed, n in [(5, 400), (6, 60), (7, 12)]:
+        df = random_ohlc(seed, n)
+        expected_level, expected_direction = reference_supertrend(df)
+        level, direction = supertrend(df["high"], df["low"], df["close"], atr_period=10, multiplier=3.0)
+        assert np.array_equal(level, expected_level)
+        assert [{UP: 'UP', DOWN: 'DOWN'}[d] for d in direction.tolist()] == expected_direction
+
+
+def test_rsi_and_adx_match_ta():
+    for seed, n in [(8, 500), (9, 28), (10, 15)]:
+        df = random_ohlc(seed, n)
+        expected_rsi = ta.momentum.RSIIndicator(close=df["close"], window=14).rsi().to_numpy()
+        assert np.array_equal(rsi(df["close"], 14), expected_rsi, equal_nan=True)
+
+        if n >= 28:
+            expected_adx = ta.trend.ADXIndicator(
+                high=df["high"], low=df["low"], close=df["close"], window=14
+            ).adx().to_numpy()
+            assert np.array_equal(adx(df["high"], df["low"], df["close"], 14), expected_adx)
+        else:
+            # ta raises on fewer than 2 x window bars
+            assert np.isnan(adx(df["high"], df["low"], df["close"], 14, last_only=True))
+
+
+def test_bollinger_pct_b_matches_ta():
+    df = random_ohlc(12, 400)
+    bands = ta.volatility.BollingerBands(close=df["close"], window=20, window_dev=2.0)
+    upper, lower = bands.bollinger_hband().to_numpy(), bands.bollinger_lband().to_numpy()
+    expected = (df["close"].to_numpy() - lower) / (upper - lower) * 100
+    # pandas' rolling sums drift by a few ulps over long series
+    assert np.allclose(bollinger_pct_b(df["close"], 20, 2.0), expected, rtol=0, atol=1e-8, equal_nan=True)
+
+
+def test_last_only_results_are_the_last_values():
+    df = random_ohlc(13, 300)
+    args = (df["high"], df["low"], df["close"])
+    kwargs = dict(rsi_period=14, adx_period=14, atr_period=10, multiplier=3.0, bb_period=20, bb_std_dev=2.0)
+    full = compute_indicators(*args, last_only=False, **kwargs)
+    last = compute_indicators(*args, **kwargs)
+
+    assert set(last) == {"rsi", "adx", "supertrend", "supertrend_direction", "bb_pct"}
+    for name, value in last.items():
+        assert value == full[name][-1], name
+    assert compute_indicators(*args, bb_period=20).keys() == {"bb_pct"}
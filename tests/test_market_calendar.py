@@ -0,0 +1,43 @@
+"""Tests for calendar-aware cache expiry"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from market_calendar import IST, next_expiry, last_expiry  # noqa: E402
+
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    return datetime(2026, 10, day, hour, minute, tzinfo=IST)
+
+
+def test_entries_expire_at_the_next_bar_close():
+    # Monday 2026-10-12
+    assert next_expiry("15min", at(12, 10, 5)) == at(12, 10, 15)
+    assert next_expiry("1hour", at(12, 10, 20)) == at(12, 11, 15)
+    assert next_expiry("1hour", at(12, 15, 20)) == at(12, 15, 30)
+    assert next_expiry("daily", at(12, 16)) == at(13, 15, 30)
+    assert next_expiry("weekly", at(12, 10)) == at(16, 15, 30)
+    # Friday 2026-10-30 is the last session of October
+    assert next_expiry("monthly", at(12, 10)) == at(30, 15, 30)
+
+
+def test_nothing_expires_while_the_market_is_closed():
+    # Friday after the close: the forming-bar refresh only resumes at Monday's open
+    assert next_expiry("monthly", at(16, 16), refresh_minutes=15) == at(19, 9, 15)
+    assert next_expiry("15min", at(17, 11), refresh_minutes=15) == at(19, 9, 15)
+    # During the session forming bars refresh on the 15-minute grid
+    assert next_expiry("daily", at(12, 9, 50), refresh_minutes=15) == at(12, 10, 0)
+
+
+def test_last_expiry_agrees_with_next_expiry():
+    now = at(19, 11, 7)
+    for refresh_minutes in (0, 15):
+        for timeframe in ("15min", "1hour", "daily", "weekly", "monthly"):
+            boundary = last_expiry(timeframe, now, refresh_minutes)
+            for minutes in range(0, 60 * 24 * 9, 37):
+                cached_at = now - timedelta(minutes=minutes)
+                is_fresh = next_expiry(timeframe, cached_at, refresh_minutes) > now
+                assert is_fresh == (cached_at >= boundary), (timeframe, refresh_minutes, cached_at)
@@ -0,0 +1,88 @@
+"""Tests for the offline fixture provider and provider selection"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from market_data import FixtureProvider, YahooNSEProvider, create_provider  # noqa: E402
+
+
+def candle(timestamp, price):
+    return {"timestamp": timestamp, "open": price, "high": price + 2, "low": price - 1, "close": price + 1}
+
+
+@pytest.fixture
+def fixture_dir(tmp_path):
+    files = {
+        "history/TCS.NS_1d.json": [
+            candle("2024-01-01T00:00:00+05:30", 100.0),
+            candle("2024-01-02T00:00:00+05:30", 101.0),
+            candle("2024-01-03T00:00:00+05:30", 102.0),
+        ],
+        "history/INFY.NS_1d.json": [candle("2024-01-03T00:00:00+05:30", 50.0)],
+        "info/TCS.NS.json": {"symbol": "TCS.NS", "trailingPE": 30.5},
+        "constituents/nifty50.json": ["TCS", "INFY"],
+    }
+    for name, payload in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload))
+    return tmp_path
+
+
+def test_history_replays_the_recorded_candles(fixture_dir):
+    provider = FixtureProvider(str(fixture_dir))
+
+    df = provider.history("TCS.NS", period="max", interval="1d")
+    assert list(df.columns) == ["Open", "High", "Low", "Close"]
+    assert len(df) == 3
+    assert str(df.index[0]) == "2024-01-01 00:00:00+05:30"
+    assert df["Close"].tolist() == [101.0, 102.0, 103.0]
+
+    since = provider.history("TCS.NS", interval="1d", start="2024-01-02T00:00:00+05:30")
+    assert since["Open"].tolist() == [101.0, 102.0]
+
+    missing = provider.history("WIPRO.NS", period="max", interval="1d")
+    assert missing.empty and list(missing.columns) == ["Open", "High", "Low", "Close"]
+
+
+def test_download_returns_frames_for_tickers_with_data(fixture_dir):
+    provider = FixtureProvider(str(fixture_dir), latency_ms=1)
+
+    frames = provider.download(["TCS.NS", "INFY.NS", "WIPRO.NS"], period="max", interval="1d")
+    assert sorted(frames) == ["INFY.NS", "TCS.NS"]
+    assert frames["TCS.NS"].equals(provider.history("TCS.NS", period="max", interval="1d"))
+    assert provider.latency == pytest.approx(0.001)
+
+
+def test_info_and_constituents(fixture_dir):
+    provider = FixtureProvider(str(fixture_dir))
+
+    assert provider.info("TCS.NS") == {"symbol": "TCS.NS", "trailingPE": 30.5}
+    assert provider.info("WIPRO.NS") == {}
+    assert provider.constituents("nifty50") == ["TCS", "INFY"]
+    assert provider.constituents("nifty500") is None
+    assert provider.major_holders("TCS.NS") is None
+
+
+def test_create_provider_follows_the_environment(fixture_dir, monkeypatch):
+    monkeypatch.setenv("MARKET_DATA_PROVIDER", "fixture")
+    monkeypatch.setenv("MARKET_DATA_FIXTURE_DIR", str(fixture_dir))
+    monkeypatch.setenv("MARKET_DATA_FIXTURE_LATENCY_MS", "5")
+    provider = create_provider()
+    assert isinstance(provider, FixtureProvider)
+    assert provider.root == fixture_dir
+    assert provider.latency == pytest.approx(0.005)
+
+    monkeypatch.setenv("MARKET_DATA_PROVIDER", "yahoo")
+    assert isinstance(create_provider(), YahooNSEProvider)
+
+    monkeypatch.delenv("MARKET_DATA_PROVIDER")
+    assert isinstance(create_provider(), YahooNSEProvider)
+
+    monkeypatch.setenv("MARKET_DATA_PROVIDER", "unknown")
+    assert isinstance(create_provider(), YahooNSEProvider)
@@ -0,0 +1,56 @@
+"""Tests for the in-process L1 cache: TTL freshness, retention and LRU eviction"""
+
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from market_calendar import get_ist_now  # noqa: E402
+from memory_cache import MemoryCache, estimate_size  # noqa: E402
+
+
+def make_cache(max_bytes=10 ** 7):
+    return MemoryCache({"ohlc": (15, 60), "lists": (1440, None)}, max_bytes=max_bytes)
+
+
+def test_ttl_controls_freshness_and_retention_controls_stale_reads():
+    cache = make_cache()
+    now = get_ist_now()
+    cache.set("ohlc", "TCS_daily", [1, 2, 3], now - timedelta(minutes=20))
+
+    assert cache.get("ohlc", "TCS_daily") is None
+    assert cache.get("ohlc", "TCS_daily", max_age_minutes=30) == [1, 2, 3]
+    assert cache.get_stale("ohlc", "TCS_daily") == [1, 2, 3]
+
+    # Past the 60 minute retention the entry is gone entirely
+    cache.set("ohlc", "INFY_daily", [4], now - timedelta(minutes=61))
+    assert cache.get_stale("ohlc", "INFY_daily") is None
+
+
+def test_only_if_newer_keeps_more_recent_entry():
+    cache = make_cache()
+    now = get_ist_now()
+    cache.set("lists", "nifty50", ["A"], now)
+
+    assert not cache.set("lists", "nifty50", ["B"], now - timedelta(minutes=5), only_if_newer=True)
+    assert cache.get("lists", "nifty50") == ["A"]
+    assert cache.set("lists", "nifty50", ["C"], now + timedelta(seconds=1), only_if_newer=True)
+    assert cache.get("lists", "nifty50") == ["C"]
+
+
+def test_budget_evicts_least_recently_used_across_namespaces():
+    candles = [{"timestamp": "2026-01-05T09:15:00+05:30", "open": 1.0, "close": 2.0, "high": 3.0, "low": 0.5}] * 50
+    cache = make_cache(max_bytes=int(estimate_size(candles) * 2.5))
+
+    cache.set("ohlc", "A", candles)
+    cache.set("lists", "B", candles)
+    cache.get("ohlc", "A")  # A is now more recent than B
+    cache.set("ohlc", "C", candles)
+
+    assert cache.get("ohlc", "A") is not None
+    assert cache.get("lists", "B") is None
+    assert cache.get("ohlc", "C") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
@@ -0,0 +1,41 @@
+"""Tests for the Prometheus text rendering of metrics"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from metrics import MetricsRegistry, gauge_family  # noqa: E402
+
+
+def test_counters_and_histograms_render_in_prometheus_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("app_requests_total", "Requests", ("namespace", "source"))
+    latency = registry.histogram("app_load_seconds", "Load latency", ("source",), buckets=(0.01, 0.1))
+
+    requests.inc(namespace="ohlc_daily", source="memory")
+    requests.inc(2, namespace="ohlc_daily", source="memory")
+    latency.observe(0.005, source="memory")
+    latency.observe(0.05, source="upstream")
+    latency.observe(3, source="upstream")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE app_requests_total counter" in lines
+    assert 'app_requests_total{namespace="ohlc_daily",source="memory"} 3' in lines
+    assert "# TYPE app_load_seconds histogram" in lines
+    assert 'app_load_seconds_bucket{source="upstream",le="0.01"} 0' in lines
+    assert 'app_load_seconds_bucket{source="upstream",le="0.1"} 1' in lines
+    assert 'app_load_seconds_bucket{source="upstream",le="+Inf"} 2' in lines
+    assert 'app_load_seconds_sum{source="upstream"} 3.05' in lines
+    assert 'app_load_seconds_count{source="memory"} 1' in lines
+
+
+def test_collectors_run_at_render_time_and_failures_are_skipped():
+    registry = MetricsRegistry()
+    depth = {"pending": 1}
+    registry.register_collector(lambda: [gauge_family("app_queue_pending", "Pending", [({}, depth["pending"])])])
+    registry.register_collector(lambda: 1 / 0)
+
+    assert "app_queue_pending 1" in registry.render()
+    depth["pending"] = 7
+    assert "app_queue_pending 7" in registry.render()
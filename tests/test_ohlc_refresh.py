@@ -0,0 +1,122 @@
+"""Tests for incremental OHLC refreshes"""
+
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from market_calendar import get_ist_now  # noqa: E402
+
+
+def recent_daily(days, scale=1.0):
+    """`days` daily candles ending today"""
+    today = get_ist_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        {"timestamp": (today - timedelta(days=days - 1 - i)).isoformat(), "open": round((100.0 + i) * scale, 2),
+         "close": round((101.0 + i) * scale, 2), "high": round((102.0 + i) * scale, 2),
+         "low": round((99.0 + i) * scale, 2)}
+        for i in range(days)
+    ]
+
+
+class RecordingProvider:
+    """Serves one history, sliced like Yahoo by `start`, and records every request"""
+
+    def __init__(self, candles):
+        self.candles = candles
+        self.requests = []
+
+    def history(self, ticker, period=None, interval="1d", start=None):
+        self.requests.append({"period": period, "start": start})
+        candles = [c for c in self.candles if start is None or pd.Timestamp(c["timestamp"]) >= start]
+        return pd.DataFrame({
+            "Open": [c["open"] for c in candles], "High": [c["high"] for c in candles],
+            "Low": [c["low"] for c in candles], "Close": [c["close"] for c in candles],
+        }, index=pd.DatetimeIndex([pd.Timestamp(c["timestamp"]) for c in candles]))
+
+
+@pytest.fixture
+def refresh(monkeypatch):
+    stored = []
+    monkeypatch.setattr(server, "store_ohlc_timeframes", lambda symbol, frames: stored.append(frames))
+    monkeypatch.setattr(server, "OHLC_INCREMENTAL_ENABLED", True)
+    server.cache.clear()
+    yield stored
+    server.cache.clear()
+
+
+def test_is_incremental_tail_requires_a_tail_inside_the_window(monkeypatch):
+    monkeypatch.setattr(server, "OHLC_INCREMENTAL_ENABLED", True)
+    assert server.is_incremental_tail(recent_daily(30), "eod")
+    assert not server.is_incremental_tail([], "eod")
+    assert not server.is_incremental_tail(None, "eod")
+
+    # Last bar older than the download window: a full download is cheaper than the gap
+    stale = recent_daily(30)
+    stale[-1] = {**stale[-1], "timestamp": (get_ist_now() - timedelta(days=4 * 365)).isoformat()}
+    assert not server.is_incremental_tail(stale, "eod")
+    intraday = [{**stale[0], "timestamp": (get_ist_now() - timedelta(days=45)).isoformat()}]
+    assert not server.is_incremental_tail(intraday, "intraday")
+
+    monkeypatch.setattr(server, "OHLC_INCREMENTAL_ENABLED", False)
+    assert not server.is_incremental_tail(recent_daily(30), "eod")
+
+
+def test_incremental_refresh_overlaps_completed_bars(refresh, monkeypatch):
+    history = recent_daily(40)
+    provider = RecordingProvider(history)
+    monkeypatch.setattr(server, "market_data", provider)
+
+    tail = history[:30]
+    server._download_ohlc_history("TCS", "eod", tail)
+
+    overlap_start = pd.Timestamp(tail[-1 - server.OHLC_INCREMENTAL_OVERLAP_BARS]["timestamp"])
+    assert provider.requests == [{"period": None, "start": overlap_start}]
+    assert refresh[0]["eod"] == server.extend_ohlc_history(tail, history[26:], "eod")
+
+
+def test_readjusted_history_is_downloaded_in_full(refresh, monkeypatch):
+    # Yahoo re-priced the whole history after a 1:5 split
+    provider = RecordingProvider(recent_daily(40, scale=0.2))
+    monkeypatch.setattr(server, "market_data", provider)
+
+    server._download_ohlc_history("TCS", "eod", recent_daily(40)[:30])
+
+    period, _ = server.get_ohlc_download_plan()["eod"]
+    assert [r["period"] for r in provider.requests] == [None, period]
+    assert refresh[0]["eod"] == provider.candles
+
+
+def test_prefetch_refetches_readjusted_symbols_in_full(monkeypatch):
+    histories = {"TCS.NS": recent_daily(40), "INFY.NS": recent_daily(40, scale=0.2)}
+    requests = []
+
+    class BatchProvider:
+        def download(self, tickers, period=None, interval="1d", start=None):
+            requests.append((sorted(tickers), None if start else period))
+            return {t: RecordingProvider(histories[t]).history(t, start=start) for t in tickers if t in histories}
+
+    stored = {}
+    monkeypatch.setattr(server, "market_data", BatchProvider())
+    monkeypatch.setattr(server, "OHLC_INCREMENTAL_ENABLED", True)
+    monkeypatch.setattr(server, "get_ohlc_download_plan", lambda: {"eod": ("3y", "1d")})
+    monkeypatch.setattr(server, "store_ohlc_timeframes_many", lambda frames: stored.update(frames))
+    server.cache.clear()
+    # Both cached before INFY's split; the entries have expired
+    old = get_ist_now() - timedelta(days=2)
+    for symbol in ("TCS", "INFY"):
+        server.cache.set("ohlc", f"{symbol}_eod", recent_daily(40)[:30], old)
+
+    try:
+        server.prefetch_ohlc_data(["TCS", "INFY"])
+    finally:
+        server.cache.clear()
+
+    assert requests == [(["INFY.NS", "TCS.NS"], None), (["INFY.NS"], "3y")]
+    assert stored["INFY"]["eod"] == histories["INFY.NS"]
+    assert stored["TCS"]["eod"] == histories["TCS.NS"]
@@ -0,0 +1,180 @@
+"""Tests for deriving 1hour/weekly/monthly candles from 15-minute and daily history"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from market_calendar import IST  # noqa: E402
+from resample import (  # noqa: E402
+    resample_intraday,
+    resample_weekly,
+    resample_monthly,
+    last_sessions,
+    derive_from_daily,
+    merge_candles,
+    trim_to_period,
+    is_readjusted,
+)
+
+
+def make_15min_session(day: datetime, base: float = 100.0):
+    candles = []
+    ts = day.replace(hour=9, minute=15)
+    close_ts = day.replace(hour=15, minute=30)
+    k = 0
+    while ts < close_ts:
+        candles.append({
+            "timestamp": ts.isoformat(),
+            "open": base + k,
+            "close": base + k + 1,
+            "high": base + k + 2,
+            "low": base + k - 1,
+        })
+        ts += timedelta(minutes=15)
+        k += 1
+    return candles
+
+
+def make_daily(start: datetime, end: datetime):
+    candles = []
+    ts = start
+    k = 0
+    while ts < end:
+        if ts.weekday() < 5:
+            candles.append({
+                "timestamp": ts.isoformat(),
+                "open": 100.0 + k,
+                "close": 101.0 + k,
+                "high": 103.0 + k,
+                "low": 99.0 + k,
+            })
+            k += 1
+        ts += timedelta(days=1)
+    return candles
+
+
+def test_hourly_bars_follow_nse_session():
+    candles = make_15min_session(datetime(2026, 1, 5, tzinfo=IST))
+    hourly = resample_intraday(candles, 60)
+
+    starts = [datetime.fromisoformat(c["timestamp"]).strftime("%H:%M") for c in hourly]
+    assert starts == ["09:15", "10:15", "11:15", "12:15", "13:15", "14:15", "15:15"]
+
+    # First hour aggregates the 9:15, 9:30, 9:45 and 10:00 bars
+    assert hourly[0] == {
+        "timestamp": "2026-01-05T09:15:00+05:30",
+        "open": 100.0,
+        "close": 104.0,
+        "high": 105.0,
+        "low": 99.0,
+    }
+    # The 15:15 bar is partial (one 15-minute candle up to the 15:30 close)
+    assert hourly[-1]["open"] == candles[-1]["open"]
+    assert hourly[-1]["close"] == candles[-1]["close"]
+
+
+def test_partial_forming_hour_is_kept():
+    candles = make_15min_session(datetime(2026, 1, 5, tzinfo=IST))[:6]  # 9:15 - 10:30
+    hourly = resample_intraday(candles, 60)
+    assert len(hourly) == 2
+    assert hourly[-1]["timestamp"] == "2026-01-05T10:15:00+05:30"
+    assert hourly[-1]["close"] == candles[-1]["close"]
+
+
+def test_last_sessions_keeps_most_recent_days():
+    candles = []
+    for day in (5, 6, 7):
+        candles += make_15min_session(datetime(2026, 1, day, tzinfo=IST))
+    kept = last_sessions(candles, 2)
+    days = {datetime.fromisoformat(c["timestamp"]).day for c in kept}
+    assert days == {6, 7}
+    assert last_sessions(candles, 5) == candles
+
+
+def test_weekly_bars_anchor_on_monday():
+    daily = make_daily(datetime(2026, 1, 7, tzinfo=IST), datetime(2026, 1, 20, tzinfo=IST))
+    weekly = resample_weekly(daily)
+
+    assert [w["timestamp"] for w in weekly] == [
+        "2026-01-05T00:00:00+05:30",
+        "2026-01-12T00:00:00+05:30",
+        "2026-01-19T00:00:00+05:30",
+    ]
+    # Partial first week (Wed-Fri) still aggregates only the days it has
+    assert weekly[0]["open"] == daily[0]["open"]
+    assert weekly[0]["close"] == daily[2]["close"]
+    assert weekly[0]["high"] == max(d["high"] for d in daily[:3])
+
+
+def test_monthly_bars_anchor_on_first_of_month():
+    daily = make_daily(datetime(2026, 1, 15, tzinfo=IST), datetime(2026, 3, 10, tzinfo=IST))
+    monthly = resample_monthly(daily)
+
+    assert [m["timestamp"][:10] for m in monthly] == ["2026-01-01", "2026-02-01", "2026-03-01"]
+    assert monthly[1]["low"] == min(d["low"] for d in daily if d["timestamp"].startswith("2026-02"))
+
+
+def test_derive_from_daily_trims_windows():
+    now = datetime(2026, 10, 17, 12, 0, tzinfo=IST)
+    daily = make_daily(datetime(2023, 10, 1, tzinfo=IST), now)
+    frames = derive_from_daily(daily, now)
+
+    assert frames["daily"][0]["timestamp"] >= "2026-07-17"
+    assert frames["weekly"][0]["timestamp"].startswith("2025-10-13")
+    assert frames["monthly"][0]["timestamp"].startswith("2023-10-01")
+    assert frames["monthly"][-1]["timestamp"].startswith("2026-10-01")
+
+
+def test_merge_candles_replaces_the_forming_bar_and_appends():
+    daily = make_daily(datetime(2026, 1, 5, tzinfo=IST), datetime(2026, 1, 17, tzinfo=IST))
+    cached = daily[:6]
+    forming_updated = {**daily[5], "close": 150.0}
+    fresh = [forming_updated] + daily[6:]
+
+    merged = merge_candles(cached, fresh)
+    assert merged == daily[:5] + fresh
+    # Overlapping completed bars are taken from the fresh download, not duplicated
+    assert merge_candles(cached, daily[3:]) == daily
+    assert merge_candles(cached, []) == cached
+    assert merge_candles([], fresh) == fresh
+
+
+def test_trim_to_period_keeps_the_download_window():
+    now = datetime(2026, 10, 17, 12, 0, tzinfo=IST)
+    daily = make_daily(datetime(2026, 6, 1, tzinfo=IST), now)
+    kept = trim_to_period(daily, "3mo", "1d", now)
+    assert kept[0]["timestamp"].startswith("2026-07-17")
+    assert kept[-1] == daily[-1]
+
+    # Weekly bars: the bar containing the window start is kept whole
+    weekly = resample_weekly(daily)
+    assert trim_to_period(weekly, "3mo", "1wk", now)[0]["timestamp"].startswith("2026-07-13")
+
+    # Session-counted periods keep the last N trading days
+    intraday = []
+    for day in (12, 13, 14, 15, 16):
+        intraday += make_15min_session(datetime(2026, 10, day, tzinfo=IST))
+    kept = trim_to_period(intraday, "2d", "15m", now)
+    assert {datetime.fromisoformat(c["timestamp"]).day for c in kept} == {15, 16}
+
+
+def test_is_readjusted_compares_completed_overlap_bars():
+    daily = make_daily(datetime(2026, 1, 5, tzinfo=IST), datetime(2026, 1, 17, tzinfo=IST))
+    cached = daily[:6]
+
+    # Same overlap, forming bar moved, new bars: not an adjustment
+    fresh = daily[3:5] + [{**daily[5], "close": 80.0}] + daily[6:]
+    assert not is_readjusted(cached, fresh)
+    assert not is_readjusted(cached, [])
+
+    # A 1:5 split re-prices every earlier bar
+    split = [{**c, "open": c["open"] / 5, "close": c["close"] / 5} for c in daily[3:]]
+    assert is_readjusted(cached, split)
+
+    # A dividend shaves about 1% off; a cent of rounding noise does not count
+    dividend = [{**c, "close": round(c["close"] * 0.99, 2)} for c in daily[3:]]
+    assert is_readjusted(cached, dividend)
+    noise = [{**c, "close": c["close"] + 0.01} for c in daily[3:]]
+    assert not is_readjusted(cached, noise)
@@ -0,0 +1,119 @@
+"""Tests for the vectorized UDTS engine"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from udts import (  # noqa: E402
+    udts_batch, udts_indices, pad_series, trend_blocks, find_biggest_trend, DIRECTION_NAMES, NO_INDEX
+)
+
+
+def reference_udts(opens, closes):
+    """The original candle-by-candle UDTS scan, returning indices instead of candles"""
+    n = len(closes)
+    if n == 0:
+        return "UNKNOWN", None, None, None, None
+
+    g1 = r1 = None
+    for i in range(n - 1, -1, -1):
+        if closes[i] > opens[i]:
+            for j in range(i - 1, -1, -1):
+                if closes[j] < opens[j]:
+                    if closes[i] > opens[j]:
+                        g1, r1 = i, j
+                    break
+            if g1 is not None:
+                break
+
+    if g1 is None:
+        if n == 1:
+            return ("UP" if closes[0] > opens[0] else "DOWN"), None, None, None, None
+        return ("UP" if closes[n - 2] - opens[0] >= 0 else "DOWN"), None, None, None, None
+
+    r2 = g2 = None
+    for i in range(g1 + 1, n):
+        if closes[i] < opens[i]:
+            for j in range(i - 1, -1, -1):
+                if closes[j] > opens[j]:
+                    if closes[i] < opens[j]:
+                        r2, g2 = i, j
+                    break
+            if r2 is not None:
+                break
+
+    return ("DOWN" if r2 is not None else "UP"), g1, r1, r2, g2
+
+
+def reference_blocks(opens, closes):
+    """The original block partition: (start, end, direction, low, high) per block"""
+    blocks = []
+    start = 0
+    direction = "UP" if closes[0] > opens[0] else "DOWN"
+    for i in range(1, len(closes)):
+        color = "UP" if closes[i] > opens[i] else "DOWN"
+        if color == direction:
+            continue
+        if (color == "DOWN" and closes[i] < opens[i - 1]) or (color == "UP" and closes[i] > opens[i - 1]):
+            prices = opens[start:i] + closes[start:i]
+            blocks.append((start, i, direction, min(prices), max(prices)))
+            start, direction = i, color
+    prices = opens[start:] + closes[start:]
+    blocks.append((start, len(closes), direction, min(prices), max(prices)))
+    return blocks
+
+
+def random_series(rng, n):
+    # Coarse price grid so doji candles and equal opens/closes occur often
+    opens = np.round(100 + rng.normal(0, 2, n), 0)
+    closes = np.round(opens + rng.normal(0, 2, n), 0)
+    return opens, closes
+
+
+def as_reference(direction, *indices):
+    return (DIRECTION_NAMES[direction],) + tuple(None if i == NO_INDEX else i for i in indices)
+
+
+def test_single_series_matches_the_reference_scan():
+    rng = np.random.default_rng(7)
+    for n in list(range(0, 12)) * 40 + [60, 250, 800]:
+        opens, closes = random_series(rng, n)
+        expected = reference_udts(opens.tolist(), closes.tolist())
+        assert as_reference(*udts_indices(opens, closes)) == expected, (opens, closes)
+
+
+def test_batch_matches_single_series():
+    rng = np.random.default_rng(11)
+    series = [random_series(rng, int(n)) for n in rng.integers(0, 40, 300)]
+    opens, lengths = pad_series([o for o, _ in series])
+    closes, _ = pad_series([c for _, c in series])
+
+    result = udts_batch(opens, closes, lengths)
+    for row, (o, c) in enumerate(series):
+        got = as_reference(*(int(result[name][row]) for name in ("direction", "g1", "r1", "r2", "g2")))
+        assert got == reference_udts(o.tolist(), c.tolist())
+
+
+def test_trend_blocks_match_the_reference_partition():
+    rng = np.random.default_rng(3)
+    for n in list(range(1, 30)) * 20:
+        opens, closes = random_series(rng, n)
+        expected = reference_blocks(opens.tolist(), closes.tolist())
+        blocks = trend_blocks(opens, closes)
+        got = list(zip(
+            blocks["start"].tolist(), blocks["end"].tolist(),
+            [DIRECTION_NAMES[d] for d in blocks["direction"].tolist()],
+            blocks["low"].tolist(), blocks["high"].tolist(),
+        ))
+        assert got == expected, (opens, closes)
+
+        powers = [high - low for _, _, _, low, high in expected]
+        first_biggest = expected[powers.index(max(powers))]
+        trend = find_biggest_trend(opens, closes)
+        assert (trend["start"], trend["end"] + 1, trend["direction"]) == first_biggest[:3]
+        assert trend["start_price"] == opens[first_biggest[0]]
+
+    assert find_biggest_trend(np.array([]), np.array([])) is None
@@ -0,0 +1,132 @@
+"""Tests for upstream pacing, request coalescing and the circuit breaker"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import upstream  # noqa: E402
+from upstream import TokenBucket, SingleFlight, CircuitBreaker, CircuitOpenError  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+def test_token_bucket_paces_callers_at_the_refill_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(upstream.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(upstream.time, "sleep", clock.sleep)
+
+    bucket = TokenBucket(rate=5, burst=2)
+    # The burst goes out at once, then callers queue 1/rate apart
+    waits = [bucket.acquire() for _ in range(4)]
+    assert waits == pytest.approx([0.0, 0.0, 0.2, 0.4])
+    assert clock.slept == pytest.approx([0.2, 0.4])
+
+    # Idle time refills up to the burst only
+    clock.now += 10
+    assert bucket.acquire(2) == 0.0
+    assert bucket.acquire() == pytest.approx(0.2)
+    assert bucket.stats()["waited"] == 3
+
+
+def test_single_flight_runs_concurrent_callers_once():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def load(value):
+        calls.append(value)
+        release.wait(5)
+        return {"value": value}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("TCS", load, 42))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [42]
+    assert len(results) == 5
+    # Every caller gets the very same result object
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"in_flight": 0, "coalesced": 4}
+
+
+def test_single_flight_shares_the_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("TCS", load)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.stats()["coalesced"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len(errors) == 3 and all(e is errors[0] for e in errors)
+
+
+def test_breaker_opens_at_the_threshold_and_closes_after_a_good_probe():
+    probes = []
+
+    def probe():
+        probes.append(1)
+        if len(probes) == 1:
+            raise RuntimeError("still failing")
+
+    breaker = CircuitBreaker(failure_rate=0.5, window_seconds=60, min_calls=4, probe_interval=0.01, probe=probe)
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_success()
+    assert not breaker.is_open  # 1/3 failed, below min_calls
+    breaker.record_failure()
+    assert breaker.is_open  # 2/4 failed
+
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.stats()["rejected"] == 1
+
+    deadline = time.monotonic() + 5
+    while breaker.is_open and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not breaker.is_open
+    assert len(probes) == 2  # the failed probe kept it open
+    breaker.check()
+    assert breaker.stats()["window_calls"] == 0
@@ -0,0 +1,128 @@
+"""Tests for the cache write-behind queue"""
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import database  # noqa: E402
+
+
+def test_repeated_writes_to_a_key_are_coalesced(monkeypatch):
+    written = []
+    monkeypatch.setattr(
+        database.cache_backend, "save_many",
+        lambda table, entries, batch_size=50: written.append((table, entries)) or True
+    )
+
+    queue = database.WriteBehindQueue(max_pending=100, flush_interval=60, batch_size=50)
+    for value in range(5):
+        queue.put("fundamentals_cache", {"symbol": "TCS"}, {"pe": value})
+    queue.put("fundamentals_cache", {"symbol": "INFY"}, {"pe": 1})
+    queue.put("institutional_cache", {"symbol": "TCS"}, "40.00")
+
+    assert queue.flush(timeout=5)
+    queue.stop(timeout=5)
+
+    by_table = dict(written)
+    assert by_table["fundamentals_cache"] == [({"symbol": "TCS"}, {"pe": 4}), ({"symbol": "INFY"}, {"pe": 1})]
+    assert by_table["institutional_cache"] == [({"symbol": "TCS"}, "40.00")]
+    assert queue.stats()["coalesced"] == 4
+    assert queue.stats()["pending"] == 0
+
+
+def test_discard_drops_writes_for_cleared_tables(monkeypatch):
+    written = []
+    monkeypatch.setattr(
+        database.cache_backend, "save_many",
+        lambda table, entries, batch_size=50: written.append(table) or True
+    )
+
+    queue = database.WriteBehindQueue(max_pending=100, flush_interval=60, batch_size=50)
+    queue.put("ohlc_cache", {"symbol": "TCS", "timeframe": "daily"}, [])
+    queue.put("stock_lists", {"list_type": "nifty50"}, ["TCS"])
+    queue.discard(["ohlc_cache"])
+    queue.stop(timeout=5)
+
+    assert written == ["stock_lists"]
+
+
+def test_discard_waits_for_an_in_progress_flush(monkeypatch):
+    writing = threading.Event()
+    release = threading.Event()
+
+    def save_many(table, entries, batch_size=50):
+        writing.set()
+        release.wait(5)
+        return True
+
+    monkeypatch.setattr(database.cache_backend, "save_many", save_many)
+
+    queue = database.WriteBehindQueue(max_pending=100, flush_interval=60, batch_size=50)
+    queue.put("ohlc_cache", {"symbol": "TCS", "timeframe": "daily"}, [])
+    flusher = threading.Thread(target=queue.flush)
+    flusher.start()
+    assert writing.wait(5)
+
+    # The rows are already taken off the queue; clearing must not run before they land
+    assert not queue.discard(["ohlc_cache"], timeout=0.05)
+    discarded = []
+    waiter = threading.Thread(target=lambda: discarded.append(queue.discard(["ohlc_cache"])))
+    waiter.start()
+    waiter.join(0.05)
+    assert not discarded
+
+    release.set()
+    waiter.join(5)
+    flusher.join(5)
+    assert discarded == [True]
+    queue.stop(timeout=5)
+
+
+def test_queued_bar_deltas_are_merged_not_replaced(monkeypatch):
+    from datetime import datetime, timedelta
+    from candles import CandleSeries
+    from market_calendar import IST
+
+    upserts = []
+    monkeypatch.setattr(
+        database.cache_backend, "upsert_bars",
+        lambda symbol, timeframe, bars: upserts.append((symbol, timeframe, bars)) or True
+    )
+
+    start = datetime(2026, 1, 5, 9, 15, tzinfo=IST)
+    candles = [
+        {"timestamp": (start + timedelta(days=i)).isoformat(), "open": 100.0 + i, "close": 101.0 + i,
+         "high": 102.0 + i, "low": 99.0 + i}
+        for i in range(4)
+    ]
+    forming = {**candles[2], "close": 90.0}
+
+    queue = database.WriteBehindQueue(max_pending=100, flush_interval=60, batch_size=50)
+    key = {"symbol": "TCS", "timeframe": "daily"}
+    queue.put(database.BAR_TABLE, key, CandleSeries.from_dicts(candles[:2] + [forming]))
+    # The forming bar's update and a new bar, queued before the first delta was written
+    queue.put(database.BAR_TABLE, key, CandleSeries.from_dicts(candles[2:]))
+    assert queue.flush(timeout=5)
+    queue.stop(timeout=5)
+
+    assert len(upserts) == 1
+    symbol, timeframe, bars = upserts[0]
+    assert (symbol, timeframe) == ("TCS", "daily")
+    assert bars.to_dicts() == candles
+    assert queue.stats()["coalesced"] == 1
+
+
+def test_clear_all_caches_includes_bars_with_the_flag_off(tmp_path, monkeypatch):
+    from cache_backends import SQLiteCacheBackend
+
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    assert backend.init()
+    monkeypatch.setattr(database, "cache_backend", backend)
+    monkeypatch.setattr(database, "OHLC_BARS_ENABLED", False)
+
+    cleared = []
+    monkeypatch.setattr(backend, "clear", lambda tables: cleared.extend(tables) or True)
+    assert database.clear_all_caches()
+    assert database.BAR_TABLE in cleared